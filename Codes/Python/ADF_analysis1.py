@@ -15,12 +15,23 @@ University of South Florida
 """
 
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.spatial.distance import cdist
-from scipy.signal import find_peaks
 import argparse
+import os
 import sys
 
+from atom_selection import add_selection_argument, atoms_from_args
+from angle_kernels import angle_histogram, coordination_angle_histograms
+from frame_parallel import (accumulate_frames, add_checkpoint_arguments, add_follow_arguments,
+                            checkpoint_path_for, follow_accumulate)
+from histogram_backends import add_backend_argument, pair_histogram
+from histogram_store import (FINE_D_ANGLE, FINE_DR, HistogramStore,
+                             add_histogram_store_arguments, aligned, histogram_store_path, rebin)
+from neighbor_search import build_neighbor_list, minimum_image
+from plotting import add_plot_argument, finish_figure, get_pyplot
+from rdf_minimum import locate_first_minimum
+from structure_pipeline import StructurePipeline
+from trajectory_io import add_frame_arguments, frame_boxes, frames_from_args, iter_frames
+
 class ADFAnalyzer:
     """
     Angular Distribution Function analyzer for molecular dynamics trajectories
@@ -36,21 +47,114 @@ class ADFAnalyzer:
             Path to MD trajectory file
         """
         self.trajectory_file = trajectory_file
+        self.trajectory_format = 'auto'
+        self.frame_selection = None
         self.positions = None
+        self.atom_types = None
+        self.box = None
         self.box_dimensions = None
+        self.centers = None
+        self.n_frames = None
+        self._frame_table_cache = None
         self.r1_cutoff = None
+        self.r1_error = None
+        self.r = None
+        self.g_r = None
+        self.adf_range = (0, 180, 1.0)
+        self.angles = None
+        self.adf = None
+        self.partial_adfs = None
+        self.backend = 'numpy'
+        self.workers = 1
+        self.checkpoint_prefix = None
+        self.checkpoint_every = 100
+        self.resume = False
+        self.histogram_store = None
+        self.atom_selection = None
+        self._neighbor_cache = (None, None)
         
-    def load_trajectory(self, file_path):
+    def load_trajectory(self, file_path, fmt='auto', frames=None):
         """
         Load MD trajectory data
         
+        Only the first frame is read here; the analysis methods stream the
+        trajectory frame by frame. Per-frame atom counts and cells are
+        available from the frame index as self.frame_n_atoms and
+        self.frame_boxes, looked up on first access.
+        
         Parameters:
         -----------
         file_path : str
             Path to trajectory file
+        fmt : str
+            'lammps', 'xyz' or 'auto' to detect from file contents
+        frames : slice or list of int
+            Frames to analyze; read by seeking through the sidecar frame
+            index (None analyzes every frame)
+        """
+        self.trajectory_file = file_path
+        self.trajectory_format = fmt
+        self.frame_selection = frames
+        self._frame_table_cache = None
+        self._set_frame(next(iter_frames(file_path, fmt, frames=frames,
+                                         atoms=self.atom_selection)))
+    
+    @property
+    def frame_n_atoms(self):
+        """
+        Atom count of every selected frame, read from the frame index on first use
+        """
+        return self._frame_table()[0]
+    
+    @property
+    def frame_boxes(self):
+        """
+        Lattice vectors of every selected frame, read from the frame index on first use
+        """
+        return self._frame_table()[1]
+    
+    def _frame_table(self):
+        """
+        Per-frame atom counts and cells, looked up once per loaded trajectory
+        
+        Building them needs the full frame index, which a streamed analysis
+        never touches, so load_trajectory does not pay for it up front.
         """
-        # TODO: Implement trajectory loading
-        pass
+        if self._frame_table_cache is None and self.trajectory_file is not None:
+            n_atoms, boxes, _ = frame_boxes(self.trajectory_file, self.trajectory_format,
+                                            self.frame_selection)
+            self._frame_table_cache = (n_atoms, boxes)
+        return self._frame_table_cache or (None, None)
+    
+    def _set_frame(self, frame):
+        """
+        Make frame the current frame of the analyzer
+        """
+        self.positions = frame.positions
+        self.atom_types = frame.types
+        self.box = frame.box
+        # edge lengths for orthorhombic cells, lattice matrix for triclinic ones
+        self.box_dimensions = frame.box.cell
+        # region selections: bonds and angles are counted around these atoms only
+        self.centers = frame.centers
+        self._neighbor_cache = (None, None)
+    
+    def iter_frames(self):
+        """
+        Stream trajectory frames, updating the current-frame attributes
+        
+        Yields:
+        -------
+        frame : Frame
+            Next trajectory frame
+        """
+        n_frames = 0
+        for frame in iter_frames(self.trajectory_file, self.trajectory_format,
+                                 frames=self.frame_selection, atoms=self.atom_selection):
+            self._set_frame(frame)
+            n_frames += 1
+            yield frame
+        self.n_frames = n_frames
     
     def calculate_rdf(self, r_max=10.0, dr=0.1):
         """
@@ -70,12 +174,94 @@ class ADFAnalyzer:
         g_r : np.array
             RDF values
         """
-        # TODO: Implement RDF calculation
-        pass
+        n_bins = int(round(r_max / dr))
+        r_edges = np.arange(n_bins + 1) * dr
+        g_sum = self._binned_rdf_sum(r_max, dr, n_bins)
+        
+        shells = 4.0 / 3.0 * np.pi * (r_edges[1:] ** 3 - r_edges[:-1] ** 3)
+        self.r = 0.5 * (r_edges[1:] + r_edges[:-1])
+        self.g_r = g_sum / (self.n_frames * shells)
+        return self.r, self.g_r
+    
+    def _frame_rdf(self, frame, r_max, dr, n_bins):
+        """
+        Contribution of one frame to the RDF sum
+        """
+        self._set_frame(frame)
+        if frame.centers is None:
+            hist = 2.0 * pair_histogram(frame.positions, self.box_dimensions, r_max, dr, n_bins,
+                                        self.backend)
+        else:
+            # pairs of the central atoms with partners among all atoms
+            nlist = build_neighbor_list(frame.positions, self.box_dimensions, r_max,
+                                        centers=frame.centers)
+            bins = (nlist.distances / dr).astype(np.int64)
+            hist = np.bincount(bins[bins < n_bins], minlength=n_bins)
+        return hist * frame.box.volume / (frame.n_centers * (frame.n_atoms - 1))
     
-    def find_first_minimum(self, r, g_r):
+    def _accumulate(self, frame_function, *args):
         """
-        Find first local minimum in RDF (r1 cutoff)
+        Sum per-frame contributions over the selected frames
+        
+        Frames are split across self.workers processes when workers > 1.
+        With a checkpoint prefix set, running sums are saved every
+        self.checkpoint_every frames and, if self.resume is set, restored
+        so that only frames after the last finished one are processed.
+        
+        Parameters:
+        -----------
+        frame_function : callable
+            Bound method returning the contribution of one frame
+        *args
+            Extra arguments passed to frame_function
+            
+        Returns:
+        --------
+        total : np.array or dict
+            Sum over frames (self.n_frames is set to the frame count)
+        """
+        checkpoint = None
+        if self.checkpoint_prefix is not None:
+            checkpoint = checkpoint_path_for(self.checkpoint_prefix, frame_function,
+                                             self.trajectory_file, self.frame_selection, args,
+                                             self.atom_selection)
+        total, self.n_frames = accumulate_frames(
+            frame_function, self.trajectory_file, self.trajectory_format,
+            self.frame_selection, self.workers, args,
+            checkpoint, self.checkpoint_every, self.resume, self.atom_selection)
+        if self.n_frames == 0:
+            raise ValueError("No frames selected for analysis")
+        return total
+    
+    def _binned_rdf_sum(self, r_max, dr, n_bins):
+        """
+        Frame sum of the RDF histogram, rebinned from the fine store
+        (see RDFAnalyzer._binned_sum)
+        """
+        if self.histogram_store is None or not aligned(dr, FINE_DR):
+            return self._accumulate(self._frame_rdf, r_max, dr, n_bins)
+        store = HistogramStore(self.histogram_store, self.trajectory_file,
+                               self.trajectory_format, self.frame_selection,
+                               self.atom_selection)
+        entry = store.get('rdf')
+        if entry is None or entry['extent'] < n_bins * dr - 0.5 * FINE_DR:
+            n_fine = int(round(n_bins * dr / FINE_DR))
+            extent = n_fine * FINE_DR
+            store.put('rdf', self._accumulate(self._frame_rdf, extent, FINE_DR, n_fine),
+                      self.n_frames, extent)
+            entry = store.get('rdf')
+        self.n_frames = entry['n_frames']
+        return rebin(entry['sum'], FINE_DR, dr, n_bins)
+    
+    def find_first_minimum(self, r, g_r, search_range=None, bandwidth=None):
+        """
+        Find first minimum of RDF (r1 cutoff) on a kernel-smoothed g(r)
+        
+        The accumulated histogram is smoothed with a cross-validated
+        Gaussian kernel and the minimum is refined to sub-bin precision,
+        so noisy g(r) of short runs give a stable r1 without a second pass
+        at another bin width (see rdf_minimum). Its bootstrap uncertainty
+        is stored in self.r1_error.
         
         Parameters:
         -----------
@@ -83,14 +269,43 @@ class ADFAnalyzer:
             Distance array
         g_r : np.array
             RDF values
+        search_range : tuple
+            Range to search for minimum (min_r, max_r); None searches
+            from the first occupied bin to r_max
+        bandwidth : float
+            Smoothing bandwidth (Å); None selects it from the data
             
         Returns:
         --------
         r1 : float
             First coordination sphere cutoff
         """
-        # TODO: Implement first minimum detection
-        pass
+        minimum = locate_first_minimum(r, g_r, search_range, bandwidth)
+        self.r1_error = minimum['error']
+        self.r1_cutoff = minimum['r1']
+        return self.r1_cutoff
+    
+    def neighbor_list(self, r1_cutoff):
+        """
+        Full neighbor list of the current frame within r1 cutoff (cached)
+        
+        Parameters:
+        -----------
+        r1_cutoff : float
+            First coordination sphere cutoff
+            
+        Returns:
+        --------
+        nlist : NeighborList
+            Pairs within r1 in both directions (only around the central
+            atoms if the frame has centers)
+        """
+        cached_cutoff, nlist = self._neighbor_cache
+        if cached_cutoff != r1_cutoff:
+            nlist = build_neighbor_list(self.positions, self.box_dimensions, r1_cutoff,
+                                        half=False, centers=self.centers)
+            self._neighbor_cache = (r1_cutoff, nlist)
+        return nlist
     
     def find_triplets(self, center_atom, r1_cutoff):
         """
@@ -106,10 +321,13 @@ class ADFAnalyzer:
         Returns:
         --------
         triplets : list
-            List of atomic triplets
+            List of atomic triplets (j, center_atom, k) with j < k
         """
-        # TODO: Implement triplet finding
-        pass
+        nlist = self.neighbor_list(r1_cutoff)
+        start, end = nlist.offsets[center_atom], nlist.offsets[center_atom + 1]
+        neighbors = nlist.indices[start:end]
+        j, k = np.triu_indices(len(neighbors), k=1)
+        return [(int(a), center_atom, int(b)) for a, b in zip(neighbors[j], neighbors[k])]
     
     def calculate_angles(self, triplets):
         """
@@ -118,17 +336,91 @@ class ADFAnalyzer:
         Parameters:
         -----------
         triplets : list
-            List of atomic triplets
+            List of atomic triplets (j, i, k) with i the central atom
             
         Returns:
         --------
         angles : np.array
-            Array of calculated angles
+            Array of calculated angles (degrees)
+        """
+        if not triplets:
+            return np.zeros(0)
+        j, i, k = np.array(triplets).T
+        v1 = minimum_image(self.positions[j] - self.positions[i], self.box_dimensions)
+        v2 = minimum_image(self.positions[k] - self.positions[i], self.box_dimensions)
+        cos_theta = np.einsum('ij,ij->i', v1, v2) / (
+            np.linalg.norm(v1, axis=1) * np.linalg.norm(v2, axis=1))
+        return np.degrees(np.arccos(np.clip(cos_theta, -1.0, 1.0)))
+    
+    def _angle_histograms(self, angle_min, angle_max, d_angle, coordination_numbers=None):
+        """
+        Accumulate angle histograms over the trajectory
+        
+        Returns the total histogram and, if coordination_numbers is given,
+        one histogram per coordination number of the central atom. With a
+        histogram store path set (self.histogram_store), the histograms are
+        accumulated once over 0-180 degrees at FINE_D_ANGLE and rebinned
+        from the store for any d_angle and range on that grid. The stored
+        histograms are reused while r1 stays within its error bar
+        (self.r1_error, at least FINE_DR) of the r1 they were accumulated
+        with, so retuning --dr or --r_max does not force a reread;
+        self.r1_cutoff is then set to the stored r1.
+        """
+        if self.r1_cutoff is None:
+            raise ValueError("r1 cutoff is not set; call find_first_minimum first")
+        n_bins = int(round((angle_max - angle_min) / d_angle))
+        wanted = tuple(coordination_numbers or ())
+        if self.histogram_store is None or not (aligned(d_angle, FINE_D_ANGLE)
+                                                and aligned(angle_min, FINE_D_ANGLE)):
+            return self._accumulate(self._frame_angle_histograms, angle_min, angle_max,
+                                    n_bins, wanted)
+        
+        store = HistogramStore(self.histogram_store, self.trajectory_file,
+                               self.trajectory_format, self.frame_selection,
+                               self.atom_selection)
+        entry = store.get('adf')
+        tolerance = max(self.r1_error or 0.0, FINE_DR)
+        if entry is not None and abs(entry['r1_cutoff'] - self.r1_cutoff) > tolerance:
+            entry = None
+        stored = tuple(entry['sum'][1]) if entry is not None else ()
+        if entry is None or not set(wanted) <= set(stored):
+            classes = tuple(sorted(set(wanted) | set(stored)))
+            n_fine = int(round(180.0 / FINE_D_ANGLE))
+            total = self._accumulate(self._frame_angle_histograms, 0.0, 180.0, n_fine, classes)
+            store.put('adf', total, self.n_frames, 180.0, {'r1_cutoff': self.r1_cutoff})
+            entry = store.get('adf')
+        self.r1_cutoff = entry['r1_cutoff']
+        self.n_frames = entry['n_frames']
+        hist, partial = entry['sum']
+        return (rebin(hist, FINE_D_ANGLE, d_angle, n_bins, angle_min),
+                {cn: rebin(partial[cn], FINE_D_ANGLE, d_angle, n_bins, angle_min)
+                 for cn in wanted})
+    
+    def _frame_angle_histograms(self, frame, angle_min, angle_max, n_bins, coordination_numbers):
+        """
+        Contribution of one frame to the angle histograms
+        
+        All angles of the frame are binned at once from its neighbor list
+        (angle_kernels), without building per-atom triplet lists.
         """
-        # TODO: Implement angle calculation
-        pass
+        self._set_frame(frame)
+        nlist = self.neighbor_list(self.r1_cutoff)
+        if not coordination_numbers:
+            return angle_histogram(nlist, angle_min, angle_max, n_bins), {}
+        # the r1 list gives the coordination labels; one keyed pass bins all classes
+        hist, by_class = coordination_angle_histograms(nlist, angle_min, angle_max, n_bins,
+                                                       nlist.counts(), coordination_numbers)
+        return hist, dict(zip(coordination_numbers, by_class))
     
-    def calculate_adf(self, angle_min=0, angle_max=180, d_angle=1.0):
+    @staticmethod
+    def _normalize_adf(hist, d_angle):
+        """
+        Normalize angle histogram to unit area
+        """
+        total = hist.sum()
+        return hist / (total * d_angle) if total > 0 else hist
+    
+    def calculate_adf(self, angle_min=0, angle_max=180, d_angle=1.0, coordination_numbers=None):
         """
         Calculate Angular Distribution Function
         
@@ -140,6 +432,9 @@ class ADFAnalyzer:
             Maximum angle (degrees)
         d_angle : float
             Angle bin width (degrees)
+        coordination_numbers : list
+            If given, the partial ADFs of these coordination numbers are
+            filled into self.partial_adfs in the same pass
             
         Returns:
         --------
@@ -148,8 +443,15 @@ class ADFAnalyzer:
         adf : np.array
             ADF values
         """
-        # TODO: Implement ADF calculation
-        pass
+        hist, partial = self._angle_histograms(angle_min, angle_max, d_angle,
+                                               coordination_numbers)
+        self.adf_range = (angle_min, angle_max, d_angle)
+        self.angles = angle_min + (np.arange(len(hist)) + 0.5) * d_angle
+        self.adf = self._normalize_adf(hist, d_angle)
+        if coordination_numbers:
+            self.partial_adfs = {cn: self._normalize_adf(h, d_angle)
+                                 for cn, h in partial.items()}
+        return self.angles, self.adf
     
     def calculate_partial_adf(self, coordination_numbers):
         """
@@ -165,10 +467,90 @@ class ADFAnalyzer:
         partial_adfs : dict
             Dictionary of partial ADFs by coordination number
         """
-        # TODO: Implement partial ADF calculation
-        pass
+        angle_min, angle_max, d_angle = self.adf_range
+        _, partial = self._angle_histograms(angle_min, angle_max, d_angle,
+                                            coordination_numbers)
+        self.partial_adfs = {cn: self._normalize_adf(hist, d_angle)
+                             for cn, hist in partial.items()}
+        return self.partial_adfs
+    
+    def follow_trajectory(self, output_file, r_max=10.0, dr=0.1, angle_min=0, angle_max=180,
+                          d_angle=1.0, coordination_numbers=(), save_interval=30.0,
+                          poll_interval=2.0, idle_timeout=None):
+        """
+        Analyze a trajectory while the simulation is still writing it
+        
+        Every complete frame is processed once as it appears and the running
+        RDF, ADF and partial ADFs are rewritten with save_data each time the
+        analysis catches up with the simulation. The r1 cutoff must be set
+        beforehand (e.g. from the frames already written) and stays fixed.
+        
+        Parameters:
+        -----------
+        output_file : str
+            Output file, rewritten with save_data on every update
+        r_max : float
+            Maximum distance for RDF calculation
+        dr : float
+            Distance bin width
+        angle_min, angle_max : float
+            ADF range (degrees)
+        d_angle : float
+            Angle bin width (degrees)
+        coordination_numbers : list
+            Coordination numbers for partial ADFs
+        save_interval : float
+            Minimum seconds between rewrites while frames keep arriving
+        poll_interval : float
+            Seconds between checks for new frames
+        idle_timeout : float
+            Stop after this many seconds without a new frame (None follows
+            until interrupted)
+            
+        Returns:
+        --------
+        angles : np.array
+            Angle array
+        adf : np.array
+            ADF values over all frames processed
+        """
+        if self.r1_cutoff is None:
+            raise ValueError("r1 cutoff is not set; call find_first_minimum first")
+        n_bins = int(round(r_max / dr))
+        r_edges = np.arange(n_bins + 1) * dr
+        shells = 4.0 / 3.0 * np.pi * (r_edges[1:] ** 3 - r_edges[:-1] ** 3)
+        n_angle_bins = int(round((angle_max - angle_min) / d_angle))
+        self.adf_range = (angle_min, angle_max, d_angle)
+        self.r = 0.5 * (r_edges[1:] + r_edges[:-1])
+        self.angles = angle_min + (np.arange(n_angle_bins) + 0.5) * d_angle
+        
+        def update(sums, n_frames):
+            g_sum, (hist, partial) = sums
+            self.g_r = g_sum / (n_frames * shells)
+            self.adf = self._normalize_adf(hist, d_angle)
+            self.partial_adfs = {cn: self._normalize_adf(h, d_angle) for cn, h in partial.items()}
+            self.save_data(output_file)
+            print(f"{n_frames} frames analyzed", flush=True)
+        
+        args = (r_max, dr, n_bins, angle_min, angle_max, n_angle_bins,
+                tuple(coordination_numbers))
+        _, self.n_frames = follow_accumulate(
+            self._frame_follow, self.trajectory_file, update, self.trajectory_format, args,
+            save_interval, poll_interval, idle_timeout, self.atom_selection)
+        if self.n_frames == 0:
+            raise ValueError("No frames found in trajectory")
+        return self.angles, self.adf
+    
+    def _frame_follow(self, frame, r_max, dr, n_bins, angle_min, angle_max, n_angle_bins,
+                      coordination_numbers):
+        """
+        Contributions of one frame to the followed RDF and angle histograms
+        """
+        g_sum = self._frame_rdf(frame, r_max, dr, n_bins)
+        return g_sum, self._frame_angle_histograms(frame, angle_min, angle_max, n_angle_bins,
+                                                   coordination_numbers)
     
-    def plot_results(self, save_plots=True):
+    def plot_results(self, save_plots=True, output_file='adf.png'):
         """
         Plot RDF and ADF results
         
@@ -176,9 +558,27 @@ class ADFAnalyzer:
         -----------
         save_plots : bool
             Whether to save plots to files
+        output_file : str
+            Image file for the saved plot
         """
-        # TODO: Implement plotting
-        pass
+        plt = get_pyplot()
+        fig, (ax_rdf, ax_adf) = plt.subplots(1, 2, figsize=(10, 4))
+        if self.g_r is not None:
+            ax_rdf.plot(self.r, self.g_r, 'k-')
+            if self.r1_cutoff is not None:
+                ax_rdf.axvline(self.r1_cutoff, color='gray', ls='--',
+                               label=f'r1 = {self.r1_cutoff:.2f} Å')
+                ax_rdf.legend()
+        ax_rdf.set_xlabel('r (Å)')
+        ax_rdf.set_ylabel('g(r)')
+        if self.adf is not None:
+            ax_adf.plot(self.angles, self.adf, 'k-', label='total')
+            for cn, adf in (self.partial_adfs or {}).items():
+                ax_adf.plot(self.angles, adf, label=f'CN = {cn}')
+            ax_adf.legend()
+        ax_adf.set_xlabel('angle (degrees)')
+        ax_adf.set_ylabel('ADF')
+        finish_figure(fig, output_file, save_plots)
     
     def save_data(self, output_file):
         """
@@ -187,10 +587,28 @@ class ADFAnalyzer:
         Parameters:
         -----------
         output_file : str
-            Output file path
+            Output file path; the ADF columns are written here and the RDF
+            to the same name with '_rdf' before the extension
         """
-        # TODO: Implement data saving
-        pass
+        root, ext = os.path.splitext(output_file)
+        tables = []
+        if self.adf is not None:
+            columns = [self.angles, self.adf]
+            header = 'angle adf'
+            for cn, adf in (self.partial_adfs or {}).items():
+                columns.append(adf)
+                header += f' adf_cn{cn}'
+            tables.append((output_file, columns, header))
+        if self.g_r is not None:
+            header = 'r g_r' if self.r1_cutoff is None else f'r g_r (r1 = {self.r1_cutoff:.4f})'
+            tables.append((f"{root}_rdf{ext}", [self.r, self.g_r], header))
+        
+        for path, columns, header in tables:
+            # rename into place so follow-mode readers never see partial files
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w') as handle:
+                np.savetxt(handle, np.column_stack(columns), header=header)
+            os.replace(tmp_path, path)
 
 def main():
     """
@@ -203,32 +621,72 @@ def main():
     parser.add_argument('--angle_max', type=float, default=180.0, help='Maximum angle')
     parser.add_argument('--d_angle', type=float, default=1.0, help='Angle bin width')
     parser.add_argument('--output', default='adf_results.dat', help='Output file')
+    parser.add_argument('--r1_frames', type=int, default=10,
+                        help='Frames sampled to estimate r1')
+    parser.add_argument('--workers', type=int, default=1, help='Number of worker processes')
+    add_backend_argument(parser)
+    add_frame_arguments(parser)
+    add_selection_argument(parser)
+    add_checkpoint_arguments(parser)
+    add_follow_arguments(parser)
+    add_plot_argument(parser)
+    add_histogram_store_arguments(parser)
     
     args = parser.parse_args()
     
     # Initialize analyzer
     analyzer = ADFAnalyzer(args.trajectory)
+    analyzer.backend = args.backend
+    analyzer.workers = args.workers
+    analyzer.histogram_store = histogram_store_path(args)
+    analyzer.atom_selection = atoms_from_args(args)
+    if args.checkpoint_every or args.resume:
+        analyzer.checkpoint_prefix = args.output
+        analyzer.checkpoint_every = args.checkpoint_every or analyzer.checkpoint_every
+        analyzer.resume = args.resume
     
-    # Perform analysis
-    print("Loading trajectory...")
-    analyzer.load_trajectory(args.trajectory)
+    coordination_numbers = [4, 6, 8, 12]  # Common coordination numbers
+    if args.follow:
+        print("Loading trajectory...")
+        analyzer.load_trajectory(args.trajectory, frames=frames_from_args(args))
+        print("Calculating RDF...")
+        r, g_r = analyzer.calculate_rdf(args.r_max, args.dr)
+        r1 = analyzer.find_first_minimum(r, g_r)
+        print(f"First coordination sphere cutoff: {r1:.3f} ± {analyzer.r1_error:.3f} Å")
+        print("Following trajectory (Ctrl-C to stop)...")
+        analyzer.follow_trajectory(args.output, args.r_max, args.dr, 0, args.angle_max,
+                                   args.d_angle, coordination_numbers, args.save_interval,
+                                   args.poll_interval, args.idle_timeout)
+        print("Analysis complete!")
+        return
     
-    print("Calculating RDF...")
-    r, g_r = analyzer.calculate_rdf(args.r_max, args.dr)
+    # RDF and ADFs come from one pass of the single-pass pipeline
+    pipeline = StructurePipeline(args.trajectory)
+    for name in ('backend', 'workers', 'histogram_store', 'atom_selection',
+                 'checkpoint_prefix', 'checkpoint_every', 'resume'):
+        setattr(pipeline, name, getattr(analyzer, name))
     
-    print("Finding first coordination sphere...")
-    r1 = analyzer.find_first_minimum(r, g_r)
-    print(f"First coordination sphere cutoff: {r1:.3f} Å")
+    print("Loading trajectory...")
+    pipeline.load_trajectory(args.trajectory, frames=frames_from_args(args))
     
-    print("Calculating ADF...")
-    angles, adf = analyzer.calculate_adf(0, args.angle_max, args.d_angle)
+    print("Estimating first coordination sphere from frame subsample...")
+    r1 = pipeline.estimate_r1(args.r_max, args.dr, args.r1_frames)
+    print(f"First coordination sphere cutoff: {r1:.3f} ± {pipeline.r1_error:.3f} Å")
     
-    print("Calculating partial ADFs...")
-    coordination_numbers = [4, 6, 8, 12]  # Common coordination numbers
-    partial_adfs = analyzer.calculate_partial_adf(coordination_numbers)
+    print("Calculating RDF and total and partial ADFs in a single pass...")
+    results = pipeline.run(args.r_max, args.dr, r1, adf=True, angle_max=args.angle_max,
+                           d_angle=args.d_angle, adf_coordinations=coordination_numbers)
+    if results['r1_cutoff'] != r1:
+        print(f"Reused stored ADF histograms for r1 = {results['r1_cutoff']:.3f} Å")
+    analyzer.r, analyzer.g_r = results['r'], results['g_r']
+    analyzer.r1_cutoff, analyzer.r1_error = results['r1_cutoff'], pipeline.r1_error
+    analyzer.angles, analyzer.adf = results['angles'], results['adf']
+    analyzer.partial_adfs = results['partial_adfs']
+    analyzer.adf_range = (0.0, args.angle_max, args.d_angle)
     
-    print("Plotting results...")
-    analyzer.plot_results()
+    if not args.no_plot:
+        print("Plotting results...")
+        analyzer.plot_results(output_file=f"{os.path.splitext(args.output)[0]}.png")
     
     print("Saving data...")
     analyzer.save_data(args.output)
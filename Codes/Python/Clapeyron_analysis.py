@@ -5,6 +5,9 @@ Clapeyron_analysis.py - Melting Properties Analysis from MD Trajectories
 Description:
 Calculate properties of melting from solid/liquid trajectories at same PT conditions.
 Implements Clapeyron equation analysis for phase transitions.
+Either dump trajectories or the thermo output of log.lammps files are read.
+Error bars for ΔH, ΔS, ΔV and dP/dT come from a block bootstrap with block
+lengths set by the autocorrelation time of each run.
 
 Tags: Clapeyron, melting, entropy of melting, latent heat, MD/QMD
 
@@ -13,11 +16,29 @@ University of South Florida
 """
 
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy import constants
-from scipy.optimize import curve_fit
 import argparse
+import csv
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from atom_selection import AtomSelection, add_selection_argument, atoms_from_args
+from plotting import add_plot_argument, finish_figure, get_pyplot
+from time_series import (block_average, block_size, bootstrap_means, detect_equilibration,
+                         statistical_inefficiency, summarize)
+from thermo_log import UNIT_STYLES, is_thermo_log, read_thermo_log
+from trajectory_io import add_frame_arguments, frames_from_args, iter_frames, resolve_selection
+
+# Per-atom energy columns summed into the frame energy when present in a dump
+ENERGY_COLUMNS = ('c_pe', 'c_ke', 'pe', 'ke')
+
+# Exact SI constants (scipy.constants is not imported to keep start-up fast)
+BOLTZMANN = 1.380649e-23      # J/K
+AVOGADRO = 6.02214076e23      # 1/mol
+
+# Trajectories are in LAMMPS metal units (eV, Angstrom)
+EV = 1.602176634e-19          # J
+ANGSTROM3 = 1e-30             # m³
 
 class ClapeyronAnalyzer:
     """
@@ -32,10 +53,15 @@ class ClapeyronAnalyzer:
         self.liquid_data = {}
         self.temperature = None
         self.pressure = None
-        self.kb = constants.Boltzmann  # Boltzmann constant
-        self.na = constants.Avogadro   # Avogadro's number
+        self.molar_mass = None
+        self.results = {}
+        self.statistics = {}
+        self.state_points = []
+        self.atom_selection = None
+        self.kb = BOLTZMANN  # Boltzmann constant
+        self.na = AVOGADRO   # Avogadro's number
         
-    def load_solid_trajectory(self, file_path, format='lammps'):
+    def load_solid_trajectory(self, file_path, format='lammps', frames=None):
         """
         Load solid phase trajectory data
         
@@ -44,12 +70,13 @@ class ClapeyronAnalyzer:
         file_path : str
             Path to solid trajectory file
         format : str
-            File format ('lammps', 'xyz', etc.)
+            File format ('lammps', 'xyz', 'log' for LAMMPS thermo logs, etc.)
+        frames : slice or list of int
+            Frames to use, e.g. slice(1000, None) to drop equilibration
         """
-        # TODO: Implement solid trajectory loading
-        pass
+        self.solid_data = self._load_phase_trajectory(file_path, format, frames)
     
-    def load_liquid_trajectory(self, file_path, format='lammps'):
+    def load_liquid_trajectory(self, file_path, format='lammps', frames=None):
         """
         Load liquid phase trajectory data
         
@@ -58,10 +85,171 @@ class ClapeyronAnalyzer:
         file_path : str
             Path to liquid trajectory file
         format : str
-            File format ('lammps', 'xyz', etc.)
+            File format ('lammps', 'xyz', 'log' for LAMMPS thermo logs, etc.)
+        frames : slice or list of int
+            Frames to use, e.g. slice(1000, None) to drop equilibration
+        """
+        self.liquid_data = self._load_phase_trajectory(file_path, format, frames)
+    
+    def _load_phase_trajectory(self, file_path, format, frames=None):
+        """
+        Stream a trajectory and keep only per-frame scalar series
+        
+        Frames are read one at a time, so memory use depends on the number of
+        frames only through a few floats per frame. Positions of the last frame
+        are kept for the density calculation.
+        
+        With self.atom_selection set, energies and atom counts are those of
+        the selected atoms and every frame contributes the cell volume per
+        atom times the selected count, so volume and density stay those of
+        the whole cell while enthalpies are per selected atom.
+        
+        Parameters:
+        -----------
+        file_path : str
+            Path to trajectory file
+        format : str
+            File format ('lammps', 'xyz'); LAMMPS logs are read with
+            _load_phase_log
+        frames : slice or list of int
+            Frames to read (None reads all frames)
+            
+        Returns:
+        --------
+        data : dict
+            Per-frame 'volumes', 'energies', 'pressures', 'n_atoms' and
+            'timesteps', plus 'positions' and mean 'volume'; 'energies' is
+            None if no frame has per-atom energies, and a ValueError is raised
+            if only some frames have them
+        """
+        if format == 'log' or is_thermo_log(file_path):
+            if self.atom_selection is not None:
+                raise ValueError(f"Atom selections need per-atom data; {file_path} is a "
+                                 f"thermo log")
+            return self._load_phase_log(file_path, frames)
+        volumes, energies, n_atoms, timesteps = [], [], [], []
+        frame = None
+        for frame in iter_frames(file_path, format, properties=ENERGY_COLUMNS,
+                                 frames=frames):
+            n_total = frame.n_atoms
+            if self.atom_selection is not None:
+                frame = self.atom_selection.subset(frame)
+            volumes.append(frame.box.volume * frame.n_atoms / n_total)
+            n_atoms.append(frame.n_atoms)
+            timesteps.append(frame.timestep)
+            # NaN keeps the energies aligned with the other per-frame series
+            energies.append(sum(values.sum() for values in frame.properties.values())
+                            if frame.properties else np.nan)
+        if frame is None:
+            raise ValueError(f"No frames found in {file_path}")
+        
+        energies = np.array(energies)
+        missing = np.isnan(energies)
+        if missing.all():
+            energies = None
+        elif missing.any():
+            raise ValueError(f"{missing.sum()} of {len(energies)} frames in {file_path} have no "
+                             f"per-atom energy columns")
+        volumes = np.array(volumes)
+        pressure = np.nan if self.pressure is None else self.pressure
+        return {
+            'positions': frame.positions,
+            'volume': volumes.mean(),
+            'volumes': volumes,
+            # dumps carry no pressure; NPT runs sit at the target pressure
+            'pressures': np.full(len(volumes), pressure),
+            'energies': energies,
+            'n_atoms': np.array(n_atoms),
+            'timesteps': np.array(timesteps),
+        }
+    
+    def _load_phase_log(self, file_path, frames=None):
+        """
+        Read per-frame scalar series from the thermo output of a LAMMPS log
+        
+        Only the Step, energy, Press, Volume and (if printed) Atoms columns
+        are parsed, so no per-atom data is ever touched. Rows of all run
+        blocks are concatenated; frames select rows. Energies are TotEng (or
+        PotEng + KinEng) and pressures the instantaneous Press column,
+        converted from the log's unit style to eV and Pa.
+        
+        Parameters:
+        -----------
+        file_path : str
+            Path to log.lammps
+        frames : slice or list of int
+            Thermo rows to use (None uses all rows)
+            
+        Returns:
+        --------
+        data : dict
+            Same keys as _load_phase_trajectory ('positions' is None)
+        """
+        with open(file_path, 'rb') as handle:
+            header = None
+            for line in handle:
+                if line.split()[:1] == [b'Step']:
+                    header = line.decode().split()
+                    break
+        if header is None:
+            raise ValueError(f"No thermo output found in {file_path}")
+        energy = ['TotEng'] if 'TotEng' in header else ['PotEng', 'KinEng']
+        thermo = read_thermo_log(file_path, ['Step', *energy, 'Press', 'Volume', 'Atoms'])
+        if thermo['units'] not in UNIT_STYLES:
+            raise ValueError(f"Unsupported LAMMPS unit style '{thermo['units']}' "
+                             f"(supported: {', '.join(UNIT_STYLES)})")
+        scale = UNIT_STYLES[thermo['units']]
+        
+        rows = resolve_selection(len(thermo['Step']), frames)
+        volumes = thermo['Volume'][rows]
+        return {
+            'positions': None,
+            'volume': volumes.mean(),
+            'volumes': volumes,
+            'pressures': thermo['Press'][rows] * scale['pressure'],
+            'energies': sum(thermo[name][rows] for name in energy) * scale['energy'],
+            'n_atoms': thermo['Atoms'][rows],
+            'timesteps': thermo['Step'][rows].astype(np.int64),
+        }
+    
+    def trim_equilibration(self, data):
+        """
+        Drop the non-equilibrated start of a phase run in place
+        
+        The cutoff is the latest of the equilibration points detected in the
+        per-atom volume and (when energies are present) enthalpy series, so
+        every later average, fluctuation and bootstrap estimate uses the
+        production region only.
+        
+        Parameters:
+        -----------
+        data : dict
+            Phase data from _load_phase_trajectory (solid_data or liquid_data)
+            
+        Returns:
+        --------
+        equilibration : dict
+            't0' (frames dropped), 'timestep' of the first production frame,
+            and per series the statistical inefficiency 'g_<name>' and
+            effective sample size 'n_eff_<name>' of the production region
         """
-        # TODO: Implement liquid trajectory loading
-        pass
+        series = {'volume': data['volumes'] / data['n_atoms']}
+        if data['energies'] is not None:
+            series['enthalpy'] = self.calculate_enthalpy(data['energies'], data['pressures'],
+                                                         data['volumes'], data['n_atoms'])
+        t0 = max(detect_equilibration(x)[0] for x in series.values())
+        
+        for key in ('volumes', 'pressures', 'energies', 'n_atoms', 'timesteps'):
+            if data[key] is not None:
+                data[key] = data[key][t0:]
+        data['volume'] = data['volumes'].mean()
+        equilibration = {'t0': t0, 'timestep': int(data['timesteps'][0])}
+        for name, x in series.items():
+            g = statistical_inefficiency(x[t0:])
+            equilibration[f'g_{name}'] = g
+            equilibration[f'n_eff_{name}'] = (len(x) - t0) / g
+        data['equilibration'] = equilibration
+        return equilibration
     
     def calculate_density(self, positions, box_volume):
         """
@@ -69,8 +257,8 @@ class ClapeyronAnalyzer:
         
         Parameters:
         -----------
-        positions : np.array
-            Atomic positions
+        positions : np.array or float
+            Atomic positions, or the number of atoms
         box_volume : float
             Simulation box volume
             
@@ -79,48 +267,77 @@ class ClapeyronAnalyzer:
         density : float
             Density in g/cm³
         """
-        # TODO: Implement density calculation
-        pass
+        if self.molar_mass is None:
+            raise ValueError("Set molar_mass (g/mol) before calculating densities")
+        n_atoms = len(positions) if np.ndim(positions) == 2 else positions
+        return n_atoms * self.molar_mass / self.na / (box_volume * 1e-24)
     
-    def calculate_enthalpy(self, energies, pressures, volumes):
+    def calculate_enthalpy(self, energies, pressures, volumes, n_atoms=None):
         """
         Calculate enthalpy H = E + PV
         
         Parameters:
         -----------
         energies : np.array
-            Total energies
+            Total energies (eV)
         pressures : np.array
-            Pressures
+            Pressures (Pa)
         volumes : np.array
-            Volumes
+            Volumes (Å³)
+        n_atoms : np.array or int
+            Atoms per frame; if given, the enthalpy per atom is returned
             
         Returns:
         --------
         enthalpy : np.array
-            Enthalpy values
+            Enthalpy values (eV, or eV/atom)
         """
-        # TODO: Implement enthalpy calculation
-        pass
+        if energies is None:
+            raise ValueError(f"Trajectory has no per-atom energy columns ({', '.join(ENERGY_COLUMNS)})")
+        enthalpy = np.asarray(energies) + np.asarray(pressures) * np.asarray(volumes) * ANGSTROM3 / EV
+        if n_atoms is not None:
+            enthalpy = enthalpy / n_atoms
+        return enthalpy
     
-    def calculate_heat_capacity(self, energies, temperature):
+    def calculate_heat_capacity(self, energies, temperature, n_atoms=None, equilibrate=True):
         """
         Calculate heat capacity from energy fluctuations
         
+        C = <δE²> / (kB T²); NVT energies give Cv, NPT enthalpies give Cp.
+        The variance is taken over the production region after the detected
+        equilibration cutoff, and its error over the effective number of
+        independent samples N_eff, δ<δE²> ≈ <δE²> sqrt(2 / N_eff).
+        
         Parameters:
         -----------
         energies : np.array
-            Total energies
+            Total energies (or enthalpies) per frame (eV)
         temperature : float
             Temperature in K
+        n_atoms : int
+            Atoms in the system; if given, the molar heat capacity per mole
+            of atoms is returned
+        equilibrate : bool
+            Detect and drop the equilibration period first
             
         Returns:
         --------
         cv : float
-            Heat capacity at constant volume
+            Heat capacity (J/K, or J/mol·K with n_atoms)
+        cv_error : float
+            Statistical error of cv
         """
-        # TODO: Implement heat capacity calculation using fluctuation theorem
-        pass
+        energies = np.asarray(energies, dtype=np.float64) * EV
+        if equilibrate:
+            t0, g, n_effective = detect_equilibration(energies)
+            energies = energies[t0:]
+        else:
+            g = statistical_inefficiency(energies)
+            n_effective = len(energies) / g
+        cv = np.var(energies, ddof=1) / (self.kb * temperature ** 2)
+        if n_atoms is not None:
+            cv *= self.na / np.mean(n_atoms)
+        return cv, cv * np.sqrt(2.0 / max(n_effective, 1.0))
     
     def calculate_latent_heat(self, solid_enthalpy, liquid_enthalpy):
         """
@@ -129,17 +346,16 @@ class ClapeyronAnalyzer:
         Parameters:
         -----------
         solid_enthalpy : float
-            Average enthalpy of solid phase
+            Average enthalpy of solid phase (eV/atom)
         liquid_enthalpy : float
-            Average enthalpy of liquid phase
+            Average enthalpy of liquid phase (eV/atom)
             
         Returns:
         --------
         latent_heat : float
             Latent heat of melting (J/mol)
         """
-        # TODO: Implement latent heat calculation
-        pass
+        return (liquid_enthalpy - solid_enthalpy) * EV * self.na
     
     def calculate_entropy_of_melting(self, latent_heat, melting_temperature):
         """
@@ -177,8 +393,7 @@ class ClapeyronAnalyzer:
         delta_v : float
             Molar volume change (m³/mol)
         """
-        # TODO: Implement volume change calculation
-        pass
+        return (molar_mass / liquid_density - molar_mass / solid_density) * 1e-6
     
     def calculate_clapeyron_slope(self, entropy_melting, volume_change):
         """
@@ -198,6 +413,151 @@ class ClapeyronAnalyzer:
         """
         return entropy_melting / volume_change
     
+    def estimate_uncertainties(self, n_resamples=1000, confidence=0.95, seed=None):
+        """
+        Block-bootstrap error bars for ΔH, ΔS, ΔV and dP/dT
+        
+        Per-atom enthalpy and volume series of each phase are averaged over
+        blocks of twice their statistical inefficiency (from the FFT
+        autocorrelation), so block means are effectively independent. All
+        bootstrap resamples are drawn at once as an (n_resamples, n_blocks)
+        index array; enthalpy and volume share the picks, which keeps their
+        correlation in the ratio dP/dT = ΔS/ΔV.
+        
+        Parameters:
+        -----------
+        n_resamples : int
+            Number of bootstrap resamples
+        confidence : float
+            Confidence level of the reported intervals
+        seed : int
+            Random seed for reproducible error bars
+            
+        Returns:
+        --------
+        uncertainties : dict
+            'delta_h' (J/mol), 'delta_s' (J/mol·K), 'delta_v' (m³/mol),
+            'dp_dt' (Pa/K) and the molar enthalpies 'solid_enthalpy' and
+            'liquid_enthalpy' (J/mol), each a dict with 'value', 'error' and
+            'ci', plus
+            'solid' and 'liquid' dicts with the statistical inefficiencies
+            of enthalpy and volume, block size and number of blocks
+        """
+        rng = np.random.default_rng(seed)
+        uncertainties = {}
+        means, resampled = {}, {}
+        for phase, data in (('solid', self.solid_data), ('liquid', self.liquid_data)):
+            enthalpy = self.calculate_enthalpy(data['energies'], data['pressures'],
+                                               data['volumes'], data['n_atoms'])
+            volume = data['volumes'] / data['n_atoms']
+            g_h = statistical_inefficiency(enthalpy)
+            g_v = statistical_inefficiency(volume)
+            size = block_size(max(g_h, g_v))
+            blocks = block_average(np.column_stack([enthalpy, volume]), size)
+            means[phase] = np.array([enthalpy.mean(), volume.mean()])
+            resampled[phase] = bootstrap_means(blocks, n_resamples, rng)
+            uncertainties[phase] = {
+                'g_enthalpy': g_h, 'g_volume': g_v,
+                'block_size': size, 'n_blocks': len(blocks),
+            }
+        
+        # columns: enthalpy (eV/atom), volume (Å³/atom); last row is the point estimate
+        delta = np.vstack([resampled['liquid'] - resampled['solid'],
+                           means['liquid'] - means['solid']])
+        delta_h = delta[:, 0] * EV * self.na
+        delta_v = delta[:, 1] * ANGSTROM3 * self.na
+        delta_s = delta_h / self.temperature
+        samples = {'delta_h': delta_h, 'delta_s': delta_s, 'delta_v': delta_v,
+                   'dp_dt': delta_s / delta_v}
+        for phase in ('solid', 'liquid'):
+            samples[f'{phase}_enthalpy'] = np.append(resampled[phase][:, 0],
+                                                     means[phase][0]) * EV * self.na
+        for name, values in samples.items():
+            uncertainties[name] = summarize(values[:-1], values[-1], confidence)
+        return uncertainties
+    
+    def analyze(self, n_resamples=1000, seed=None, equilibrate=True):
+        """
+        Melting properties of the loaded solid/liquid pair in one call
+        
+        Parameters:
+        -----------
+        n_resamples : int
+            Bootstrap resamples for error bars (0 skips them)
+        seed : int
+            Random seed for the bootstrap
+        equilibrate : bool
+            Drop the detected equilibration period of each run first
+            
+        Returns:
+        --------
+        results : dict
+            Densities, molar enthalpies of both phases, 'delta_h',
+            'delta_s', 'delta_v' and 'dp_dt'; with error bars all but the
+            densities are dicts from estimate_uncertainties
+        """
+        if equilibrate:
+            for data in (self.solid_data, self.liquid_data):
+                self.trim_equilibration(data)
+        densities, enthalpies = [], []
+        for data in (self.solid_data, self.liquid_data):
+            densities.append(self.calculate_density(np.mean(data['n_atoms']), data['volume']))
+            enthalpies.append(np.mean(self.calculate_enthalpy(
+                data['energies'], data['pressures'], data['volumes'], data['n_atoms'])))
+        latent_heat = self.calculate_latent_heat(*enthalpies)
+        entropy_melting = self.calculate_entropy_of_melting(latent_heat, self.temperature)
+        volume_change = self.calculate_volume_change(*densities, self.molar_mass)
+        self.results = {
+            'solid_density': densities[0], 'liquid_density': densities[1],
+            'solid_enthalpy': enthalpies[0] * EV * self.na,
+            'liquid_enthalpy': enthalpies[1] * EV * self.na,
+            'delta_h': latent_heat, 'delta_s': entropy_melting, 'delta_v': volume_change,
+            'dp_dt': self.calculate_clapeyron_slope(entropy_melting, volume_change),
+        }
+        if n_resamples > 0:
+            uncertainties = self.estimate_uncertainties(n_resamples, seed=seed)
+            self.statistics = {phase: uncertainties.pop(phase) for phase in ('solid', 'liquid')}
+            self.results.update(uncertainties)
+        return self.results
+    
+    def run_batch(self, points, workers=1, n_resamples=1000, seed=None, equilibrate=True):
+        """
+        Analyze many solid/liquid state points concurrently
+        
+        Every point is loaded and analyzed in its own worker process, so
+        interpreter and SciPy start-up are paid once per worker rather than
+        once per point.
+        
+        Parameters:
+        -----------
+        points : list of dict
+            State points from read_manifest
+        workers : int
+            Number of worker processes
+        n_resamples : int
+            Bootstrap resamples per point (0 skips error bars)
+        seed : int
+            Base random seed; point i uses seed + i
+        equilibrate : bool
+            Drop the detected equilibration period of each run
+            
+        Returns:
+        --------
+        state_points : list of dict
+            Per-point 'temperature', 'pressure' and analyze() results,
+            sorted by pressure and temperature
+        """
+        seeds = [None if seed is None else seed + i for i in range(len(points))]
+        jobs = [(point, n_resamples, point_seed, equilibrate)
+                for point, point_seed in zip(points, seeds)]
+        if workers > 1 and len(points) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(points))) as pool:
+                results = list(pool.map(analyze_state_point, *zip(*jobs)))
+        else:
+            results = [analyze_state_point(*job) for job in jobs]
+        self.state_points = sorted(results, key=lambda r: (r['pressure'], r['temperature']))
+        return self.state_points
+    
     def fit_melting_curve(self, temperatures, pressures):
         """
         Fit melting curve using Clapeyron equation
@@ -214,27 +574,133 @@ class ClapeyronAnalyzer:
         fit_params : tuple
             Fitted parameters (slope, intercept)
         """
-        # TODO: Implement melting curve fitting
-        pass
+        from scipy.optimize import curve_fit
+        popt, _ = curve_fit(lambda t, slope, intercept: slope * t + intercept,
+                            np.asarray(temperatures, dtype=float),
+                            np.asarray(pressures, dtype=float))
+        return tuple(popt)
     
-    def calculate_thermodynamic_integration(self, solid_data, liquid_data):
+    def calculate_thermodynamic_integration(self, solid_data, liquid_data, reference_temperature,
+                                            reference_delta_g, reference_error=0.0,
+                                            temperatures=None, method='trapezoid',
+                                            n_suggestions=3):
         """
         Calculate free energy difference using thermodynamic integration
         
+        Integrates the Gibbs-Helmholtz equation d(G/T)/dT = -H/T² of each
+        phase along an isobar from a reference point where ΔG = G_liquid -
+        G_solid is known (e.g. from Einstein crystal / Frenkel-Ladd runs):
+        ΔG(T)/T = ΔG_ref/T_ref - ∫ [H_l(T') - H_s(T')] / T'² dT'.
+        H/T² is interpolated through the state points by a linear
+        ('trapezoid') or quadratic ('simpson') spline. Since the integral is
+        linear in the enthalpies, it is built once as a weight matrix
+        W[grid T, state point], so ΔG on the whole grid and its propagated
+        error are single matrix products.
+        
         Parameters:
         -----------
         solid_data : dict
-            Solid phase thermodynamic data
+            Solid phase along the isobar: 'temperatures' (K), 'enthalpies'
+            (J/mol) and optionally 'enthalpy_errors' (J/mol)
         liquid_data : dict
-            Liquid phase thermodynamic data
+            Liquid phase data, same keys (its temperatures may differ)
+        reference_temperature : float
+            Temperature where ΔG is known (K)
+        reference_delta_g : float
+            ΔG at the reference temperature (J/mol)
+        reference_error : float
+            Uncertainty of the reference ΔG (J/mol)
+        temperatures : np.array
+            Grid to evaluate ΔG on (default: 201 points over the range
+            covered by both phases)
+        method : str
+            'trapezoid' or 'simpson'
+        n_suggestions : int
+            Number of new state points to suggest
             
         Returns:
         --------
-        delta_g : float
-            Gibbs free energy difference
+        delta_g : dict
+            'temperatures', 'delta_g' and 'delta_g_error' (J/mol) on the
+            grid; 'melting_temperature' and its 'melting_temperature_error'
+            (NaN if ΔG does not change sign); 'suggested_temperatures' for new
+            state points (midpoints between the state points of both phases)
+            with the estimated 'quadrature_errors' (J/mol) of ΔG they would
+            cut, largest first
         """
-        # TODO: Implement thermodynamic integration
-        pass
+        from scipy.interpolate import make_interp_spline
+        from scipy.optimize import brentq
+        degree = {'trapezoid': 1, 'simpson': 2}[method]
+        phases = []
+        for name, data in (('solid', solid_data), ('liquid', liquid_data)):
+            order = np.argsort(data['temperatures'])
+            t = np.asarray(data['temperatures'], dtype=float)[order]
+            h = np.asarray(data['enthalpies'], dtype=float)[order]
+            errors = data.get('enthalpy_errors')
+            sigma = np.zeros_like(h) if errors is None else np.asarray(errors, dtype=float)[order]
+            phases.append((name, t, h, sigma))
+        
+        t_min = max(t[0] for _, t, _, _ in phases)
+        t_max = min(t[-1] for _, t, _, _ in phases)
+        if not t_min <= reference_temperature <= t_max:
+            raise ValueError(f"Reference temperature {reference_temperature} K is outside the "
+                             f"range covered by both phases ({t_min}-{t_max} K)")
+        grid = np.linspace(t_min, t_max, 201) if temperatures is None \
+            else np.asarray(temperatures, dtype=float)
+        
+        def weights(t, at, k):
+            # W[j, i] = weight of H_i in the integral of H/T² from T_ref to at[j]
+            k = min(k, len(t) - 1)
+            basis = make_interp_spline(t, np.diag(1.0 / t ** 2), k=k).antiderivative()
+            return basis(at) - basis(reference_temperature)
+        
+        sign = {'solid': -1.0, 'liquid': 1.0}
+        integral = np.zeros_like(grid)
+        variance = np.full_like(grid, (reference_error / reference_temperature) ** 2)
+        # quadrature error of ΔG: this rule against the next one, on the state
+        # points of both phases, so errors of the two phases can cancel
+        nodes = np.unique(np.concatenate([t for _, t, _, _ in phases]))
+        nodes = nodes[(nodes >= t_min) & (nodes <= t_max)]
+        rule_difference = np.zeros_like(nodes)
+        for name, t, h, sigma in phases:
+            w = weights(t, grid, degree)
+            integral += sign[name] * (w @ h)
+            variance += (w ** 2) @ (sigma ** 2)
+            w_other = weights(t, nodes, 2 if degree == 1 else 1)
+            rule_difference += sign[name] * ((weights(t, nodes, degree) - w_other) @ h)
+        # new state points are run as solid/liquid pairs at interval midpoints
+        midpoints = 0.5 * (nodes[1:] + nodes[:-1])
+        suggestions = dict(zip(midpoints, np.abs(np.diff(rule_difference)) * midpoints))
+        
+        g_ref = reference_delta_g / reference_temperature
+        delta_g = grid * (g_ref - integral)
+        delta_g_error = grid * np.sqrt(variance)
+        
+        melting_temperature = melting_error = np.nan
+        crossing = np.flatnonzero(np.sign(delta_g[:-1]) * np.sign(delta_g[1:]) <= 0)
+        if len(crossing):
+            def delta_g_at(temperature):
+                total = sum(sign[name] * (weights(t, np.atleast_1d(temperature), degree) @ h)[0]
+                            for name, t, h, _ in phases)
+                return temperature * (g_ref - total)
+            
+            j = crossing[0]
+            melting_temperature = grid[j] if delta_g[j] == 0 else \
+                brentq(delta_g_at, grid[j], grid[j + 1])
+            # σ_Tm = σ_ΔG / |dΔG/dT| = σ_ΔG / |ΔS|
+            slope = np.gradient(delta_g, grid)[j]
+            melting_error = abs(np.interp(melting_temperature, grid, delta_g_error) / slope)
+        
+        ranked = sorted(suggestions, key=suggestions.get, reverse=True)[:n_suggestions]
+        return {
+            'temperatures': grid,
+            'delta_g': delta_g,
+            'delta_g_error': delta_g_error,
+            'melting_temperature': melting_temperature,
+            'melting_temperature_error': melting_error,
+            'suggested_temperatures': np.array(ranked),
+            'quadrature_errors': np.array([suggestions[mid] for mid in ranked]),
+        }
     
     def analyze_phase_coexistence(self, temperature_range):
         """
@@ -248,12 +714,94 @@ class ClapeyronAnalyzer:
         Returns:
         --------
         coexistence_data : dict
-            Phase coexistence analysis results
+            Arrays over the batch state points (from run_batch) inside the
+            range: 'temperatures', 'pressures', 'delta_h', 'delta_v',
+            'dp_dt' and 'dp_dt_error' (NaN without error bars), plus
+            'fit' (slope, intercept) of the P(T) points when they span more
+            than one temperature and pressure
         """
-        # TODO: Implement phase coexistence analysis
-        pass
+        t_min, t_max = temperature_range
+        points = [p for p in self.state_points if t_min <= p['temperature'] <= t_max]
+        
+        def column(name, key='value'):
+            return np.array([p[name][key] if isinstance(p[name], dict) else
+                             (p[name] if key == 'value' else np.nan) for p in points])
+        
+        coexistence_data = {
+            'temperatures': np.array([p['temperature'] for p in points]),
+            'pressures': np.array([p['pressure'] for p in points]),
+            'delta_h': column('delta_h'),
+            'delta_v': column('delta_v'),
+            'dp_dt': column('dp_dt'),
+            'dp_dt_error': column('dp_dt', 'error'),
+        }
+        if len(set(coexistence_data['temperatures'])) >= 2 \
+                and np.ptp(coexistence_data['pressures']) > 0:
+            coexistence_data['fit'] = self.fit_melting_curve(coexistence_data['temperatures'],
+                                                             coexistence_data['pressures'])
+        return coexistence_data
     
-    def plot_phase_diagram(self, temperatures, pressures, save_plot=True):
+    def integrate_isobars(self, method='trapezoid'):
+        """
+        Thermodynamic integration along every isobar of a batch run
+        
+        Isobars need two or more state points, one of which carries a
+        reference 'delta_g' from the manifest.
+        
+        Parameters:
+        -----------
+        method : str
+            Quadrature passed to calculate_thermodynamic_integration
+            
+        Returns:
+        --------
+        isobars : dict
+            Pressure (Pa) -> calculate_thermodynamic_integration result
+        """
+        isobars = {}
+        for pressure in sorted({p['pressure'] for p in self.state_points}):
+            points = [p for p in self.state_points if p['pressure'] == pressure]
+            references = [p for p in points if p.get('delta_g') is not None]
+            if len(points) < 2 or not references:
+                continue
+            phases = []
+            for phase in ('solid', 'liquid'):
+                values = [p[f'{phase}_enthalpy'] for p in points]
+                phases.append({
+                    'temperatures': [p['temperature'] for p in points],
+                    'enthalpies': [v['value'] if isinstance(v, dict) else v for v in values],
+                    'enthalpy_errors': [v['error'] if isinstance(v, dict) else 0.0 for v in values],
+                })
+            reference = references[0]
+            isobars[pressure] = self.calculate_thermodynamic_integration(
+                *phases, reference['temperature'], reference['delta_g'],
+                reference.get('delta_g_error') or 0.0, method=method)
+        return isobars
+    
+    def save_melting_curve(self, output_file):
+        """
+        Save per-state-point melting properties of a batch run
+        
+        Parameters:
+        -----------
+        output_file : str
+            Output file prefix; the table goes to <output_file>_melting_curve.dat
+        """
+        names = ('delta_h', 'delta_s', 'delta_v', 'dp_dt')
+        rows = []
+        for point in self.state_points:
+            row = [point['temperature'], point['pressure']]
+            for name in names:
+                value = point[name]
+                row += [value['value'], value['error']] if isinstance(value, dict) \
+                    else [value, np.nan]
+            rows.append(row)
+        header = 'T(K) P(Pa) dH(J/mol) dH_err dS(J/mol/K) dS_err dV(m3/mol) dV_err ' \
+                 'dPdT(Pa/K) dPdT_err'
+        np.savetxt(f"{output_file}_melting_curve.dat", np.array(rows), header=header)
+    
+    def plot_phase_diagram(self, temperatures, pressures, save_plot=True,
+                           output_file='phase_diagram.png'):
         """
         Plot phase diagram
         
@@ -265,21 +813,65 @@ class ClapeyronAnalyzer:
             Pressure data
         save_plot : bool
             Whether to save plot
+        output_file : str
+            Image file for the saved plot
         """
-        # TODO: Implement phase diagram plotting
-        pass
+        plt = get_pyplot()
+        temperatures = np.asarray(temperatures, dtype=float)
+        pressures = np.asarray(pressures, dtype=float)
+        fig, ax = plt.subplots(figsize=(6, 4))
+        ax.plot(temperatures, pressures * 1e-9, 'ko', label='state points')
+        if len(set(temperatures)) >= 2 and np.ptp(pressures) > 0:
+            slope, intercept = self.fit_melting_curve(temperatures, pressures)
+            t = np.linspace(temperatures.min(), temperatures.max(), 100)
+            ax.plot(t, (slope * t + intercept) * 1e-9, 'r-', label='linear fit')
+        ax.set_xlabel('T (K)')
+        ax.set_ylabel('P (GPa)')
+        ax.legend()
+        finish_figure(fig, output_file, save_plot)
     
-    def plot_thermodynamic_properties(self, save_plot=True):
+    def plot_thermodynamic_properties(self, save_plot=True,
+                                      output_file='clapeyron_properties.png'):
         """
         Plot thermodynamic properties vs temperature
         
+        Batch runs show ΔH, ΔV and dP/dT of every state point; a single
+        solid/liquid pair shows the per-atom enthalpy and volume series of
+        both phases.
+        
         Parameters:
         -----------
         save_plot : bool
             Whether to save plots
+        output_file : str
+            Image file for the saved plot
         """
-        # TODO: Implement thermodynamic properties plotting
-        pass
+        plt = get_pyplot()
+        fig, axes = plt.subplots(1, 3 if self.state_points else 2, figsize=(12, 4))
+        if self.state_points:
+            t = [p['temperature'] for p in self.state_points]
+            for ax, (name, label) in zip(axes, (('delta_h', 'ΔH (J/mol)'),
+                                                ('delta_v', 'ΔV (m³/mol)'),
+                                                ('dp_dt', 'dP/dT (Pa/K)'))):
+                values = [p[name] for p in self.state_points]
+                y = [v['value'] if isinstance(v, dict) else v for v in values]
+                err = [v['error'] if isinstance(v, dict) else 0.0 for v in values]
+                ax.errorbar(t, y, yerr=err, fmt='o')
+                ax.set_xlabel('T (K)')
+                ax.set_ylabel(label)
+        else:
+            for phase, data in (('solid', self.solid_data), ('liquid', self.liquid_data)):
+                if data['energies'] is not None:
+                    axes[0].plot(data['timesteps'], self.calculate_enthalpy(
+                        data['energies'], data['pressures'], data['volumes'], data['n_atoms']),
+                        label=phase)
+                axes[1].plot(data['timesteps'], data['volumes'] / data['n_atoms'], label=phase)
+            axes[0].set_ylabel('H (eV/atom)')
+            axes[1].set_ylabel('V (Å³/atom)')
+            for ax in axes:
+                ax.set_xlabel('timestep')
+                ax.legend()
+        finish_figure(fig, output_file, save_plot)
     
     def save_results(self, output_file):
         """
@@ -290,8 +882,15 @@ class ClapeyronAnalyzer:
         output_file : str
             Output file path
         """
-        # TODO: Implement results saving
-        pass
+        with open(f"{output_file}.dat", 'w') as f:
+            f.write("# quantity value error ci_low ci_high\n")
+            for name, result in self.results.items():
+                if isinstance(result, dict):
+                    low, high = result['ci']
+                    f.write(f"{name} {result['value']:.8e} {result['error']:.8e} "
+                            f"{low:.8e} {high:.8e}\n")
+                else:
+                    f.write(f"{name} {result:.8e} nan nan nan\n")
     
     def generate_report(self):
         """
@@ -302,85 +901,273 @@ class ClapeyronAnalyzer:
         report : str
             Analysis report
         """
-        # TODO: Implement report generation
-        pass
+        units = {'solid_density': 'g/cm³', 'liquid_density': 'g/cm³', 'delta_h': 'J/mol',
+                 'solid_enthalpy': 'J/mol', 'liquid_enthalpy': 'J/mol',
+                 'delta_s': 'J/mol·K', 'delta_v': 'm³/mol', 'dp_dt': 'Pa/K'}
+        lines = ["Clapeyron analysis report",
+                 f"Temperature: {self.temperature} K",
+                 f"Pressure: {self.pressure} Pa", ""]
+        for name, result in self.results.items():
+            unit = units.get(name, '')
+            if isinstance(result, dict):
+                low, high = result['ci']
+                lines.append(f"{name}: {result['value']:.6e} ± {result['error']:.2e} {unit} "
+                             f"(CI {low:.6e} .. {high:.6e})")
+            else:
+                lines.append(f"{name}: {result:.6e} {unit}")
+        for phase in ('solid', 'liquid'):
+            stats = self.statistics.get(phase)
+            if stats:
+                lines.append(f"{phase}: statistical inefficiency g(H) = {stats['g_enthalpy']:.2f}, "
+                             f"g(V) = {stats['g_volume']:.2f}; {stats['n_blocks']} blocks "
+                             f"of {stats['block_size']} frames")
+        return "\n".join(lines) + "\n"
+
+def read_manifest(manifest_path, molar_mass=None, fmt='lammps'):
+    """
+    Read the state points of a batch run from a CSV or YAML manifest
+    
+    Each entry needs 'solid', 'liquid', 'temperature' (K) and 'pressure'
+    (Pa); 'molar_mass', 'format', 'start', 'stop', 'stride', an atom
+    selection 'select' (see atom_selection) and a known
+    ΔG = G_liquid - G_solid ('delta_g', 'delta_g_error' in J/mol) that
+    anchors the thermodynamic integration of an isobar are optional. A YAML manifest is a list of such mappings or a mapping with
+    a 'points' list. Relative paths are taken relative to the manifest.
+    
+    Parameters:
+    -----------
+    manifest_path : str
+        Path to .csv, .yaml or .yml manifest
+    molar_mass : float
+        Molar mass for entries that do not give one (g/mol)
+    fmt : str
+        Trajectory format for entries that do not give one
+        
+    Returns:
+    --------
+    points : list of dict
+        'solid', 'liquid', 'temperature', 'pressure', 'molar_mass',
+        'format', 'frames', 'select' and the optional thermodynamic integration
+        reference 'delta_g' and 'delta_g_error' (J/mol) of each state point
+    """
+    if manifest_path.endswith(('.yaml', '.yml')):
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("YAML manifests need PyYAML (pip install pyyaml); "
+                              "use a CSV manifest instead") from None
+        with open(manifest_path) as f:
+            entries = yaml.safe_load(f)
+        if isinstance(entries, dict):
+            entries = entries['points']
+    else:
+        with open(manifest_path, newline='') as f:
+            entries = list(csv.DictReader(row for row in f if not row.startswith('#')))
+    
+    def optional(entry, key, convert):
+        value = entry.get(key)
+        return None if value in (None, '') else convert(value)
+    
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    points = []
+    for entry in entries:
+        frames = slice(optional(entry, 'start', int), optional(entry, 'stop', int),
+                       optional(entry, 'stride', int))
+        point = {
+            'solid': os.path.join(base, str(entry['solid']).strip()),
+            'liquid': os.path.join(base, str(entry['liquid']).strip()),
+            'temperature': float(entry['temperature']),
+            'pressure': float(entry['pressure']),
+            'molar_mass': optional(entry, 'molar_mass', float) or molar_mass,
+            'format': optional(entry, 'format', str) or fmt,
+            'frames': None if frames == slice(None) else frames,
+            'select': optional(entry, 'select', str),
+            'delta_g': optional(entry, 'delta_g', float),
+            'delta_g_error': optional(entry, 'delta_g_error', float),
+        }
+        if point['molar_mass'] is None:
+            raise ValueError(f"No molar mass for state point {point['solid']}; "
+                             f"add a molar_mass column or pass --molar_mass")
+        points.append(point)
+    return points
+
+def analyze_state_point(point, n_resamples=1000, seed=None, equilibrate=True):
+    """
+    Analyze one manifest state point (module level so worker processes can run it)
+    
+    Returns:
+    --------
+    results : dict
+        'temperature', 'pressure', 'solid', 'liquid' and analyze() results
+    """
+    analyzer = ClapeyronAnalyzer()
+    analyzer.temperature = point['temperature']
+    analyzer.pressure = point['pressure']
+    analyzer.molar_mass = point['molar_mass']
+    if point.get('select'):
+        analyzer.atom_selection = AtomSelection(point['select'])
+    analyzer.load_solid_trajectory(point['solid'], point['format'], point['frames'])
+    analyzer.load_liquid_trajectory(point['liquid'], point['format'], point['frames'])
+    results = analyzer.analyze(n_resamples, seed, equilibrate)
+    return {'temperature': point['temperature'], 'pressure': point['pressure'],
+            'solid': point['solid'], 'liquid': point['liquid'], 'delta_g': point['delta_g'],
+            'delta_g_error': point['delta_g_error'], **results}
+
+def run_batch_mode(args):
+    """
+    Command line batch mode: analyze every manifest state point
+    """
+    points = read_manifest(args.manifest, args.molar_mass, args.format)
+    for point in points:
+        point['select'] = point['select'] or args.select
+    print(f"Analyzing {len(points)} state points with {args.workers} worker(s)...")
+    analyzer = ClapeyronAnalyzer()
+    state_points = analyzer.run_batch(points, args.workers, args.n_resamples, args.seed,
+                                      not args.no_equilibration)
+    
+    print(f"{'T (K)':>10} {'P (Pa)':>12} {'ΔH (J/mol)':>22} {'ΔV (m³/mol)':>22} "
+          f"{'dP/dT (Pa/K)':>22}")
+    for point in state_points:
+        cells = []
+        for name in ('delta_h', 'delta_v', 'dp_dt'):
+            value = point[name]
+            cells.append(f"{value['value']:.4e} ± {value['error']:.1e}"
+                         if isinstance(value, dict) else f"{value:.4e}")
+        print(f"{point['temperature']:>10.1f} {point['pressure']:>12.4e} "
+              + ' '.join(f"{cell:>22}" for cell in cells))
+    
+    coexistence = analyzer.analyze_phase_coexistence((-np.inf, np.inf))
+    if 'fit' in coexistence:
+        slope, intercept = coexistence['fit']
+        print(f"Melting curve fit: P = {slope:.4e} Pa/K * T + {intercept:.4e} Pa")
+    
+    analyzer.save_melting_curve(args.output)
+    print(f"Melting curve saved to {args.output}_melting_curve.dat")
+    if not args.no_plot:
+        analyzer.plot_phase_diagram([p['temperature'] for p in state_points],
+                                    [p['pressure'] for p in state_points],
+                                    output_file=f"{args.output}_phase_diagram.png")
+        analyzer.plot_thermodynamic_properties(output_file=f"{args.output}_properties.png")
+    
+    isobars = analyzer.integrate_isobars(args.ti_method)
+    rows = []
+    for pressure, ti in isobars.items():
+        print(f"Isobar {pressure:.4e} Pa: Tm = {ti['melting_temperature']:.2f} ± "
+              f"{ti['melting_temperature_error']:.2f} K (thermodynamic integration)")
+        suggested = ', '.join(f"{t:.1f} K (~{err:.1f} J/mol)" for t, err in
+                              zip(ti['suggested_temperatures'], ti['quadrature_errors']))
+        print(f"  Next state points to run: {suggested}")
+        rows.append(np.column_stack([np.full(len(ti['temperatures']), pressure),
+                                     ti['temperatures'], ti['delta_g'], ti['delta_g_error']]))
+    if rows:
+        np.savetxt(f"{args.output}_delta_g.dat", np.vstack(rows),
+                   header='P(Pa) T(K) dG(J/mol) dG_err(J/mol)')
+        print(f"ΔG(T) along isobars saved to {args.output}_delta_g.dat")
 
 def main():
     """
     Main function for command line usage
     """
     parser = argparse.ArgumentParser(description='Clapeyron Equation Analysis for Melting')
-    parser.add_argument('solid_traj', help='Solid phase trajectory file')
-    parser.add_argument('liquid_traj', help='Liquid phase trajectory file')
-    parser.add_argument('--temperature', type=float, required=True, help='Temperature (K)')
-    parser.add_argument('--pressure', type=float, required=True, help='Pressure (Pa)')
-    parser.add_argument('--molar_mass', type=float, required=True, help='Molar mass (g/mol)')
+    parser.add_argument('solid_traj', nargs='?', help='Solid phase trajectory file or log.lammps')
+    parser.add_argument('liquid_traj', nargs='?', help='Liquid phase trajectory file or log.lammps')
+    parser.add_argument('--temperature', type=float, help='Temperature (K)')
+    parser.add_argument('--pressure', type=float, help='Pressure (Pa)')
+    parser.add_argument('--molar_mass', type=float, help='Molar mass (g/mol)')
+    parser.add_argument('--manifest', default=None,
+                        help='CSV/YAML list of state points to analyze in batch mode')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker processes for batch mode')
+    parser.add_argument('--ti_method', default='trapezoid', choices=['trapezoid', 'simpson'],
+                        help='Quadrature for thermodynamic integration along isobars')
     parser.add_argument('--output', default='clapeyron_results', help='Output file prefix')
-    parser.add_argument('--format', default='lammps', help='Trajectory format')
+    parser.add_argument('--format', default='lammps',
+                        help="Trajectory format ('lammps', 'xyz', 'log'); LAMMPS logs are detected")
+    parser.add_argument('--n_resamples', type=int, default=1000,
+                        help='Bootstrap resamples for error bars (0 disables)')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed for the bootstrap')
+    parser.add_argument('--no_equilibration', action='store_true',
+                        help='Keep all frames instead of dropping the detected equilibration')
+    add_frame_arguments(parser)
+    add_selection_argument(parser)
+    add_plot_argument(parser)
     
     args = parser.parse_args()
     
+    if args.manifest:
+        run_batch_mode(args)
+        return
+    missing = [name for name in ('solid_traj', 'liquid_traj', 'temperature', 'pressure',
+                                 'molar_mass') if getattr(args, name) is None]
+    if missing:
+        parser.error(f"missing {', '.join(missing)} (or use --manifest)")
+    
     # Initialize analyzer
     analyzer = ClapeyronAnalyzer()
     analyzer.temperature = args.temperature
     analyzer.pressure = args.pressure
+    analyzer.molar_mass = args.molar_mass
+    analyzer.atom_selection = atoms_from_args(args)
     
     # Load trajectories
     print("Loading solid phase trajectory...")
-    analyzer.load_solid_trajectory(args.solid_traj, args.format)
+    frames = frames_from_args(args)
+    analyzer.load_solid_trajectory(args.solid_traj, args.format, frames)
     
     print("Loading liquid phase trajectory...")
-    analyzer.load_liquid_trajectory(args.liquid_traj, args.format)
-    
-    # Calculate properties
-    print("Calculating densities...")
-    solid_density = analyzer.calculate_density(
-        analyzer.solid_data['positions'], 
-        analyzer.solid_data['volume']
-    )
-    liquid_density = analyzer.calculate_density(
-        analyzer.liquid_data['positions'], 
-        analyzer.liquid_data['volume']
-    )
-    
-    print(f"Solid density: {solid_density:.3f} g/cm³")
-    print(f"Liquid density: {liquid_density:.3f} g/cm³")
-    
-    print("Calculating enthalpies...")
-    solid_enthalpy = analyzer.calculate_enthalpy(
-        analyzer.solid_data['energies'],
-        analyzer.solid_data['pressures'],
-        analyzer.solid_data['volumes']
-    )
-    liquid_enthalpy = analyzer.calculate_enthalpy(
-        analyzer.liquid_data['energies'],
-        analyzer.liquid_data['pressures'],
-        analyzer.liquid_data['volumes']
-    )
-    
-    print("Calculating latent heat...")
-    latent_heat = analyzer.calculate_latent_heat(
-        np.mean(solid_enthalpy), 
-        np.mean(liquid_enthalpy)
-    )
-    print(f"Latent heat of melting: {latent_heat:.2f} J/mol")
-    
-    print("Calculating entropy of melting...")
-    entropy_melting = analyzer.calculate_entropy_of_melting(latent_heat, args.temperature)
-    print(f"Entropy of melting: {entropy_melting:.2f} J/mol·K")
-    
-    print("Calculating volume change...")
-    volume_change = analyzer.calculate_volume_change(
-        solid_density, liquid_density, args.molar_mass
-    )
-    print(f"Molar volume change: {volume_change:.2e} m³/mol")
-    
-    print("Calculating Clapeyron slope...")
-    dp_dt = analyzer.calculate_clapeyron_slope(entropy_melting, volume_change)
-    print(f"Clapeyron slope (dP/dT): {dp_dt:.2e} Pa/K")
-    
-    print("Plotting results...")
-    analyzer.plot_thermodynamic_properties()
+    analyzer.load_liquid_trajectory(args.liquid_traj, args.format, frames)
+    
+    if not args.no_equilibration:
+        print("Detecting equilibration...")
+        for phase, data in (('Solid', analyzer.solid_data), ('Liquid', analyzer.liquid_data)):
+            equilibration = analyzer.trim_equilibration(data)
+            n_eff = ', '.join(f"{name[6:]} {value:.0f}" for name, value in equilibration.items()
+                              if name.startswith('n_eff_'))
+            print(f"{phase}: production from frame {equilibration['t0']} "
+                  f"(timestep {equilibration['timestep']}), effective samples: {n_eff}")
+    
+    # Calculate properties (equilibration was trimmed above)
+    print("Calculating melting properties...")
+    results = analyzer.analyze(args.n_resamples, args.seed, equilibrate=False)
+    
+    def value(name):
+        result = results[name]
+        return result['value'] if isinstance(result, dict) else result
+    
+    print(f"Solid density: {value('solid_density'):.3f} g/cm³")
+    print(f"Liquid density: {value('liquid_density'):.3f} g/cm³")
+    for phase, data in (('Solid', analyzer.solid_data), ('Liquid', analyzer.liquid_data)):
+        enthalpy = analyzer.calculate_enthalpy(data['energies'], data['pressures'],
+                                               data['volumes'], data['n_atoms'])
+        cp, cp_error = analyzer.calculate_heat_capacity(enthalpy * data['n_atoms'],
+                                                        args.temperature, data['n_atoms'],
+                                                        equilibrate=False)
+        print(f"{phase} heat capacity (enthalpy fluctuations): {cp:.2f} ± {cp_error:.2f} J/mol·K")
+    print(f"Latent heat of melting: {value('delta_h'):.2f} J/mol")
+    print(f"Entropy of melting: {value('delta_s'):.2f} J/mol·K")
+    print(f"Molar volume change: {value('delta_v'):.2e} m³/mol")
+    print(f"Clapeyron slope (dP/dT): {value('dp_dt'):.2e} Pa/K")
+    
+    if args.n_resamples > 0:
+        print("Block-bootstrap uncertainties:")
+        for phase in ('solid', 'liquid'):
+            stats = analyzer.statistics[phase]
+            print(f"{phase.capitalize()}: statistical inefficiency g(H) = {stats['g_enthalpy']:.2f}, "
+                  f"g(V) = {stats['g_volume']:.2f}, {stats['n_blocks']} blocks of "
+                  f"{stats['block_size']} frames")
+            if stats['n_blocks'] < 10:
+                print(f"Warning: only {stats['n_blocks']} independent blocks in the {phase} "
+                      f"run; error bars are unreliable")
+        for name, label, unit in (('delta_h', 'ΔH', 'J/mol'), ('delta_s', 'ΔS', 'J/mol·K'),
+                                  ('delta_v', 'ΔV', 'm³/mol'), ('dp_dt', 'dP/dT', 'Pa/K')):
+            result = results[name]
+            low, high = result['ci']
+            print(f"{label} = {result['value']:.4e} ± {result['error']:.2e} {unit} "
+                  f"(95% CI {low:.4e} .. {high:.4e})")
+    
+    if not args.no_plot:
+        print("Plotting results...")
+        analyzer.plot_thermodynamic_properties(output_file=f"{args.output}_properties.png")
     
     print("Saving results...")
     analyzer.save_results(args.output)
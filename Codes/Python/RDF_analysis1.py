@@ -13,12 +13,22 @@ University of South Florida
 """
 
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.spatial.distance import cdist
-from scipy.signal import find_peaks, argrelmin
 import argparse
+import os
 import sys
 
+from atom_selection import add_selection_argument, atoms_from_args
+from coordination_series import SERIES_SUFFIX, CoordinationSeries, CoordinationWriter
+from frame_parallel import (accumulate_frames, add_checkpoint_arguments, add_follow_arguments,
+                            checkpoint_path_for, follow_accumulate)
+from histogram_backends import add_backend_argument, pair_histogram
+from histogram_store import (FINE_DR, HistogramStore, add_histogram_store_arguments, aligned,
+                             histogram_store_path, rebin)
+from neighbor_search import build_neighbor_list, wrap_positions
+from plotting import add_plot_argument, finish_figure, get_pyplot
+from rdf_minimum import locate_first_minimum
+from trajectory_io import add_frame_arguments, frame_boxes, frames_from_args, iter_frames
+
 class RDFAnalyzer:
     """
     Radial Distribution Function analyzer for molecular dynamics trajectories
@@ -34,23 +44,112 @@ class RDFAnalyzer:
             Path to MD trajectory file
         """
         self.trajectory_file = trajectory_file
+        self.trajectory_format = 'auto'
+        self.frame_selection = None
         self.positions = None
         self.atom_types = None
+        self.box = None
         self.box_dimensions = None
         self.n_atoms = None
+        self.centers = None
+        self.n_centers = None
         self.n_frames = None
+        self._frame_table_cache = None
+        self.r1_error = None
+        self.backend = 'numpy'
+        self.workers = 1
+        self.checkpoint_prefix = None
+        self.checkpoint_every = 100
+        self.resume = False
+        self.histogram_store = None
+        self.atom_selection = None
         
-    def load_trajectory(self, file_path):
+    def load_trajectory(self, file_path, fmt='auto', frames=None):
         """
         Load MD trajectory data
         
+        Only the first frame is read here; the analysis methods stream the
+        trajectory frame by frame, so memory use does not grow with its length.
+        The atom count and cell of every selected frame are available from
+        the frame index as self.frame_n_atoms and self.frame_boxes, looked up
+        on first access; box and atom count may change from frame to frame
+        (NPT, grand canonical), and every frame is normalized with its own
+        density.
+        
         Parameters:
         -----------
         file_path : str
             Path to trajectory file (LAMMPS dump, XYZ, etc.)
+        fmt : str
+            'lammps', 'xyz' or 'auto' to detect from file contents
+        frames : slice or list of int
+            Frames to analyze; read by seeking through the sidecar frame
+            index (None analyzes every frame)
+        """
+        self.trajectory_file = file_path
+        self.trajectory_format = fmt
+        self.frame_selection = frames
+        self._frame_table_cache = None
+        self._set_frame(next(iter_frames(file_path, fmt, frames=frames,
+                                         atoms=self.atom_selection)))
+    
+    @property
+    def frame_n_atoms(self):
+        """
+        Atom count of every selected frame, read from the frame index on first use
         """
-        # TODO: Implement trajectory loading for different formats
-        pass
+        return self._frame_table()[0]
+    
+    @property
+    def frame_boxes(self):
+        """
+        Lattice vectors of every selected frame, read from the frame index on first use
+        """
+        return self._frame_table()[1]
+    
+    def _frame_table(self):
+        """
+        Per-frame atom counts and cells, looked up once per loaded trajectory
+        
+        Building them needs the full frame index, which a streamed analysis
+        never touches, so load_trajectory does not pay for it up front.
+        """
+        if self._frame_table_cache is None and self.trajectory_file is not None:
+            n_atoms, boxes, _ = frame_boxes(self.trajectory_file, self.trajectory_format,
+                                            self.frame_selection)
+            self._frame_table_cache = (n_atoms, boxes)
+        return self._frame_table_cache or (None, None)
+    
+    def _set_frame(self, frame):
+        """
+        Make frame the current frame of the analyzer
+        """
+        self.positions = frame.positions
+        self.atom_types = frame.types
+        self.box = frame.box
+        # edge lengths for orthorhombic cells, lattice matrix for triclinic ones
+        self.box_dimensions = frame.box.cell
+        self.n_atoms = frame.n_atoms
+        # region selections: pairs are counted around these atoms only
+        self.centers = frame.centers
+        self.n_centers = frame.n_centers
+    
+    def iter_frames(self):
+        """
+        Stream trajectory frames, updating the current-frame attributes
+        
+        Yields:
+        -------
+        frame : Frame
+            Next trajectory frame
+        """
+        n_frames = 0
+        for frame in iter_frames(self.trajectory_file, self.trajectory_format,
+                                 frames=self.frame_selection, atoms=self.atom_selection):
+            self._set_frame(frame)
+            n_frames += 1
+            yield frame
+        self.n_frames = n_frames
     
     def apply_periodic_boundary(self, positions):
         """
@@ -66,30 +165,227 @@ class RDFAnalyzer:
         corrected_positions : np.array
             Positions with PBC applied
         """
-        # TODO: Implement PBC correction
-        pass
+        return wrap_positions(positions, self.box_dimensions)
     
-    def calculate_distances(self, frame_positions):
+    def calculate_distances(self, frame_positions, cutoff=10.0, half=True):
         """
-        Calculate all pairwise distances for a frame
+        Calculate pairwise distances within a cutoff for a frame
+        
+        Only pairs closer than cutoff are returned, found with a periodic
+        cell list, so memory and time scale linearly with the number of atoms.
+        If the current frame has centers (region selection), only the pairs
+        around them are searched, as a full list.
         
         Parameters:
         -----------
         frame_positions : np.array
             Positions for single frame
+        cutoff : float
+            Maximum pair distance
+        half : bool
+            Store each pair once (i < j) instead of in both directions
+            
+        Returns:
+        --------
+        nlist : NeighborList
+            Pairs within cutoff in CSR form (offsets, indices, distances)
+        """
+        return build_neighbor_list(frame_positions, self.box_dimensions, cutoff, half,
+                                   self.centers)
+    
+    def _center_values(self, values):
+        """
+        Per-atom values of the central atoms of the current frame
+        """
+        return values if self.centers is None else values[self.centers]
+    
+    def _pair_normalization(self, type_pairs=None):
+        """
+        Number of ordered (central atom, partner) pairs per unit volume in
+        the current frame
+        
+        Parameters:
+        -----------
+        type_pairs : list of tuples
+            Atom type pairs, or None for all atoms
+            
+        Returns:
+        --------
+        pair_density : float
+            (C_A * (N_B - delta_AB) + C_B * N_A * (1 - delta_AB)) / V summed
+            over type pairs, with C the central and N all atoms of a type
+        """
+        volume = self.box.volume
+        if type_pairs is None:
+            return self.n_centers * (self.n_atoms - 1) / volume
+        types, counts = np.unique(self.atom_types, return_counts=True)
+        n_of = dict(zip(types.tolist(), counts.tolist()))
+        types, counts = np.unique(self._center_values(self.atom_types), return_counts=True)
+        c_of = dict(zip(types.tolist(), counts.tolist()))
+        total = 0.0
+        for a, b in type_pairs:
+            n_a, n_b = n_of.get(a, 0), n_of.get(b, 0)
+            c_a, c_b = c_of.get(a, 0), c_of.get(b, 0)
+            if a == b:
+                total += c_a * (n_a - 1)
+            else:
+                total += c_a * n_b + c_b * n_a
+        return total / volume
+    
+    @staticmethod
+    def _shell_volumes(r_edges):
+        """
+        Volumes of spherical shells between consecutive bin edges
+        """
+        return 4.0 / 3.0 * np.pi * (r_edges[1:] ** 3 - r_edges[:-1] ** 3)
+    
+    def _pair_type_histogram(self, nlist, dr, n_bins):
+        """
+        Distance histograms of all atom type pairs of the current frame
+        
+        The unordered type pair and the distance bin of every pair are
+        encoded into one flat index, so a single bincount fills the
+        histograms of all K(K+1)/2 type pairs in one pass over the list.
+        
+        Parameters:
+        -----------
+        nlist : NeighborList
+            Half neighbor list of the current frame
+        dr : float
+            Distance bin width
+        n_bins : int
+            Number of bins
+            
+        Returns:
+        --------
+        types : np.array
+            Sorted atom types
+        counts : np.array
+            Number of atoms of every type
+        center_counts : np.array
+            Number of central atoms of every type
+        pair_hist : np.array
+            Ordered pair counts (both directions of a half-list pair),
+            shape (n_pair_types, n_bins), rows ordered as
+            np.triu_indices(len(types))
+        """
+        types, codes, counts = np.unique(self.atom_types, return_inverse=True,
+                                         return_counts=True)
+        center_counts = np.bincount(self._center_values(codes), minlength=len(types))
+        n_types = len(types)
+        n_pair_types = n_types * (n_types + 1) // 2
+        pair_row = np.zeros((n_types, n_types), dtype=np.int64)
+        pair_row[np.triu_indices(n_types)] = np.arange(n_pair_types)
+        
+        code_i = codes[nlist.centers()]
+        code_j = codes[nlist.indices]
+        bins = (nlist.distances / dr).astype(np.int64)
+        keep = bins < n_bins
+        rows = pair_row[np.minimum(code_i, code_j)[keep], np.maximum(code_i, code_j)[keep]]
+        pair_hist = np.bincount(rows * n_bins + bins[keep], minlength=n_pair_types * n_bins)
+        if nlist.half:
+            pair_hist *= 2
+        return types, counts, center_counts, pair_hist.reshape(n_pair_types, n_bins)
+    
+    def _accumulate(self, frame_function, *args):
+        """
+        Sum per-frame contributions over the selected frames
+        
+        Frames are split across self.workers processes when workers > 1.
+        With a checkpoint prefix set, running sums are saved every
+        self.checkpoint_every frames and, if self.resume is set, restored
+        so that only frames after the last finished one are processed.
+        
+        Parameters:
+        -----------
+        frame_function : callable
+            Bound method returning the contribution of one frame
+        *args
+            Extra arguments passed to frame_function
+            
+        Returns:
+        --------
+        total : np.array or dict
+            Sum over frames (self.n_frames is set to the frame count)
+        """
+        checkpoint = None
+        if self.checkpoint_prefix is not None:
+            checkpoint = checkpoint_path_for(self.checkpoint_prefix, frame_function,
+                                             self.trajectory_file, self.frame_selection, args,
+                                             self.atom_selection)
+        total, self.n_frames = accumulate_frames(
+            frame_function, self.trajectory_file, self.trajectory_format,
+            self.frame_selection, self.workers, args,
+            checkpoint, self.checkpoint_every, self.resume, self.atom_selection)
+        if self.n_frames == 0:
+            raise ValueError("No frames selected for analysis")
+        return total
+    
+    def _binned_sum(self, name, frame_function, r_max, dr, n_bins, *args):
+        """
+        Frame sum of a distance histogram, rebinned from the fine store
+        
+        With a histogram store path set (self.histogram_store), the sum is
+        accumulated once at FINE_DR up to the largest r_max requested so
+        far and kept in the store; any dr that is a multiple of FINE_DR and
+        any smaller r_max are then served without reading the trajectory.
+        
+        Parameters:
+        -----------
+        name : str
+            Store entry name
+        frame_function : callable
+            Bound method taking (frame, r_max, dr, n_bins, *args)
+        r_max, dr : float
+            Requested range and bin width
+        n_bins : int
+            Number of bins of width dr
+        *args
+            Extra arguments passed to frame_function
             
         Returns:
         --------
-        distances : np.array
-            Pairwise distance matrix
+        total : np.array or dict
+            Sum over frames at bin width dr (self.n_frames is set)
+        """
+        if self.histogram_store is None or not aligned(dr, FINE_DR):
+            return self._accumulate(frame_function, r_max, dr, n_bins, *args)
+        store = HistogramStore(self.histogram_store, self.trajectory_file,
+                               self.trajectory_format, self.frame_selection,
+                               self.atom_selection)
+        entry = store.get(name)
+        if entry is None or entry['extent'] < n_bins * dr - 0.5 * FINE_DR:
+            n_fine = int(round(n_bins * dr / FINE_DR))
+            extent = n_fine * FINE_DR
+            store.put(name, self._accumulate(frame_function, extent, FINE_DR, n_fine, *args),
+                      self.n_frames, extent)
+            entry = store.get(name)
+        self.n_frames = entry['n_frames']
+        return rebin(entry['sum'], FINE_DR, dr, n_bins)
+    
+    @staticmethod
+    def _histogram(distances, dr, n_bins):
+        """
+        Count distances into bins of width dr starting at zero
+        """
+        bins = (distances / dr).astype(np.int64)
+        return np.bincount(bins[bins < n_bins], minlength=n_bins)
+    
+    def _ordered_histogram(self, nlist, dr, n_bins):
+        """
+        Ordered pair counts of a neighbor list in bins of width dr (each
+        pair of a half list counts in both directions)
         """
-        # TODO: Implement distance calculation with PBC
-        pass
+        hist = self._histogram(nlist.distances, dr, n_bins)
+        return 2 * hist if nlist.half else hist
     
     def calculate_rdf(self, r_max=10.0, dr=0.1, atom_pairs=None):
         """
         Calculate radial distribution function
         
+        Every frame is normalized with its own pair density N(N-1)/V before
+        averaging, so the box and atom count may vary between frames.
+        
         Parameters:
         -----------
         r_max : float
@@ -106,13 +402,60 @@ class RDFAnalyzer:
         g_r : np.array
             RDF values
         """
-        # TODO: Implement RDF calculation
-        pass
+        n_bins = int(round(r_max / dr))
+        r_edges = np.arange(n_bins + 1) * dr
+        if atom_pairs is None:
+            g_sum = self._binned_sum('rdf', self._frame_rdf, r_max, dr, n_bins, None)
+        else:
+            g_sum = self._accumulate(self._frame_rdf, r_max, dr, n_bins, atom_pairs)
+        
+        g_r = g_sum / (self.n_frames * self._shell_volumes(r_edges))
+        r = 0.5 * (r_edges[1:] + r_edges[:-1])
+        return r, g_r
+    
+    def _frame_rdf(self, frame, r_max, dr, n_bins, atom_pairs):
+        """
+        Contribution of one frame to the RDF sum
+        """
+        self._set_frame(frame)
+        if atom_pairs is None:
+            return self._pair_histogram(r_max, dr, n_bins) / self._pair_normalization()
+        nlist = self.calculate_distances(frame.positions, r_max)
+        return self._rdf_contribution(nlist, dr, n_bins, atom_pairs)
+    
+    def _pair_histogram(self, r_max, dr, n_bins):
+        """
+        Ordered pair-distance histogram of the current frame from the
+        selected backend (self.backend, see histogram_backends), or from
+        the neighbor list of the central atoms if the frame has centers
+        """
+        if self.centers is not None:
+            return self._ordered_histogram(self.calculate_distances(self.positions, r_max),
+                                           dr, n_bins)
+        return 2 * pair_histogram(self.positions, self.box_dimensions, r_max, dr, n_bins,
+                                  self.backend)
+    
+    def _rdf_contribution(self, nlist, dr, n_bins, atom_pairs=None):
+        """
+        RDF sum contribution of the current frame from its half neighbor list
+        """
+        if atom_pairs is None:
+            hist = self._ordered_histogram(nlist, dr, n_bins)
+        else:
+            types, _, _, pair_hist = self._pair_type_histogram(nlist, dr, n_bins)
+            wanted = {frozenset(pair) for pair in atom_pairs}
+            a, b = np.triu_indices(len(types))
+            rows = [row for row, pair in enumerate(zip(types[a].tolist(), types[b].tolist()))
+                    if frozenset(pair) in wanted]
+            hist = pair_hist[rows].sum(axis=0)
+        return hist / self._pair_normalization(atom_pairs)
     
     def calculate_partial_rdf(self, r_max=10.0, dr=0.1):
         """
         Calculate partial RDFs for all atom type pairs
         
+        Like calculate_rdf, each frame is normalized with its own density.
+        
         Parameters:
         -----------
         r_max : float
@@ -127,12 +470,52 @@ class RDFAnalyzer:
         partial_rdfs : dict
             Dictionary of partial RDFs by atom pair
         """
-        # TODO: Implement partial RDF calculation
-        pass
+        n_bins = int(round(r_max / dr))
+        r_edges = np.arange(n_bins + 1) * dr
+        g_sums = self._binned_sum('partial_rdf', self._frame_partial_rdf, r_max, dr, n_bins)
+        
+        shells = self._shell_volumes(r_edges)
+        partial_rdfs = {pair: g_sum / (self.n_frames * shells)
+                        for pair, g_sum in sorted(g_sums.items())}
+        r = 0.5 * (r_edges[1:] + r_edges[:-1])
+        return r, partial_rdfs
+    
+    def _frame_partial_rdf(self, frame, r_max, dr, n_bins):
+        """
+        Contribution of one frame to the partial RDF sums
+        """
+        self._set_frame(frame)
+        nlist = self.calculate_distances(frame.positions, r_max)
+        return self._partial_rdf_contribution(nlist, dr, n_bins)[1]
     
-    def find_first_minimum(self, r, g_r, search_range=(1.0, 5.0)):
+    def _partial_rdf_contribution(self, nlist, dr, n_bins):
         """
-        Find first local minimum in RDF
+        Total and partial RDF sum contributions of the current frame
+        
+        All partials come from one bucketed histogram; the total is their
+        sum weighted by pair density, i.e. the sum of the raw pair counts.
+        """
+        types, counts, center_counts, pair_hist = self._pair_type_histogram(nlist, dr, n_bins)
+        a, b = np.triu_indices(len(types))
+        same = a == b
+        pair_density = (center_counts[a] * (counts[b] - same)
+                        + np.where(same, 0, center_counts[b] * counts[a])) / self.box.volume
+        # type pairs without central atoms (region selections) stay zero
+        g_parts = np.divide(pair_hist, pair_density[:, None], where=pair_density[:, None] > 0,
+                            out=np.zeros(pair_hist.shape))
+        g_total = pair_hist.sum(axis=0) / self._pair_normalization()
+        return g_total, {(types[x].item(), types[y].item()): g
+                         for x, y, g in zip(a, b, g_parts)}
+    
+    def find_first_minimum(self, r, g_r, search_range=None, bandwidth=None):
+        """
+        Find first minimum of RDF (r1 cutoff) on a kernel-smoothed g(r)
+        
+        The accumulated histogram is smoothed with a cross-validated
+        Gaussian kernel and the minimum is refined to sub-bin precision,
+        so noisy g(r) of short runs give a stable r1 without a second pass
+        at another bin width (see rdf_minimum). Its bootstrap uncertainty
+        is stored in self.r1_error.
         
         Parameters:
         -----------
@@ -141,15 +524,19 @@ class RDFAnalyzer:
         g_r : np.array
             RDF values
         search_range : tuple
-            Range to search for minimum (min_r, max_r)
+            Range to search for minimum (min_r, max_r); None searches
+            from the first occupied bin to r_max
+        bandwidth : float
+            Smoothing bandwidth (Å); None selects it from the data
             
         Returns:
         --------
         r1 : float
             Position of first minimum (coordination sphere cutoff)
         """
-        # TODO: Implement first minimum detection
-        pass
+        minimum = locate_first_minimum(r, g_r, search_range, bandwidth)
+        self.r1_error = minimum['error']
+        return minimum['r1']
     
     def calculate_coordination_numbers(self, r1_cutoff):
         """
@@ -162,11 +549,92 @@ class RDFAnalyzer:
             
         Returns:
         --------
-        coord_numbers : np.array
-            Coordination numbers for each atom
+        coord_numbers : np.array or list
+            Coordination numbers for each (central) atom, shape
+            (n_frames, n_atoms); a list of per-frame arrays if the atom
+            count changes
+        """
+        coord_numbers = []
+        for frame in self.iter_frames():
+            nlist = self.calculate_distances(frame.positions, r1_cutoff)
+            coord_numbers.append(self._center_values(nlist.coordination()))
+        if len({len(cn) for cn in coord_numbers}) > 1:
+            return coord_numbers
+        return np.array(coord_numbers)
+    
+    def mean_coordination(self, r1_cutoff):
+        """
+        Average coordination number over all (central) atoms of all
+        selected frames
+        
+        Only the per-frame sums are accumulated, so memory use does not
+        grow with the number of atoms or frames.
+        
+        Parameters:
+        -----------
+        r1_cutoff : float
+            First coordination sphere cutoff distance
+            
+        Returns:
+        --------
+        mean : float
+            Mean coordination number
+        """
+        n_neighbors, n_atoms = self._accumulate(self._frame_coordination_sum, r1_cutoff)
+        return n_neighbors / n_atoms
+    
+    def _frame_coordination_sum(self, frame, r1_cutoff):
+        """
+        Neighbour count and atom count of one frame
+        """
+        self._set_frame(frame)
+        nlist = self.calculate_distances(frame.positions, r1_cutoff)
+        return np.array([float(nlist.coordination().sum()), self.n_centers])
+    
+    def write_coordination_series(self, r1_cutoff, output_file):
+        """
+        Stream the coordination number of every atom at every frame to disk
+        
+        Frames are processed one at a time and appended as uint8 rows
+        (columns in ascending atom ID), so memory use does not grow with
+        the trajectory; see coordination_series for the queries.
+        
+        Parameters:
+        -----------
+        r1_cutoff : float
+            First coordination sphere cutoff distance
+        output_file : str
+            Coordination series file to write
+            
+        Returns:
+        --------
+        series : CoordinationSeries
+            Memory-mapped view of the written file
+        """
+        self._check_series_selection()
+        writer = None
+        try:
+            for frame in self.iter_frames():
+                nlist = self.calculate_distances(frame.positions, r1_cutoff)
+                if writer is None:
+                    ids = frame.ids if frame.ids is not None else np.arange(1, frame.n_atoms + 1)
+                    writer = CoordinationWriter(output_file, ids)
+                writer.write(nlist.coordination(), frame.ids, frame.timestep)
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            raise ValueError("No frames selected for analysis")
+        return CoordinationSeries(output_file)
+    
+    def _check_series_selection(self):
+        """
+        Raise if the atom selection changes the atoms between frames
         """
-        # TODO: Implement coordination number calculation
-        pass
+        if self.atom_selection is not None and not self.atom_selection.is_static:
+            raise ValueError(f"Coordination series need the same atoms in every frame, but "
+                             f"the region in selection '{self.atom_selection.expression}' "
+                             f"changes them; select by type or ID instead")
     
     def analyze_coordination_contributions(self, r1_cutoff, r_max=10.0, dr=0.1):
         """
@@ -186,10 +654,48 @@ class RDFAnalyzer:
         r : np.array
             Distance array
         coord_rdfs : dict
-            RDF contributions by coordination number
+            RDF contributions by coordination number (they sum to g(r))
         """
-        # TODO: Implement coordination-specific RDF analysis
-        pass
+        n_bins = int(round(r_max / dr))
+        r_edges = np.arange(n_bins + 1) * dr
+        g_sums = self._accumulate(self._frame_coordination_rdf, r1_cutoff, r_max, dr, n_bins)
+        
+        shells = self._shell_volumes(r_edges)
+        coord_rdfs = {cn: g_sum / (self.n_frames * shells)
+                      for cn, g_sum in sorted(g_sums.items())}
+        r = 0.5 * (r_edges[1:] + r_edges[:-1])
+        return r, coord_rdfs
+    
+    def _frame_coordination_rdf(self, frame, r1_cutoff, r_max, dr, n_bins):
+        """
+        Contribution of one frame to the coordination-resolved RDF sums
+        """
+        self._set_frame(frame)
+        nlist = self.calculate_distances(frame.positions, max(r_max, r1_cutoff))
+        coordination = nlist.within(r1_cutoff).coordination()
+        return self._coordination_rdf_contribution(nlist, coordination, dr, n_bins)
+    
+    def _coordination_rdf_contribution(self, nlist, coordination, dr, n_bins):
+        """
+        RDF sum contributions of the current frame split by the coordination
+        number of the central atom
+        
+        The coordination label of the central atom and the distance bin of
+        every pair are encoded into one flat index, so a single 2D
+        (coordination, r_bin) bincount fills all classes; a half-list pair
+        is counted once centred on i and once centred on j.
+        """
+        bins = (nlist.distances / dr).astype(np.int64)
+        keep = bins < n_bins
+        bins = bins[keep]
+        n_classes = int(coordination.max(initial=0)) + 1
+        labels = coordination[nlist.centers()[keep]]
+        if nlist.half:
+            labels = np.concatenate([labels, coordination[nlist.indices[keep]]])
+            bins = np.tile(bins, 2)
+        hist = np.bincount(labels * n_bins + bins, minlength=n_classes * n_bins)
+        hist = hist.reshape(n_classes, n_bins) / self._pair_normalization()
+        return {int(cn): hist[cn] for cn in np.unique(self._center_values(coordination))}
     
     def calculate_running_coordination(self, r_max=10.0, dr=0.1):
         """
@@ -207,12 +713,108 @@ class RDFAnalyzer:
         r : np.array
             Distance array
         n_r : np.array
-            Running coordination number
+            Running coordination number (average number of neighbours
+            closer than r)
+        """
+        n_bins = int(round(r_max / dr))
+        r_edges = np.arange(n_bins + 1) * dr
+        n_sum = self._accumulate(self._frame_running_coordination, r_max, dr, n_bins)
+        return r_edges[1:], np.cumsum(n_sum) / self.n_frames
+    
+    def _frame_running_coordination(self, frame, r_max, dr, n_bins):
+        """
+        Contribution of one frame to the running coordination sum
+        """
+        self._set_frame(frame)
+        return self._pair_histogram(r_max, dr, n_bins) / self.n_centers
+    
+    def _running_coordination_contribution(self, nlist, dr, n_bins):
+        """
+        Neighbours per atom in each distance bin for the current frame
+        """
+        return self._ordered_histogram(nlist, dr, n_bins) / self.n_centers
+    
+    def follow_trajectory(self, output_file, r_max=10.0, dr=0.1, partial=False,
+                          save_interval=30.0, poll_interval=2.0, idle_timeout=None):
+        """
+        Analyze a trajectory while the simulation is still writing it
+        
+        Every complete frame is read and neighbor-searched once as it
+        appears; the running g(r), partial RDFs and running coordination
+        number are rewritten to output_file each time the analysis catches
+        up with the simulation. The first minimum and the average
+        coordination number are re-evaluated from the running averages.
+        
+        Parameters:
+        -----------
+        output_file : str
+            Output file, rewritten with save_data on every update
+        r_max : float
+            Maximum distance for RDF calculation
+        dr : float
+            Distance bin width
+        partial : bool
+            Also follow partial RDFs
+        save_interval : float
+            Minimum seconds between rewrites while frames keep arriving
+        poll_interval : float
+            Seconds between checks for new frames
+        idle_timeout : float
+            Stop after this many seconds without a new frame (None follows
+            until interrupted)
+            
+        Returns:
+        --------
+        r : np.array
+            Distance array
+        g_r : np.array
+            RDF values over all frames processed
         """
-        # TODO: Implement running coordination calculation
-        pass
+        n_bins = int(round(r_max / dr))
+        r_edges = np.arange(n_bins + 1) * dr
+        r = 0.5 * (r_edges[1:] + r_edges[:-1])
+        shells = self._shell_volumes(r_edges)
+        
+        def update(sums, n_frames):
+            g_r = sums['g_r'] / (n_frames * shells)
+            n_r = np.cumsum(sums['n_r']) / n_frames
+            partial_rdfs = None
+            if partial:
+                partial_rdfs = {pair: g_sum / (n_frames * shells)
+                                for pair, g_sum in sorted(sums['partial'].items())}
+            self.save_data(output_file, r, g_r, partial_rdfs, running_coordination=n_r)
+            status = f"{n_frames} frames"
+            try:
+                r1 = self.find_first_minimum(r, g_r)
+                status += f", r1 = {r1:.3f} Å, average coordination number " \
+                          f"{np.interp(r1, r_edges[1:], n_r):.2f}"
+            except ValueError:
+                pass
+            print(status, flush=True)
+        
+        sums, self.n_frames = follow_accumulate(
+            self._frame_follow, self.trajectory_file, update, self.trajectory_format,
+            (r_max, dr, n_bins, partial), save_interval, poll_interval, idle_timeout,
+            self.atom_selection)
+        if self.n_frames == 0:
+            raise ValueError("No frames found in trajectory")
+        return r, sums['g_r'] / (self.n_frames * shells)
+    
+    def _frame_follow(self, frame, r_max, dr, n_bins, partial):
+        """
+        Contributions of one frame to all followed quantities
+        """
+        self._set_frame(frame)
+        if not partial:
+            hist = self._pair_histogram(r_max, dr, n_bins)
+            return {'g_r': hist / self._pair_normalization(),
+                    'n_r': hist / self.n_centers}
+        nlist = self.calculate_distances(frame.positions, r_max)
+        sums = {'n_r': self._running_coordination_contribution(nlist, dr, n_bins)}
+        sums['g_r'], sums['partial'] = self._partial_rdf_contribution(nlist, dr, n_bins)
+        return sums
     
-    def plot_rdf(self, r, g_r, partial_rdfs=None, save_plot=True):
+    def plot_rdf(self, r, g_r, partial_rdfs=None, save_plot=True, output_file='rdf.png'):
         """
         Plot RDF results
         
@@ -226,11 +828,22 @@ class RDFAnalyzer:
             Partial RDFs (optional)
         save_plot : bool
             Whether to save plot
+        output_file : str
+            Image file for the saved plot
         """
-        # TODO: Implement RDF plotting
-        pass
+        plt = get_pyplot()
+        fig, ax = plt.subplots(figsize=(6, 4))
+        ax.plot(r, g_r, 'k-', label='total')
+        for pair, g in (partial_rdfs or {}).items():
+            ax.plot(r, g, label=f'{pair[0]}-{pair[1]}')
+        ax.axhline(1.0, color='gray', lw=0.5)
+        ax.set_xlabel('r (Å)')
+        ax.set_ylabel('g(r)')
+        ax.legend()
+        finish_figure(fig, output_file, save_plot)
     
-    def plot_coordination_analysis(self, r, coord_rdfs, r1_cutoff, save_plot=True):
+    def plot_coordination_analysis(self, r, coord_rdfs, r1_cutoff, save_plot=True,
+                                   output_file='rdf_coordination.png'):
         """
         Plot coordination number analysis
         
@@ -244,14 +857,28 @@ class RDFAnalyzer:
             First coordination sphere cutoff
         save_plot : bool
             Whether to save plot
+        output_file : str
+            Image file for the saved plot
         """
-        # TODO: Implement coordination analysis plotting
-        pass
+        plt = get_pyplot()
+        fig, ax = plt.subplots(figsize=(6, 4))
+        for cn, g in coord_rdfs.items():
+            ax.plot(r, g, label=f'CN = {cn}')
+        ax.axvline(r1_cutoff, color='gray', ls='--', label=f'r1 = {r1_cutoff:.2f} Å')
+        ax.set_xlabel('r (Å)')
+        ax.set_ylabel('g(r) contribution')
+        ax.legend()
+        finish_figure(fig, output_file, save_plot)
     
-    def save_data(self, output_file, r, g_r, partial_rdfs=None, coord_rdfs=None):
+    def save_data(self, output_file, r, g_r, partial_rdfs=None, coord_rdfs=None,
+                  running_coordination=None):
         """
         Save RDF analysis results
         
+        The file is written under a temporary name and renamed into place, so
+        readers never see a partly written file (follow mode rewrites it
+        while the simulation runs).
+        
         Parameters:
         -----------
         output_file : str
@@ -264,9 +891,24 @@ class RDFAnalyzer:
             Partial RDFs (optional)
         coord_rdfs : dict
             Coordination-specific RDFs (optional)
+        running_coordination : np.array
+            Running coordination number at the upper bin edges (optional)
         """
-        # TODO: Implement data saving
-        pass
+        columns = [r, g_r]
+        header = 'r g_r'
+        if running_coordination is not None:
+            columns.append(running_coordination)
+            header += ' n_r'
+        for pair, g in (partial_rdfs or {}).items():
+            columns.append(g)
+            header += f' g_{pair[0]}-{pair[1]}'
+        for cn, g in (coord_rdfs or {}).items():
+            columns.append(g)
+            header += f' g_cn{cn}'
+        tmp_file = output_file + '.tmp'
+        with open(tmp_file, 'w') as handle:
+            np.savetxt(handle, np.column_stack(columns), header=header)
+        os.replace(tmp_file, output_file)
 
 def main():
     """
@@ -279,40 +921,88 @@ def main():
     parser.add_argument('--output', default='rdf_results.dat', help='Output file prefix')
     parser.add_argument('--partial', action='store_true', help='Calculate partial RDFs')
     parser.add_argument('--coordination', action='store_true', help='Analyze coordination contributions')
+    parser.add_argument('--coordination_series', action='store_true',
+                        help=f'Write per-atom coordination of every frame to <output>{SERIES_SUFFIX}')
+    parser.add_argument('--r1_frames', type=int, default=10,
+                        help='Frames sampled to estimate r1 for coordination analyses')
+    parser.add_argument('--workers', type=int, default=1, help='Number of worker processes')
+    add_backend_argument(parser)
+    add_frame_arguments(parser)
+    add_selection_argument(parser)
+    add_checkpoint_arguments(parser)
+    add_follow_arguments(parser)
+    add_plot_argument(parser)
+    add_histogram_store_arguments(parser)
     
     args = parser.parse_args()
     
+    # the single-pass pipeline is an RDFAnalyzer subclass defined on top of this module
+    from structure_pipeline import StructurePipeline
+    
     # Initialize analyzer
-    analyzer = RDFAnalyzer(args.trajectory)
+    analyzer = StructurePipeline(args.trajectory)
+    analyzer.backend = args.backend
+    analyzer.workers = args.workers
+    analyzer.histogram_store = histogram_store_path(args)
+    analyzer.atom_selection = atoms_from_args(args)
+    if args.coordination_series and analyzer.atom_selection is not None \
+            and not analyzer.atom_selection.is_static:
+        parser.error("--coordination_series needs the same atoms in every frame; "
+                     "region terms (box, slab, sphere) in --select change them")
+    if args.checkpoint_every or args.resume:
+        analyzer.checkpoint_prefix = args.output
+        analyzer.checkpoint_every = args.checkpoint_every or analyzer.checkpoint_every
+        analyzer.resume = args.resume
     
     # Perform analysis
     print("Loading trajectory...")
-    analyzer.load_trajectory(args.trajectory)
+    analyzer.load_trajectory(args.trajectory, frames=frames_from_args(args))
     
-    print("Calculating total RDF...")
-    r, g_r = analyzer.calculate_rdf(args.r_max, args.dr)
+    if args.follow:
+        print("Following trajectory (Ctrl-C to stop)...")
+        analyzer.follow_trajectory(args.output, args.r_max, args.dr, args.partial,
+                                   args.save_interval, args.poll_interval, args.idle_timeout)
+        print("RDF analysis complete!")
+        return
     
-    print("Finding first coordination sphere...")
-    r1 = analyzer.find_first_minimum(r, g_r)
-    print(f"First coordination sphere cutoff: {r1:.3f} Å")
+    # coordination analyses need r1 before the pass: estimate it from a subsample
+    r1 = None
+    if args.coordination or args.coordination_series:
+        print("Estimating first coordination sphere from frame subsample...")
+        r1 = analyzer.estimate_r1(args.r_max, args.dr, args.r1_frames)
+        print(f"First coordination sphere cutoff: {r1:.3f} ± {analyzer.r1_error:.3f} Å")
     
-    partial_rdfs = None
-    if args.partial:
-        print("Calculating partial RDFs...")
-        r, partial_rdfs = analyzer.calculate_partial_rdf(args.r_max, args.dr)
+    series_file = None
+    if args.coordination_series:
+        series_file = os.path.splitext(args.output)[0] + SERIES_SUFFIX
+    print("Accumulating RDF quantities in a single pass...")
+    results = analyzer.run(args.r_max, args.dr, r1, partial=args.partial,
+                           coordination=args.coordination, series_file=series_file)
+    r, g_r = results['r'], results['g_r']
+    partial_rdfs = results.get('partial_rdfs')
+    coord_rdfs = results.get('coord_rdfs')
     
-    coord_rdfs = None
+    if r1 is None:
+        print("Finding first coordination sphere...")
+        r1 = analyzer.find_first_minimum(r, g_r)
+        print(f"First coordination sphere cutoff: {r1:.3f} ± {analyzer.r1_error:.3f} Å")
+    elif results['r1_cutoff'] != r1:
+        r1 = results['r1_cutoff']
+        print(f"Reused stored coordination histograms for r1 = {r1:.3f} Å")
+    if series_file is not None:
+        series = CoordinationSeries(series_file)
+        print(f"Coordination of {series.n_atoms} atoms over {series.n_frames} frames "
+              f"saved to {series_file} (mean {series.mean().mean():.2f})")
     if args.coordination:
-        print("Analyzing coordination contributions...")
-        coord_numbers = analyzer.calculate_coordination_numbers(r1)
-        print(f"Average coordination number: {np.mean(coord_numbers):.2f}")
-        r, coord_rdfs = analyzer.analyze_coordination_contributions(r1, args.r_max, args.dr)
-    
-    print("Plotting results...")
-    analyzer.plot_rdf(r, g_r, partial_rdfs)
+        print(f"Average coordination number: {results['mean_coordination']:.2f}")
     
-    if coord_rdfs:
-        analyzer.plot_coordination_analysis(r, coord_rdfs, r1)
+    if not args.no_plot:
+        print("Plotting results...")
+        root = os.path.splitext(args.output)[0]
+        analyzer.plot_rdf(r, g_r, partial_rdfs, output_file=f"{root}.png")
+        if coord_rdfs:
+            analyzer.plot_coordination_analysis(r, coord_rdfs, r1,
+                                                output_file=f"{root}_coordination.png")
     
     print("Saving data...")
     analyzer.save_data(args.output, r, g_r, partial_rdfs, coord_rdfs)
@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""
+atom_selection.py - Atom Subset Selection for Trajectory Analyses
+
+Description:
+Restricts an analysis to part of the system (one species, an ID range, a
+slab or sphere such as the interface region of a solid-liquid coexistence
+run) without rewriting the dump. A selection expression is parsed once
+into a tree and applied to every frame right after parsing.
+
+Selections made only of type and ID terms cut the frame down to the
+selected atoms, so neighbor search, histograms and normalization (N of
+the selection, full cell volume, exactly as for a dump filtered
+externally) only ever see the subset. Selections with region terms keep
+every atom and mark the selected ones as centers (Frame.centers): pairs,
+bonds and angles are counted around the atoms in the region, with
+partners anywhere in the cell, and g(r) is normalized by the number of
+centers and the density of all atoms, so it still tends to 1. The
+neighbor search bins all atoms once and walks the cell stencil from the
+centers only, so its cost scales with the selected atoms.
+
+Type and ID terms do not depend on the coordinates: a selection made only
+of them is compiled into an index array on the first frame and reused for
+every frame with the same atom order. Region terms are evaluated per
+frame on the wrapped positions, so atoms enter and leave the region as
+they move, and fractional ('frac') regions follow the cell in NPT runs.
+
+Expression syntax (terms combined with and, or, not and parentheses):
+    all
+    type T [T ...]                      atom types (numbers or element symbols)
+    id A[:B] [A[:B] ...]                atom IDs, inclusive ranges
+    box XLO XHI YLO YHI ZLO ZHI [frac]  region box; '*' leaves a side open
+    slab x|y|z LO HI [frac]             region slab; LO > HI wraps through
+                                        the periodic boundary
+    sphere X Y Z R [frac]               sphere (minimum image); with frac the
+                                        center is fractional, R stays in Å
+Example: "type 2 and slab z 0.45 0.55 frac"
+
+Tags: atom selection; region; subset; interface; MD/QMD
+
+Author: Dr. Sergey Galitskiy
+University of South Florida
+"""
+
+import re
+
+import numpy as np
+
+from neighbor_search import inverse_cell
+from trajectory_io import Frame
+
+AXES = {'x': 0, 'y': 1, 'z': 2}
+_KEYWORDS = {'all', 'type', 'id', 'box', 'slab', 'sphere', 'and', 'or', 'not', '(', ')'}
+_TOKEN = re.compile(r'\(|\)|[^\s()]+')
+
+
+def _number(token, expression):
+    try:
+        return float(token)
+    except ValueError:
+        raise ValueError(f"Expected a number, got '{token}' in selection '{expression}'")
+
+
+def _bound(token, expression, default):
+    return default if token == '*' else _number(token, expression)
+
+
+class _Parser:
+    """
+    Recursive-descent parser producing a tree of tuples
+
+    Nodes: ('all',), ('not', a), ('and', a, b), ('or', a, b),
+    ('type', tokens), ('id', ranges), ('box', lo, hi, frac) and
+    ('sphere', center, radius, frac).
+    """
+
+    def __init__(self, expression):
+        self.expression = expression
+        self.tokens = _TOKEN.findall(expression)
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def take(self):
+        token = self.peek()
+        if token is None:
+            raise ValueError(f"Unexpected end of selection '{self.expression}'")
+        self.position += 1
+        return token
+
+    def arguments(self):
+        """
+        Tokens up to the next keyword
+        """
+        values = []
+        while self.peek() is not None and self.peek() not in _KEYWORDS:
+            values.append(self.take())
+        return values
+
+    def parse(self):
+        if not self.tokens:
+            raise ValueError("Empty atom selection")
+        tree = self.union()
+        if self.peek() is not None:
+            raise ValueError(f"Unexpected '{self.peek()}' in selection '{self.expression}'")
+        return tree
+
+    def union(self):
+        tree = self.intersection()
+        while self.peek() == 'or':
+            self.take()
+            tree = ('or', tree, self.intersection())
+        return tree
+
+    def intersection(self):
+        tree = self.factor()
+        while self.peek() == 'and':
+            self.take()
+            tree = ('and', tree, self.factor())
+        return tree
+
+    def factor(self):
+        token = self.take()
+        if token == 'not':
+            return ('not', self.factor())
+        if token == '(':
+            tree = self.union()
+            if self.take() != ')':
+                raise ValueError(f"Missing ')' in selection '{self.expression}'")
+            return tree
+        if token == 'all':
+            return ('all',)
+        if token in ('type', 'id', 'box', 'slab', 'sphere'):
+            return getattr(self, f'_{token}')(self.arguments())
+        raise ValueError(f"Unknown selection term '{token}' in '{self.expression}'")
+
+    def _type(self, values):
+        if not values:
+            raise ValueError(f"'type' needs at least one atom type in '{self.expression}'")
+        return ('type', tuple(values))
+
+    def _id(self, values):
+        if not values:
+            raise ValueError(f"'id' needs at least one ID or range in '{self.expression}'")
+        ranges = []
+        for value in values:
+            lo, _, hi = value.partition(':')
+            try:
+                ranges.append((int(lo), int(hi or lo)))
+            except ValueError:
+                raise ValueError(f"Bad ID range '{value}' in selection '{self.expression}'")
+        return ('id', tuple(ranges))
+
+    def _frac(self, values, n_numbers, term):
+        frac = values[n_numbers:] == ['frac']
+        if len(values) != n_numbers + frac:
+            raise ValueError(f"'{term}' takes {n_numbers} values (and optionally 'frac') "
+                             f"in selection '{self.expression}'")
+        return values[:n_numbers], frac
+
+    def _box(self, values):
+        values, frac = self._frac(values, 6, 'box')
+        lo = tuple(_bound(token, self.expression, -np.inf) for token in values[0::2])
+        hi = tuple(_bound(token, self.expression, np.inf) for token in values[1::2])
+        return ('box', lo, hi, frac)
+
+    def _slab(self, values):
+        values, frac = self._frac(values, 3, 'slab')
+        if values[0] not in AXES:
+            raise ValueError(f"Slab axis must be x, y or z in selection '{self.expression}'")
+        lo, hi = [-np.inf] * 3, [np.inf] * 3
+        axis = AXES[values[0]]
+        lo[axis] = _number(values[1], self.expression)
+        hi[axis] = _number(values[2], self.expression)
+        return ('box', tuple(lo), tuple(hi), frac)
+
+    def _sphere(self, values):
+        values, frac = self._frac(values, 4, 'sphere')
+        numbers = [_number(token, self.expression) for token in values]
+        return ('sphere', tuple(numbers[:3]), numbers[3], frac)
+
+
+def parse_selection(expression):
+    """
+    Parse a selection expression into a tree of tuples (see module docstring)
+    """
+    return _Parser(expression).parse()
+
+
+def _is_static(tree):
+    """
+    True if the tree does not depend on the coordinates
+    """
+    if tree[0] in ('box', 'sphere'):
+        return False
+    if tree[0] in ('not', 'and', 'or'):
+        return all(_is_static(child) for child in tree[1:])
+    return True
+
+
+class _FrameGeometry:
+    """
+    Wrapped fractional and Cartesian positions of a frame, computed on demand
+    """
+
+    def __init__(self, frame):
+        self.frame = frame
+        self._inverse = None
+        self._fractional = None
+        self._wrapped = None
+
+    @property
+    def inverse(self):
+        if self._inverse is None:
+            self._inverse = inverse_cell(self.frame.box.matrix)
+        return self._inverse
+
+    @property
+    def fractional(self):
+        if self._fractional is None:
+            box = self.frame.box
+            fractional = (self.frame.positions - box.origin) @ self.inverse
+            self._fractional = fractional - np.floor(fractional)
+        return self._fractional
+
+    @property
+    def wrapped(self):
+        if self._wrapped is None:
+            box = self.frame.box
+            self._wrapped = box.origin + self.fractional @ box.matrix
+        return self._wrapped
+
+
+def _in_interval(values, lo, hi):
+    """
+    lo <= values < hi, wrapping through the boundary when lo > hi
+    """
+    if lo > hi:
+        return (values >= lo) | (values < hi)
+    return (values >= lo) & (values < hi)
+
+
+def _evaluate(tree, frame, geometry):
+    """
+    Boolean mask of the atoms of frame matched by tree
+    """
+    kind = tree[0]
+    if kind == 'all':
+        return np.ones(frame.n_atoms, dtype=bool)
+    if kind == 'not':
+        return ~_evaluate(tree[1], frame, geometry)
+    if kind == 'and':
+        return _evaluate(tree[1], frame, geometry) & _evaluate(tree[2], frame, geometry)
+    if kind == 'or':
+        return _evaluate(tree[1], frame, geometry) | _evaluate(tree[2], frame, geometry)
+    if kind == 'type':
+        types = np.asarray(frame.types)
+        if types.dtype.kind in 'iu':
+            try:
+                wanted = [int(token) for token in tree[1]]
+            except ValueError:
+                raise ValueError(f"Atom types of this trajectory are numbers, got {tree[1]}")
+        else:
+            wanted = list(tree[1])
+        return np.isin(types, wanted)
+    if kind == 'id':
+        ids = frame.ids if frame.ids is not None else np.arange(1, frame.n_atoms + 1)
+        mask = np.zeros(frame.n_atoms, dtype=bool)
+        for lo, hi in tree[1]:
+            mask |= (ids >= lo) & (ids <= hi)
+        return mask
+    if kind == 'box':
+        _, lo, hi, frac = tree
+        coordinates = geometry.fractional if frac else geometry.wrapped
+        mask = np.ones(frame.n_atoms, dtype=bool)
+        for axis in range(3):
+            if np.isfinite(lo[axis]) or np.isfinite(hi[axis]):
+                mask &= _in_interval(coordinates[:, axis], lo[axis], hi[axis])
+        return mask
+    _, center, radius, frac = tree
+    box = frame.box
+    center = np.asarray(center)
+    if frac:
+        center = box.origin + center @ box.matrix
+    delta = (frame.positions - center) @ geometry.inverse
+    delta = (delta - np.round(delta)) @ box.matrix
+    return np.einsum('ij,ij->i', delta, delta) <= radius ** 2
+
+
+class AtomSelection:
+    """
+    Compiled atom selection expression
+    """
+
+    def __init__(self, expression):
+        """
+        Parse a selection expression
+
+        Parameters:
+        -----------
+        expression : str
+            Selection expression (syntax in the module docstring)
+        """
+        self.expression = ' '.join(expression.split())
+        self.tree = parse_selection(expression)
+        self.is_static = _is_static(self.tree)
+        # (ids, types, index) of the last frame for static selections
+        self._compiled = None
+
+    def __repr__(self):
+        return f"AtomSelection({self.expression!r})"
+
+    def __getstate__(self):
+        # workers recompile on their first frame instead of receiving the index
+        state = self.__dict__.copy()
+        state['_compiled'] = None
+        return state
+
+    def mask(self, frame):
+        """
+        Boolean mask of the selected atoms of a frame
+        """
+        return _evaluate(self.tree, frame, _FrameGeometry(frame))
+
+    def indices(self, frame):
+        """
+        Indices of the selected atoms of a frame, in frame order
+
+        Static selections (types and IDs only) are evaluated once and the
+        index array is reused while the atom IDs and types keep their order.
+        """
+        if self._compiled is not None:
+            ids, types, index = self._compiled
+            if np.array_equal(ids, frame.ids) and np.array_equal(types, frame.types):
+                return index
+        index = np.flatnonzero(self.mask(frame))
+        if self.is_static:
+            self._compiled = (frame.ids, frame.types, index)
+        return index
+
+    def _selected(self, frame):
+        index = self.indices(frame)
+        if len(index) == 0:
+            raise ValueError(f"Atom selection '{self.expression}' matches no atoms "
+                             f"at timestep {frame.timestep}")
+        return index
+
+    def subset(self, frame):
+        """
+        Frame restricted to the selected atoms
+
+        Parameters:
+        -----------
+        frame : Frame
+            Trajectory frame
+
+        Returns:
+        --------
+        selected : Frame
+            Frame with the positions, types, IDs and per-atom properties of
+            the selected atoms, and the full cell
+        """
+        index = self._selected(frame)
+        if len(index) == frame.n_atoms:
+            return frame
+        return Frame(frame.positions[index], frame.types[index], frame.box, frame.timestep,
+                     None if frame.ids is None else frame.ids[index],
+                     {name: values[index] for name, values in frame.properties.items()})
+
+    def apply(self, frame):
+        """
+        Frame prepared for a structural analysis of the selected atoms
+
+        Static selections return subset(frame). Region selections return
+        the whole frame with the selected atoms as centers, so that their
+        neighbours outside the region are still found.
+
+        Parameters:
+        -----------
+        frame : Frame
+            Trajectory frame
+
+        Returns:
+        --------
+        selected : Frame
+            Subset frame, or full frame with centers set
+        """
+        if self.is_static:
+            return self.subset(frame)
+        index = self._selected(frame)
+        if len(index) == frame.n_atoms:
+            return frame
+        return Frame(frame.positions, frame.types, frame.box, frame.timestep, frame.ids,
+                     frame.properties, centers=index)
+
+
+def add_selection_argument(parser):
+    """
+    Add the --select option to a command line parser
+    """
+    parser.add_argument('--select', default=None, metavar='EXPRESSION',
+                        help='Analyze only the selected atoms, e.g. "type 1", "id 1:500", '
+                             '"slab z 0.4 0.6 frac and not type 3" (terms: all, type, id, '
+                             'box, slab, sphere; and/or/not)')
+
+
+def atoms_from_args(args):
+    """
+    Atom selection given by the --select option (None for all atoms)
+    """
+    return AtomSelection(args.select) if args.select else None
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+regression_checks.py - Correctness Checks for Edge Cases of the Analysis Code
+
+Description:
+Small, fast checks of cases the benchmark systems do not reach: dumps cut
+off in the middle of a frame header (as seen while a simulation is still
+writing them), boxes shorter than three cutoffs along one vector (which
+need a wider cell stencil) and region atom selections, whose g(r) must
+still tend to 1 in a uniform liquid. Every check prints ok or FAIL, and the script exits
+with status 1 if any check fails.
+
+Tags: regression check; trajectory index; follow mode; neighbor search; atom selection
+
+Author: Dr. Sergey Galitskiy
+University of South Florida
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ADF_analysis1 import ADFAnalyzer  # noqa: E402
+from atom_selection import AtomSelection  # noqa: E402
+from neighbor_search import (_brute_force_pairs, build_neighbor_list, cell_grid,  # noqa: E402
+                             reduce_box, wrap_positions)
+from RDF_analysis1 import RDFAnalyzer  # noqa: E402
+from synthetic_systems import lattice, random_liquid, write_dump  # noqa: E402
+from trajectory_io import build_frame_index, iter_frames  # noqa: E402
+
+
+def check_partial_frames(workdir):
+    """
+    A dump truncated anywhere in its last frame indexes and reads as the
+    complete frames before it, and the index picks the frame up once it
+    has been written completely
+
+    Returns:
+    --------
+    failures : list of str
+        Descriptions of the cuts that failed
+    """
+    path = os.path.join(workdir, 'partial.dump')
+    positions, box = lattice('fcc', 32)
+    write_dump(path, positions, box, 3)
+    with open(path, 'rb') as handle:
+        content = handle.read()
+    last = content.rindex(b'ITEM: TIMESTEP')
+    cuts = {}
+    for header in (b'ITEM: TIMESTEP\n', b'ITEM: NUMBER OF ATOMS\n', b'ITEM: BOX BOUNDS',
+                   b'ITEM: ATOMS'):
+        start = content.index(header, last)
+        end = content.index(b'\n', start) + 1
+        cuts[f'inside {header.split(b":")[1].strip().decode()} header'] = start + 5
+        cuts[f'after {header.split(b":")[1].strip().decode()} header'] = end
+        # value line half written
+        cuts[f'inside value after {header.split(b":")[1].strip().decode()}'] = end + 1
+
+    failures = []
+    for name, cut in cuts.items():
+        with open(path, 'wb') as handle:
+            handle.write(content[:cut])
+        try:
+            index = build_frame_index(path, 'lammps')
+            n_read = sum(1 for _ in iter_frames(path, 'lammps'))
+            with open(path, 'wb') as handle:
+                handle.write(content)
+            grown = build_frame_index(path, 'lammps', index)
+            ok = len(index) == 2 and n_read == 2 and len(grown) == 3
+        except ValueError as error:
+            ok, name = False, f'{name} ({error})'
+        if not ok:
+            failures.append(name)
+    return failures
+
+
+def check_short_boxes(workdir, n_atoms=1500, seed=0):
+    """
+    The cell-list search of boxes between two and three cutoffs wide along
+    some vector finds exactly the pairs of the direct minimum-image search
+
+    Returns:
+    --------
+    failures : list of str
+        Boxes whose pair distances differ
+    """
+    rng = np.random.default_rng(seed)
+    boxes = {
+        'slab 25x25x200, cutoff 10': (np.array([25.0, 25.0, 200.0]), 10.0),
+        'rod 22x60x60, cutoff 10': (np.array([22.0, 60.0, 60.0]), 10.0),
+        'skewed, cutoff 9': (np.array([[20.0, 0.0, 0.0], [5.0, 22.0, 0.0],
+                                       [3.0, 4.0, 60.0]]), 9.0),
+    }
+    failures = []
+    for name, (box, cutoff) in boxes.items():
+        cell = reduce_box(box)
+        positions = rng.uniform(0.0, 1.0, (n_atoms, 3)) @ (np.diag(cell) if cell.ndim == 1
+                                                            else cell)
+        if cell_grid(cell, cutoff)[1] is None:
+            failures.append(f"{name}: no cell stencil")
+            continue
+        distances = np.sort(build_neighbor_list(positions, box, cutoff).distances)
+        _, _, vectors = _brute_force_pairs(wrap_positions(positions, cell), cell, cutoff)
+        expected = np.sort(np.sqrt(np.einsum('ij,ij->i', vectors, vectors)))
+        if len(distances) != len(expected) or not np.allclose(distances, expected):
+            failures.append(f"{name}: {len(distances)} pairs, expected {len(expected)}")
+    return failures
+
+
+def check_region_rdf(workdir, r_max=8.0, dr=0.1, tolerance=0.05):
+    """
+    In a uniform liquid, the g(r) of atoms selected by a region tends to 1
+    beyond the first shells, like the g(r) of all atoms
+
+    Returns:
+    --------
+    failures : list of str
+        Selections and analyzers whose g(r) tail is off
+    """
+    path = os.path.join(workdir, 'liquid.dump')
+    positions, box = random_liquid(8000)
+    write_dump(path, positions, box, 4, noise=0.5)
+    failures = []
+    for expression in ('slab z 0.4 0.6 frac', 'slab x 0.9 0.1 frac', 'sphere 0.5 0.5 0.5 8'):
+        for analyzer in (RDFAnalyzer(), ADFAnalyzer()):
+            analyzer.atom_selection = AtomSelection(expression)
+            analyzer.load_trajectory(path)
+            r, g_r = analyzer.calculate_rdf(r_max, dr)
+            tail = g_r[r > 4.0].mean()
+            if abs(tail - 1.0) > tolerance:
+                failures.append(f"{type(analyzer).__name__} '{expression}': g(r) tail {tail:.3f}")
+    return failures
+
+
+CHECKS = {
+    'partial_frames': check_partial_frames,
+    'short_boxes': check_short_boxes,
+    'region_rdf': check_region_rdf,
+}
+
+
+def main():
+    """
+    Main function for command line usage
+    """
+    parser = argparse.ArgumentParser(description='Edge-case correctness checks')
+    parser.add_argument('--checks', nargs='+', choices=list(CHECKS), default=list(CHECKS),
+                        help='Checks to run')
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in args.checks:
+            failures = CHECKS[name](workdir)
+            failed |= bool(failures)
+            print(f"{name:<20s} {'ok' if not failures else 'FAIL: ' + '; '.join(failures)}")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+run_benchmarks.py - Benchmark Suite for the RDF/ADF/Clapeyron Hot Paths
+
+Description:
+Times the stages every analysis spends its time in on synthetic systems
+with known structure (synthetic_systems.py): trajectory loading, neighbor
+search, pair histogram, bond angles and the end-to-end RDF/ADF analyzers,
+for lattices and liquids from a thousand up to a million atoms, plus the
+thermo-log reading, equilibration detection and bootstrap of the Clapeyron
+analysis. Throughput is reported as frames/s and atom-frames/s, and each
+case runs in a fresh process so its peak resident memory is its own.
+
+Every case is also a correctness check: first-peak positions, coordination
+numbers (12/8/4 for FCC/BCC/diamond), bond-angle peaks, the hard core and
+g(r) -> 1 of the liquid, and the constructed latent heat. Results go to a
+JSON file that --compare reads back to print speed-ups between commits.
+
+Tags: benchmark; performance; RDF; ADF; Clapeyron
+
+Author: Dr. Sergey Galitskiy
+University of South Florida
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# synthetic_systems puts the analysis scripts on sys.path
+from synthetic_systems import (LATTICES, LIQUID, LJ_LIQUID, lattice, lj_liquid, random_liquid,
+                               write_dump, write_thermo_log)
+from neighbor_search import build_neighbor_list
+from histogram_backends import BACKENDS, pair_histogram
+from angle_kernels import angle_histogram
+from trajectory_io import iter_frames
+from RDF_analysis1 import RDFAnalyzer
+from ADF_analysis1 import ADFAnalyzer
+from Clapeyron_analysis import ClapeyronAnalyzer, EV, AVOGADRO
+
+SYSTEMS = tuple(LATTICES) + ('liquid', 'lj_liquid')
+
+# Per-atom enthalpies (eV) and volumes (Å³) of the synthetic Clapeyron runs
+CLAPEYRON_PHASES = {'solid': (-3.36, 16.6), 'liquid': (-3.25, 17.6)}
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process (MB)
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+def _timed(stage, timings, function, *args):
+    """
+    Call function, adding its wall time to timings[stage]
+    """
+    start = time.perf_counter()
+    result = function(*args)
+    timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+    return result
+
+
+def _local_maxima(x, threshold):
+    """
+    Indices of local maxima of x above threshold * max(x)
+    """
+    inner = (x[1:-1] > x[:-2]) & (x[1:-1] >= x[2:]) & (x[1:-1] > threshold * x.max())
+    return np.flatnonzero(inner) + 1
+
+
+def structure_checks(system, r, g_r, coordination, angles, adf):
+    """
+    Compare measured structure with the known one of a synthetic system
+
+    Returns:
+    --------
+    checks : dict
+        Check name -> {'expected', 'measured', 'ok'}
+    """
+    checks = {}
+    if system in ('liquid', 'lj_liquid'):
+        core = r < LIQUID['core'] - 0.4
+        checks['hard_core'] = {'expected': 0.0, 'measured': float(g_r[core].max()),
+                               'ok': bool(g_r[core].max() == 0.0)}
+        tail = float(g_r[r > r[-1] - 1.0].mean())
+        checks['g_r_limit'] = {'expected': 1.0, 'measured': tail,
+                               'ok': bool(abs(tail - 1.0) < 0.1)}
+        return checks
+
+    spec = LATTICES[system]
+    dr = r[1] - r[0]
+    # the first shell need not be the highest peak (diamond)
+    peak = float(r[_local_maxima(g_r, 0.3)[0]])
+    checks['first_peak'] = {'expected': float(spec['nn']), 'measured': peak,
+                            'ok': bool(abs(peak - spec['nn']) <= 1.5 * dr)}
+    checks['coordination'] = {'expected': spec['cn'], 'measured': coordination,
+                              'ok': bool(abs(coordination - spec['cn']) < 0.05)}
+    found = angles[_local_maxima(adf, 0.1)]
+    measured = [float(found[np.argmin(np.abs(found - angle))]) if len(found) else None
+                for angle in spec['angles']]
+    checks['angle_peaks'] = {
+        'expected': list(spec['angles']), 'measured': measured,
+        'ok': all(m is not None and abs(m - a) <= 3.0
+                  for m, a in zip(measured, spec['angles'])),
+    }
+    return checks
+
+
+def run_structure_case(system, n_atoms, n_frames, backend, r_max, dr, workdir, seed=0):
+    """
+    Time the RDF/ADF stages on one synthetic system (run in its own process)
+
+    Parameters:
+    -----------
+    system : str
+        'fcc', 'bcc', 'diamond', 'liquid' or 'lj_liquid'
+    n_atoms : int
+        Target system size
+    n_frames : int
+        Frames in the trajectory
+    backend : str
+        Pair histogram backend
+    r_max, dr : float
+        RDF range and bin width
+    workdir : str
+        Directory for the generated dump file
+    seed : int
+        Random seed of the generator and thermal noise
+
+    Returns:
+    --------
+    case : dict
+        Stage timings (s), throughputs, peak RSS and correctness checks
+    """
+    if system == 'liquid':
+        positions, box = random_liquid(n_atoms, seed)
+        r1 = LIQUID['r1']
+    elif system == 'lj_liquid':
+        positions, box = lj_liquid(n_atoms, seed)
+        r1 = LJ_LIQUID['r1']
+    else:
+        positions, box = lattice(system, n_atoms)
+        r1 = LATTICES[system]['r1']
+    dump = os.path.join(workdir, f'{system}_{n_atoms}.dump')
+    write_dump(dump, positions, box, n_frames, seed=seed)
+    n_bins = int(round(r_max / dr))
+    # compile / warm up the backend outside the timed region
+    pair_histogram(positions[:64], box, r_max, dr, n_bins, backend)
+
+    timings = {}
+    frames = _timed('load', timings, lambda: list(iter_frames(dump)))
+    coordination = []
+    for frame in frames:
+        cell = frame.box.cell
+        nlist = _timed('neighbor_search', timings, build_neighbor_list,
+                       frame.positions, cell, r_max)
+        _timed('histogram', timings, pair_histogram,
+               frame.positions, cell, r_max, dr, n_bins, backend)
+        bonds = nlist.within(r1).full()
+        _timed('angles', timings, angle_histogram, bonds, 0, 180, 180)
+        coordination.append(bonds.counts().mean())
+    del frames, nlist, bonds
+
+    rdf = RDFAnalyzer()
+    rdf.backend = backend
+    rdf.load_trajectory(dump)
+    r, g_r = _timed('rdf_total', timings, rdf.calculate_rdf, r_max, dr)
+    adf = ADFAnalyzer()
+    adf.load_trajectory(dump)
+    adf.r1_cutoff = r1
+    angles, adf_values = _timed('adf_total', timings, adf.calculate_adf, 0, 180, 1.0)
+
+    n = len(positions)
+    return {
+        'kind': 'structure', 'system': system, 'n_atoms': n, 'n_frames': n_frames,
+        'timings': timings,
+        'frames_per_s': {stage: n_frames / t for stage, t in timings.items()},
+        'atom_frames_per_s': {stage: n * n_frames / t for stage, t in timings.items()},
+        'peak_rss_mb': peak_rss_mb(),
+        'checks': structure_checks(system, r, g_r, float(np.mean(coordination)),
+                                   angles, adf_values),
+    }
+
+
+def run_clapeyron_case(n_rows, n_resamples, workdir, seed=0):
+    """
+    Time thermo-log reading, equilibration and bootstrap of a Clapeyron pair
+
+    Returns:
+    --------
+    case : dict
+        Stage timings (s), rows/s, peak RSS and a check of ΔH against the
+        constructed value (within four error bars)
+    """
+    logs = {}
+    for index, (phase, (enthalpy, volume)) in enumerate(CLAPEYRON_PHASES.items()):
+        logs[phase] = os.path.join(workdir, f'log.{phase}_{n_rows}')
+        write_thermo_log(logs[phase], n_rows, enthalpy, volume, seed=seed + index)
+
+    analyzer = ClapeyronAnalyzer()
+    analyzer.temperature = 1000.0
+    timings = {}
+    _timed('read_log', timings, analyzer.load_solid_trajectory, logs['solid'], 'log')
+    _timed('read_log', timings, analyzer.load_liquid_trajectory, logs['liquid'], 'log')
+    for data in (analyzer.solid_data, analyzer.liquid_data):
+        _timed('equilibration', timings, analyzer.trim_equilibration, data)
+    uncertainties = _timed('bootstrap', timings, analyzer.estimate_uncertainties,
+                           n_resamples, 0.95, seed)
+
+    expected = (CLAPEYRON_PHASES['liquid'][0] - CLAPEYRON_PHASES['solid'][0]) * EV * AVOGADRO
+    delta_h = uncertainties['delta_h']
+    return {
+        'kind': 'clapeyron', 'system': 'clapeyron', 'n_rows': n_rows,
+        'timings': timings,
+        'rows_per_s': {stage: 2 * n_rows / t for stage, t in timings.items()},
+        'peak_rss_mb': peak_rss_mb(),
+        'checks': {'delta_h': {'expected': expected, 'measured': delta_h['value'],
+                               'ok': bool(abs(delta_h['value'] - expected)
+                                          <= 4 * delta_h['error'])}},
+    }
+
+
+def run_isolated(function, *args):
+    """
+    Run one benchmark case in a fresh spawned process
+    """
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(function, *args).result()
+
+
+def git_commit():
+    """
+    Short hash of the checked-out commit (None outside a git tree)
+    """
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True, cwd=os.path.dirname(__file__) or '.')
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def case_key(case):
+    """
+    Key that matches the same case across result files
+    """
+    return (case['system'], case.get('n_atoms', case.get('n_rows')))
+
+
+def print_case(case):
+    """
+    One summary line per stage of a finished case
+    """
+    size = case.get('n_atoms', case.get('n_rows'))
+    failed = [name for name, check in case['checks'].items() if not check['ok']]
+    status = 'ok' if not failed else f"FAIL ({', '.join(failed)})"
+    print(f"{case['system']:<10s} {size:>9d}  peak RSS {case['peak_rss_mb']:8.1f} MB  {status}")
+    rates = case.get('atom_frames_per_s', case.get('rows_per_s'))
+    unit = 'atom-frames/s' if 'atom_frames_per_s' in case else 'rows/s'
+    for stage, seconds in case['timings'].items():
+        print(f"    {stage:<16s} {seconds:9.4f} s  {rates[stage]:12.4g} {unit}")
+
+
+def compare(results, reference_path):
+    """
+    Print per-stage speed-ups relative to an earlier result file
+    """
+    with open(reference_path) as handle:
+        reference = json.load(handle)
+    old = {case_key(case): case for case in reference['cases']}
+    print(f"\nSpeed-up vs {reference['metadata'].get('commit')} (old time / new time):")
+    for case in results['cases']:
+        match = old.get(case_key(case))
+        if match is None:
+            continue
+        ratios = [f"{stage} {match['timings'][stage] / seconds:5.2f}x"
+                  for stage, seconds in case['timings'].items()
+                  if stage in match['timings'] and seconds > 0]
+        print(f"{case['system']:<10s} {case_key(case)[1]:>9d}  {'  '.join(ratios)}")
+
+
+def main():
+    """
+    Main function for command line usage
+    """
+    parser = argparse.ArgumentParser(description='Benchmark RDF/ADF/Clapeyron hot paths')
+    parser.add_argument('--systems', nargs='+', default=list(SYSTEMS), choices=SYSTEMS,
+                        help='Synthetic systems to benchmark')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 32000],
+                        help='Atom counts (e.g. 1000 32000 1000000)')
+    parser.add_argument('--frames', type=int, default=3, help='Frames per trajectory')
+    parser.add_argument('--r_max', type=float, default=6.0, help='RDF cutoff (Å)')
+    parser.add_argument('--dr', type=float, default=0.02, help='RDF bin width (Å)')
+    parser.add_argument('--backend', default='numpy', choices=list(BACKENDS),
+                        help='Pair histogram kernel')
+    parser.add_argument('--clapeyron_rows', nargs='*', type=int, default=[100000],
+                        help='Thermo rows per phase log (none skips the Clapeyron case)')
+    parser.add_argument('--n_resamples', type=int, default=1000,
+                        help='Bootstrap resamples of the Clapeyron case')
+    parser.add_argument('--output', default='benchmark_results.json', help='Result JSON file')
+    parser.add_argument('--compare', help='Earlier result JSON to compare against')
+    args = parser.parse_args()
+
+    results = {
+        'metadata': {
+            'commit': git_commit(),
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+            'backend': args.backend,
+            'frames': args.frames, 'r_max': args.r_max, 'dr': args.dr,
+        },
+        'cases': [],
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for system in args.systems:
+            for n_atoms in args.sizes:
+                case = run_isolated(run_structure_case, system, n_atoms, args.frames,
+                                    args.backend, args.r_max, args.dr, workdir)
+                print_case(case)
+                results['cases'].append(case)
+        for n_rows in args.clapeyron_rows:
+            case = run_isolated(run_clapeyron_case, n_rows, args.n_resamples, workdir)
+            print_case(case)
+            results['cases'].append(case)
+
+    with open(args.output, 'w') as handle:
+        json.dump(results, handle, indent=2)
+    print(f"Results saved to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+    if not all(check['ok'] for case in results['cases'] for check in case['checks'].values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
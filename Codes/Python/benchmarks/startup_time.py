@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+startup_time.py - Start-up Time Regression Check for the Analysis Scripts
+
+Description:
+Parameter sweeps launch the analysis scripts thousands of times, so their
+start-up cost matters. This benchmark times `script.py --help` (interpreter
+start, imports and argument parsing) against a bare `import numpy` and
+checks that no heavy optional module (matplotlib, scipy, numba) is imported
+at module level. It exits with status 1 when a script exceeds the allowed
+overhead or imports one of those modules eagerly.
+
+Tags: benchmark; start-up time; imports
+
+Author: Dr. Sergey Galitskiy
+University of South Florida
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = ('RDF_analysis1', 'ADF_analysis1', 'Clapeyron_analysis', 'structure_pipeline')
+HEAVY_MODULES = ('matplotlib', 'scipy', 'numba')
+
+
+def time_command(command, repeats):
+    """
+    Median wall time of a command over several runs (seconds)
+    """
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=SCRIPT_DIR, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def eager_imports(module):
+    """
+    Heavy modules that are already loaded after importing a script module
+    """
+    probe = (f"import sys, {module}; "
+             f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    result = subprocess.run([sys.executable, '-c', probe], cwd=SCRIPT_DIR, check=True,
+                            capture_output=True, text=True)
+    return result.stdout.split()
+
+
+def main():
+    """
+    Main function for command line usage
+    """
+    parser = argparse.ArgumentParser(description='Start-up time regression check')
+    parser.add_argument('--repeats', type=int, default=5, help='Runs per command')
+    parser.add_argument('--max_overhead', type=float, default=0.3,
+                        help='Allowed start-up time beyond a bare numpy import (s)')
+    args = parser.parse_args()
+
+    baseline = time_command([sys.executable, '-c', 'import numpy'], args.repeats)
+    print(f"{'python -c import numpy':<28s} {baseline * 1e3:8.1f} ms")
+    failed = False
+    for name in SCRIPTS:
+        elapsed = time_command([sys.executable, f'{name}.py', '--help'], args.repeats)
+        eager = eager_imports(name)
+        overhead = elapsed - baseline
+        ok = overhead <= args.max_overhead and not eager
+        failed |= not ok
+        note = f"  eager imports: {', '.join(eager)}" if eager else ''
+        print(f"{name + '.py --help':<28s} {elapsed * 1e3:8.1f} ms  "
+              f"(+{overhead * 1e3:6.1f} ms)  {'ok' if ok else 'FAIL'}{note}")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+synthetic_systems.py - Synthetic Test Systems with Known Structure
+
+Description:
+Generators for the benchmark suite: FCC, BCC and diamond lattices with
+Gaussian thermal noise, a hard-core random liquid and a briefly
+LJ-relaxed liquid, written as LAMMPS dump files; plus synthetic solid/liquid thermo logs for the Clapeyron
+analysis. Every lattice comes with its analytic first-shell distance,
+coordination number, bonding cutoff r1 and bond angles, which double as
+correctness checks for the analyzers.
+
+Tags: benchmark; synthetic lattice; FCC; BCC; diamond; liquid; Lennard-Jones
+
+Author: Dr. Sergey Galitskiy
+University of South Florida
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from neighbor_search import build_neighbor_list  # noqa: E402
+
+# Fractional basis, lattice constant (Å) and analytic first shell of each lattice;
+# 180° angles are left out since sin(θ) suppresses them in angle histograms
+LATTICES = {
+    'fcc': {
+        'basis': [[0, 0, 0], [0.5, 0.5, 0], [0.5, 0, 0.5], [0, 0.5, 0.5]],
+        'a': 4.05, 'nn': 4.05 / np.sqrt(2), 'cn': 12, 'r1': 3.45,
+        'angles': (60.0, 90.0, 120.0),
+    },
+    'bcc': {
+        'basis': [[0, 0, 0], [0.5, 0.5, 0.5]],
+        'a': 3.30, 'nn': 3.30 * np.sqrt(3) / 2, 'cn': 8, 'r1': 3.08,
+        'angles': (70.53, 109.47),
+    },
+    'diamond': {
+        'basis': [[0, 0, 0], [0.5, 0.5, 0], [0.5, 0, 0.5], [0, 0.5, 0.5],
+                  [0.25, 0.25, 0.25], [0.75, 0.75, 0.25], [0.75, 0.25, 0.75],
+                  [0.25, 0.75, 0.75]],
+        'a': 5.43, 'nn': 5.43 * np.sqrt(3) / 4, 'cn': 4, 'r1': 3.1,
+        'angles': (109.47,),
+    },
+}
+
+# Hard-core random liquid: number density (1/Å³), core diameter and bonding cutoff (Å)
+LIQUID = {'density': 0.055, 'core': 2.2, 'r1': 3.2}
+
+# LJ parameters (Å, eV), largest displacement per relaxation step (Å) and bonding cutoff
+LJ_LIQUID = {'sigma': 2.4, 'epsilon': 0.01, 'max_step': 0.05, 'r1': 3.5}
+
+
+def lattice(kind, n_atoms):
+    """
+    Perfect cubic supercell with about n_atoms atoms
+
+    Parameters:
+    -----------
+    kind : str
+        'fcc', 'bcc' or 'diamond'
+    n_atoms : int
+        Target number of atoms (rounded to whole unit cells)
+
+    Returns:
+    --------
+    positions : np.array
+        Atomic positions, shape (n, 3)
+    box : np.array
+        Orthorhombic box lengths
+    """
+    spec = LATTICES[kind]
+    basis = np.array(spec['basis'], dtype=float)
+    n_cells = max(1, int(round((n_atoms / len(basis)) ** (1.0 / 3.0))))
+    cells = np.stack(np.meshgrid(*[np.arange(n_cells)] * 3, indexing='ij'), axis=-1)
+    cells = cells.reshape(-1, 3)
+    positions = ((cells[:, None, :] + basis[None]) * spec['a']).reshape(-1, 3)
+    return positions, np.full(3, n_cells * spec['a'])
+
+
+def random_liquid(n_atoms, seed=0, max_iterations=200):
+    """
+    Hard-core random liquid of exactly n_atoms atoms at the LIQUID density
+
+    Atoms are placed uniformly at random, then every pair closer than the
+    core diameter is pushed apart along its bond until no overlap is left.
+    At this packing fraction (about 0.3) the pushes settle within a few
+    dozen iterations and leave no trace of order.
+
+    Parameters:
+    -----------
+    n_atoms : int
+        Number of atoms
+    seed : int
+        Random seed
+    max_iterations : int
+        Overlap-removal iterations before giving up
+
+    Returns:
+    --------
+    positions : np.array
+        Atomic positions, shape (n_atoms, 3)
+    box : np.array
+        Orthorhombic box lengths
+    """
+    rng = np.random.default_rng(seed)
+    core = LIQUID['core']
+    length = (n_atoms / LIQUID['density']) ** (1.0 / 3.0)
+    box = np.full(3, length)
+    positions = rng.uniform(0.0, length, size=(n_atoms, 3))
+    for _ in range(max_iterations):
+        nlist = build_neighbor_list(positions, box, core)
+        if len(nlist.distances) == 0:
+            return positions, box
+        # each atom of a pair moves half way to 5% beyond the core diameter
+        push = (0.5 * (1.05 * core - nlist.distances) / nlist.distances)[:, None] * nlist.vectors
+        positions = (positions + _pair_sum(push, nlist, n_atoms)) % length
+    raise ValueError(f"Overlaps of {n_atoms} atoms left after {max_iterations} iterations")
+
+
+def lj_liquid(n_atoms, seed=0, steps=20):
+    """
+    Lennard-Jones liquid: the random liquid relaxed by a few capped
+    steepest-descent steps of the LJ potential in LJ_LIQUID
+
+    The short relaxation turns the hard-core contact peak into the softer
+    first shell of a simple liquid without giving it time to order.
+
+    Parameters:
+    -----------
+    n_atoms : int
+        Number of atoms
+    seed : int
+        Random seed
+    steps : int
+        Steepest-descent steps
+
+    Returns:
+    --------
+    positions : np.array
+        Atomic positions, shape (n_atoms, 3)
+    box : np.array
+        Orthorhombic box lengths
+    """
+    positions, box = random_liquid(n_atoms, seed)
+    sigma, epsilon = LJ_LIQUID['sigma'], LJ_LIQUID['epsilon']
+    for _ in range(steps):
+        nlist = build_neighbor_list(positions, box, 2.5 * sigma)
+        sr6 = (sigma / nlist.distances) ** 6
+        # force on the neighbour along r_j - r_i; the atom itself gets the opposite
+        scale = 24.0 * epsilon * (2.0 * sr6 ** 2 - sr6) / nlist.distances ** 2
+        forces = _pair_sum(scale[:, None] * nlist.vectors, nlist, n_atoms)
+        # the atom under the largest force moves max_step
+        largest = np.linalg.norm(forces, axis=1).max()
+        positions = (positions + forces * (LJ_LIQUID['max_step'] / largest)) % box
+    return positions, box
+
+
+def _pair_sum(vectors, nlist, n_atoms):
+    """
+    Per-atom sum of pair vectors acting on the neighbour j and, reversed, on i
+    """
+    i = np.repeat(np.arange(n_atoms), np.diff(nlist.offsets))
+    total = np.empty((n_atoms, 3))
+    for axis in range(3):
+        total[:, axis] = np.bincount(nlist.indices, vectors[:, axis], n_atoms) \
+            - np.bincount(i, vectors[:, axis], n_atoms)
+    return total
+
+
+def write_dump(path, positions, box, n_frames, noise=0.05, seed=0):
+    """
+    Write frames of a structure with fresh Gaussian noise as a LAMMPS dump
+
+    Parameters:
+    -----------
+    path : str
+        Output dump file
+    positions : np.array
+        Reference positions, shape (n, 3)
+    box : np.array
+        Orthorhombic box lengths
+    n_frames : int
+        Number of frames
+    noise : float
+        Standard deviation of the thermal displacements (Å)
+    seed : int
+        Random seed
+    """
+    rng = np.random.default_rng(seed)
+    n = len(positions)
+    ids = np.arange(1, n + 1)
+    bounds = '\n'.join(f"0 {length:.6f}" for length in box)
+    with open(path, 'w') as handle:
+        for step in range(n_frames):
+            frame = positions + rng.normal(0.0, noise, positions.shape)
+            handle.write(f"ITEM: TIMESTEP\n{step * 100}\nITEM: NUMBER OF ATOMS\n{n}\n"
+                         f"ITEM: BOX BOUNDS pp pp pp\n{bounds}\nITEM: ATOMS id type x y z\n")
+            np.savetxt(handle, np.column_stack([ids, np.ones(n), frame]),
+                       fmt='%d %d %.5f %.5f %.5f')
+
+
+def write_thermo_log(path, n_rows, enthalpy, volume, n_atoms=4000, phi=0.9, seed=0):
+    """
+    Write a metal-units LAMMPS log with one NPT run of correlated thermo rows
+
+    Energies and volumes fluctuate as AR(1) processes with correlation phi
+    around the given per-atom means, on top of an exponential equilibration
+    transient that decays with a time constant of 1% of the run.
+
+    Parameters:
+    -----------
+    path : str
+        Output log file
+    n_rows : int
+        Number of thermo rows
+    enthalpy : float
+        Mean total energy per atom (eV); the log pressure is zero, so this
+        is also the enthalpy
+    volume : float
+        Mean volume per atom (Å³)
+    n_atoms : int
+        Atom count reported by the log
+    phi : float
+        Lag-1 autocorrelation of the fluctuations
+    seed : int
+        Random seed
+    """
+    rng = np.random.default_rng(seed)
+    series = _ar1(rng.normal(size=(2, n_rows)), phi)
+    transient = np.exp(-np.arange(n_rows) / (0.01 * n_rows))
+    energy = n_atoms * (enthalpy + 1e-3 * series[0] + 0.05 * transient)
+    vol = n_atoms * volume * (1.0 + 1e-3 * series[1] + 0.01 * transient)
+    steps = np.arange(n_rows) * 10
+    with open(path, 'w') as handle:
+        handle.write(f"LAMMPS (synthetic)\nunits metal\nCreated {n_atoms} atoms\n")
+        handle.write("   Step          Temp          PotEng         KinEng         TotEng"
+                     "         Press          Volume    \n")
+        np.savetxt(handle, np.column_stack([steps, np.full(n_rows, 1000.0), energy,
+                                            np.zeros(n_rows), energy, np.zeros(n_rows), vol]),
+                   fmt='%10d %12.4f %16.6f %12.4f %16.6f %12.4f %16.6f')
+        handle.write(f"Loop time of 1.0 on 1 procs for {steps[-1]} steps with {n_atoms} atoms\n")
+
+
+def _ar1(noise, phi, chunk=100):
+    """
+    AR(1) series x[t] = phi x[t-1] + e[t] from white noise rows
+
+    Within a chunk x[k] = phi^k (x[0] + sum_j e[j] / phi^j), a scaled
+    cumulative sum; short chunks keep phi^k far from underflow.
+    """
+    series = np.empty_like(noise)
+    powers = phi ** np.arange(1, chunk + 1)
+    last = np.zeros(noise.shape[0])
+    for start in range(0, noise.shape[1], chunk):
+        block = noise[:, start:start + chunk]
+        p = powers[:block.shape[1]]
+        series[:, start:start + chunk] = (np.cumsum(block / p, axis=1) + last[:, None]) * p
+        last = series[:, start + block.shape[1] - 1]
+    return series
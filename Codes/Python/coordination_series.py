@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+coordination_series.py - Per-Atom Coordination Time Series on Disk
+
+Description:
+Nucleation and melting-front studies need the coordination number of every
+atom at every frame, which for 1M atoms x 10k frames is far too large for
+int64 arrays in memory. Coordination numbers are therefore streamed frame
+by frame into a flat binary file as uint8 (saturating at 255) and read back
+through np.memmap. Columns follow ascending atom ID, so atoms keep their
+column when the dump order changes between frames. Queries walk the file
+in frame blocks, so their cost is set by disk bandwidth, not RAM.
+
+File layout (little endian, sections aligned to 64 bytes):
+    header        magic, version, n_frames, n_atoms
+    ids           (n_atoms,) int64 atom IDs in ascending order
+    coordination  (n_frames, n_atoms) uint8
+    timesteps     (n_frames,) int64
+
+Tags: coordination number; time series; memory map; nucleation; MD/QMD
+
+Author: Dr. Sergey Galitskiy
+University of South Florida
+"""
+
+import argparse
+import struct
+
+import numpy as np
+
+MAGIC = b'MDCOORD1'
+VERSION = 1
+SERIES_SUFFIX = '.cnseries'
+MAX_COORDINATION = np.iinfo(np.uint8).max
+
+_HEADER = struct.Struct('<8sIQQ')
+_ALIGN = 64
+# Frames per block in streaming queries (about 64 MB of uint8 per block)
+BLOCK_BYTES = 2 ** 26
+
+
+def _aligned(offset):
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+def _layout(n_frames, n_atoms):
+    """
+    Byte offsets of the sections of a coordination series file
+    """
+    ids_offset = _aligned(_HEADER.size)
+    coordination_offset = _aligned(ids_offset + n_atoms * 8)
+    timesteps_offset = _aligned(coordination_offset + n_frames * n_atoms)
+    return ids_offset, coordination_offset, timesteps_offset
+
+
+class CoordinationWriter:
+    """
+    Append per-frame coordination numbers to a coordination series file
+    """
+
+    def __init__(self, series_path, ids):
+        """
+        Create the file and write its atom IDs
+
+        Parameters:
+        -----------
+        series_path : str
+            Output file
+        ids : np.array
+            Atom IDs of the first frame (any order)
+        """
+        self.series_path = series_path
+        self.ids = np.sort(np.asarray(ids, dtype=np.int64))
+        self.n_atoms = len(self.ids)
+        self.timesteps = []
+        ids_offset, coordination_offset, _ = _layout(0, self.n_atoms)
+        self.handle = open(series_path, 'wb')
+        self.handle.seek(ids_offset)
+        self.handle.write(self.ids.astype('<i8').tobytes())
+        self.handle.seek(coordination_offset)
+
+    def write(self, coordination, ids=None, timestep=None):
+        """
+        Append the coordination numbers of one frame
+
+        Parameters:
+        -----------
+        coordination : np.array
+            Coordination number of every atom, in frame order
+        ids : np.array
+            Atom IDs in frame order (None if already in ascending ID order)
+        timestep : int
+            MD timestep of the frame
+        """
+        coordination = np.asarray(coordination)
+        if len(coordination) != self.n_atoms:
+            raise ValueError("Coordination series require a constant number of atoms")
+        if ids is not None:
+            order = np.argsort(ids)
+            if not np.array_equal(np.asarray(ids)[order], self.ids):
+                raise ValueError("Atom IDs differ from those of the first frame")
+            coordination = coordination[order]
+        row = np.minimum(coordination, MAX_COORDINATION).astype(np.uint8)
+        self.handle.write(row.tobytes())
+        self.timesteps.append(-1 if timestep is None else timestep)
+
+    def close(self):
+        """
+        Write timesteps and frame count and close the file
+        """
+        n_frames = len(self.timesteps)
+        _, _, timesteps_offset = _layout(n_frames, self.n_atoms)
+        self.handle.seek(timesteps_offset)
+        self.handle.write(np.asarray(self.timesteps, dtype='<i8').tobytes())
+        self.handle.seek(0)
+        self.handle.write(_HEADER.pack(MAGIC, VERSION, n_frames, self.n_atoms))
+        self.handle.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class CoordinationSeries:
+    """
+    Read-only memory-mapped view of a coordination series file
+    """
+
+    def __init__(self, series_path):
+        """
+        Open coordination series file
+
+        Parameters:
+        -----------
+        series_path : str
+            Path to a file written by CoordinationWriter
+        """
+        with open(series_path, 'rb') as handle:
+            magic, version, n_frames, n_atoms = _HEADER.unpack(handle.read(_HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{series_path} is not a version {VERSION} coordination series")
+        ids_offset, coordination_offset, timesteps_offset = _layout(n_frames, n_atoms)
+
+        self.series_path = series_path
+        self.n_frames = n_frames
+        self.n_atoms = n_atoms
+        self.ids = np.fromfile(series_path, dtype='<i8', count=n_atoms, offset=ids_offset)
+        self.coordination = np.memmap(series_path, dtype=np.uint8, mode='r',
+                                      offset=coordination_offset, shape=(n_frames, n_atoms))
+        self.timesteps = np.fromfile(series_path, dtype='<i8', count=n_frames,
+                                     offset=timesteps_offset)
+
+    def __len__(self):
+        return self.n_frames
+
+    def _blocks(self, start=0):
+        """
+        Iterate over (first frame, block of rows) from frame start on
+        """
+        rows = max(1, BLOCK_BYTES // max(self.n_atoms, 1))
+        for first in range(start, self.n_frames, rows):
+            yield first, np.asarray(self.coordination[first:first + rows])
+
+    def histogram(self, max_coordination=None):
+        """
+        Number of atoms with each coordination number in every frame
+
+        Parameters:
+        -----------
+        max_coordination : int
+            Largest coordination number counted separately; higher ones
+            are added to the last column (None: largest in the file)
+
+        Returns:
+        --------
+        counts : np.array
+            Atom counts, shape (n_frames, max_coordination + 1)
+        """
+        top = MAX_COORDINATION if max_coordination is None else max_coordination
+        counts = np.zeros((self.n_frames, top + 1), dtype=np.int64)
+        for first, block in self._blocks():
+            clipped = np.minimum(block, top)
+            for row, values in enumerate(clipped):
+                counts[first + row] = np.bincount(values, minlength=top + 1)
+        if max_coordination is None:
+            occupied = np.flatnonzero(counts.any(axis=0))
+            counts = counts[:, :occupied[-1] + 1 if len(occupied) else 1]
+        return counts
+
+    def mean(self):
+        """
+        Mean coordination number of every frame
+        """
+        means = np.empty(self.n_frames)
+        for first, block in self._blocks():
+            means[first:first + len(block)] = block.mean(axis=1)
+        return means
+
+    def changed_atoms(self, frame_a, frame_b):
+        """
+        Atoms whose coordination differs between two frames
+
+        Parameters:
+        -----------
+        frame_a, frame_b : int
+            Frame numbers
+
+        Returns:
+        --------
+        ids : np.array
+            IDs of the atoms that changed
+        before, after : np.array
+            Their coordination numbers in frame_a and frame_b
+        """
+        a = np.asarray(self.coordination[frame_a])
+        b = np.asarray(self.coordination[frame_b])
+        changed = np.flatnonzero(a != b)
+        return self.ids[changed], a[changed], b[changed]
+
+    def change_counts(self):
+        """
+        Number of atoms whose coordination changed since the previous frame
+
+        Returns:
+        --------
+        counts : np.array
+            Shape (n_frames,); the first frame has 0
+        """
+        counts = np.zeros(self.n_frames, dtype=np.int64)
+        previous = None
+        for first, block in self._blocks():
+            if previous is not None:
+                counts[first] = np.count_nonzero(block[0] != previous)
+            counts[first + 1:first + len(block)] = np.count_nonzero(block[1:] != block[:-1],
+                                                                    axis=1)
+            previous = block[-1]
+        return counts
+
+    def atom_series(self, ids):
+        """
+        Coordination time series of selected atoms
+
+        Parameters:
+        -----------
+        ids : list of int
+            Atom IDs
+
+        Returns:
+        --------
+        series : np.array
+            Coordination numbers, shape (n_frames, len(ids))
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        columns = np.minimum(np.searchsorted(self.ids, ids), self.n_atoms - 1)
+        if np.any(self.ids[columns] != ids):
+            raise ValueError("Unknown atom IDs")
+        return np.asarray(self.coordination[:, columns])
+
+
+def main():
+    """
+    Main function for command line usage
+    """
+    parser = argparse.ArgumentParser(description='Query a per-atom coordination series')
+    parser.add_argument('series', help='Coordination series file')
+    parser.add_argument('--output', default='coordination_histogram.dat',
+                        help='Coordination histogram vs time')
+    parser.add_argument('--changes', type=int, nargs=2, metavar=('FRAME_A', 'FRAME_B'),
+                        help='List atoms whose coordination changed between two frames')
+
+    args = parser.parse_args()
+
+    series = CoordinationSeries(args.series)
+    print(f"{series.n_frames} frames of {series.n_atoms} atoms")
+    counts = series.histogram()
+    changes = series.change_counts()
+    header = 'frame timestep n_changed ' + ' '.join(f'n_cn{cn}' for cn in range(counts.shape[1]))
+    np.savetxt(args.output, np.column_stack([np.arange(series.n_frames), series.timesteps,
+                                             changes, counts]), fmt='%d', header=header)
+    print(f"Coordination histogram vs time saved to {args.output}")
+    if args.changes:
+        ids, before, after = series.changed_atoms(*args.changes)
+        print(f"{len(ids)} atoms changed coordination between frames {args.changes[0]} "
+              f"and {args.changes[1]}")
+        for atom, a, b in zip(ids, before, after):
+            print(f"{atom:10d} {a:4d} -> {b:4d}")
+
+if __name__ == "__main__":
+    main()
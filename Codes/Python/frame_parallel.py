@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+frame_parallel.py - Frame-Parallel Accumulation of Trajectory Averages
+
+Description:
+RDF and ADF are averages over independent frames. The selected frame range
+is split into contiguous chunks that are processed by a pool of worker
+processes; each worker opens the trajectory itself (seeking through the
+sidecar frame index, or memory-mapping a binary cache) so no coordinate
+arrays are pickled between processes. Partial sums are merged in chunk
+order, which makes the result deterministic for a given number of workers.
+
+Running sums can be checkpointed every N frames to an .npz file and resumed
+after the last finished frame, which also lets frames appended by a still
+running simulation be added without recomputing the existing ones. In
+follow mode the sums are instead kept in memory and updated as a running
+simulation completes new frames.
+
+Tags: multiprocessing; frame parallelism; RDF; ADF; MD/QMD
+
+Author: Dr. Sergey Galitskiy
+University of South Florida
+"""
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
+import numpy as np
+
+from trajectory_io import follow_frames, frame_numbers, iter_frames
+
+CHECKPOINT_SUFFIX = '.ckpt.npz'
+
+
+def merge_sums(total, part):
+    """
+    Add a partial result to a running total
+
+    Results may be arrays, numbers, or dicts/tuples of those; dict keys
+    missing from the running total are added. Arrays that differ only in
+    the length of their last axis (e.g. counts from np.bincount) are
+    zero-padded to the longer one.
+
+    Parameters:
+    -----------
+    total : array, dict, tuple or None
+        Running total (None before the first frame)
+    part : array, dict or tuple
+        Contribution to add
+
+    Returns:
+    --------
+    total : array, dict or tuple
+        Updated total
+    """
+    if total is None:
+        return part
+    if isinstance(part, dict):
+        for key, value in part.items():
+            total[key] = merge_sums(total.get(key), value)
+        return total
+    if isinstance(part, tuple):
+        return tuple(merge_sums(t, p) for t, p in zip(total, part))
+    if isinstance(part, np.ndarray) and np.ndim(total) and total.shape[-1] != part.shape[-1]:
+        length = max(total.shape[-1], part.shape[-1])
+        pad = [(0, 0)] * (part.ndim - 1)
+        total = np.pad(total, pad + [(0, length - total.shape[-1])])
+        part = np.pad(part, pad + [(0, length - part.shape[-1])])
+    return total + part
+
+
+def _accumulate_chunk(frame_function, file_path, fmt, frames, args, atoms=None):
+    """
+    Sum frame_function over a range of frames in the current process
+    """
+    total, n_frames = None, 0
+    for frame in iter_frames(file_path, fmt, frames=frames, atoms=atoms):
+        total = merge_sums(total, frame_function(frame, *args))
+        n_frames += 1
+    return total, n_frames
+
+
+def _encode(value, arrays):
+    """
+    Convert a nested result to a JSON-compatible tree, moving arrays out
+    """
+    if isinstance(value, dict):
+        return {'dict': [[_encode(key, arrays), _encode(item, arrays)]
+                         for key, item in value.items()]}
+    if isinstance(value, tuple):
+        return {'tuple': [_encode(item, arrays) for item in value]}
+    if isinstance(value, np.ndarray):
+        arrays[f'a{len(arrays)}'] = value
+        return {'array': f'a{len(arrays) - 1}'}
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _decode(tree, arrays):
+    """
+    Rebuild a nested result from its JSON tree and the stored arrays
+    """
+    if isinstance(tree, dict):
+        if 'dict' in tree:
+            return {_decode(key, arrays): _decode(item, arrays) for key, item in tree['dict']}
+        if 'tuple' in tree:
+            return tuple(_decode(item, arrays) for item in tree['tuple'])
+        return arrays[tree['array']]
+    return tree
+
+
+def save_checkpoint(checkpoint_path, state, compress=False):
+    """
+    Atomically write accumulator state to an .npz checkpoint
+
+    Parameters:
+    -----------
+    checkpoint_path : str
+        Output file
+    state : dict
+        Accumulator state: 'total', 'n_frames', 'last_frame' and any other
+        JSON-compatible entries
+    compress : bool
+        Write a compressed .npz (smaller, slower to write)
+    """
+    arrays = {}
+    tree = _encode(state, arrays)
+    tmp_path = checkpoint_path + '.tmp'
+    save = np.savez_compressed if compress else np.savez
+    with open(tmp_path, 'wb') as handle:
+        save(handle, state=json.dumps(tree), **arrays)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def load_checkpoint(checkpoint_path):
+    """
+    Read accumulator state written by save_checkpoint
+
+    Returns:
+    --------
+    state : dict
+        Accumulator state
+    """
+    with np.load(checkpoint_path, allow_pickle=False) as data:
+        arrays = {name: data[name] for name in data.files if name != 'state'}
+        return _decode(json.loads(str(data['state'])), arrays)
+
+
+def checkpoint_path_for(prefix, frame_function, file_path, frames, args, atoms=None):
+    """
+    Checkpoint file name for one accumulation task
+
+    The name combines the task (function name) with a hash of its inputs,
+    so runs with different parameters or atom selections never resume
+    from each other. The trajectory's size and modification time are part
+    of the inputs, so a rewritten or extended file is not resumed from
+    sums of its old contents.
+    """
+    name = getattr(frame_function, '__name__', 'task').strip('_')
+    stat = os.stat(file_path)
+    inputs = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns, frames, args)
+    if atoms is not None:
+        inputs += (atoms.expression,)
+    key = repr(inputs).encode()
+    return f"{prefix}.{name}-{hashlib.sha1(key).hexdigest()[:10]}{CHECKPOINT_SUFFIX}"
+
+
+def _accumulate_selected(frame_function, file_path, fmt, selected, workers, args, atoms=None):
+    """
+    Sum frame_function over explicit frame numbers, serially or in parallel
+    """
+    if workers <= 1 or len(selected) < 2:
+        return _accumulate_chunk(frame_function, file_path, fmt, list(selected), args, atoms)
+    chunks = [chunk.tolist() for chunk in np.array_split(selected, workers) if len(chunk)]
+    with ProcessPoolExecutor(max_workers=len(chunks)) as pool:
+        futures = [pool.submit(_accumulate_chunk, frame_function, file_path, fmt, chunk, args,
+                               atoms)
+                   for chunk in chunks]
+        results = [future.result() for future in futures]
+
+    total, n_frames = None, 0
+    for part, count in results:
+        total = merge_sums(total, part)
+        n_frames += count
+    return total, n_frames
+
+
+def accumulate_frames(frame_function, file_path, fmt='auto', frames=None, workers=1, args=(),
+                      checkpoint=None, checkpoint_every=100, resume=False, atoms=None):
+    """
+    Sum per-frame contributions over a trajectory, optionally in parallel
+
+    Parameters:
+    -----------
+    frame_function : callable
+        Picklable function (e.g. a bound analyzer method) called as
+        frame_function(frame, *args) and returning the frame's contribution
+    file_path : str
+        Path to trajectory file
+    fmt : str
+        Trajectory format or 'auto'
+    frames : slice or list of int
+        Frame selection (None selects all frames)
+    workers : int
+        Number of worker processes; 1 runs in the current process
+    args : tuple
+        Extra arguments passed to frame_function
+    checkpoint : str
+        Checkpoint file; the running sum is saved there every
+        checkpoint_every frames (None disables checkpointing)
+    checkpoint_every : int
+        Number of frames between checkpoints
+    resume : bool
+        Continue from the checkpoint file if it exists, skipping the
+        selected frames it already holds (counted by position in the
+        selection, so unsorted frame lists resume correctly)
+    atoms : AtomSelection
+        Atom selection applied to every frame before frame_function sees
+        it (None keeps all atoms)
+
+    Returns:
+    --------
+    total : array, dict or tuple
+        Sum of the contributions of all frames
+    n_frames : int
+        Number of frames processed (including frames restored from the
+        checkpoint)
+    """
+    if workers <= 1 and checkpoint is None:
+        return _accumulate_chunk(frame_function, file_path, fmt, frames, args, atoms)
+
+    selected = frame_numbers(file_path, fmt, frames)
+    if checkpoint is None:
+        return _accumulate_selected(frame_function, file_path, fmt, selected, workers, args,
+                                    atoms)
+
+    total, n_frames, n_done = None, 0, 0
+    if resume and os.path.exists(checkpoint):
+        state = load_checkpoint(checkpoint)
+        total, n_frames, n_done = state['total'], state['n_frames'], state.get('n_done')
+        # frames appended since the checkpoint extend the selection at its end
+        if (n_done is None or n_done > len(selected)
+                or (n_done and selected[n_done - 1] != state['last_frame'])):
+            raise ValueError(f"Checkpoint {checkpoint} does not match the frame selection; "
+                             f"delete it to start over")
+
+    # one pool for the whole run; chunks are merged in order and the sum
+    # is saved whenever checkpoint_every more frames are complete
+    remaining = selected[n_done:]
+    step = max(1, checkpoint_every)
+    size = step if workers <= 1 else max(1, min(step, -(-len(remaining) // workers)))
+    chunks = [remaining[start:start + size].tolist() for start in range(0, len(remaining), size)]
+    unsaved = 0
+    with ProcessPoolExecutor(max_workers=workers) if workers > 1 else nullcontext() as pool:
+        if pool is None:
+            results = (_accumulate_chunk(frame_function, file_path, fmt, chunk, args, atoms)
+                       for chunk in chunks)
+        else:
+            futures = [pool.submit(_accumulate_chunk, frame_function, file_path, fmt, chunk,
+                                   args, atoms)
+                       for chunk in chunks]
+            results = (future.result() for future in futures)
+        for chunk, (part, count) in zip(chunks, results):
+            total = merge_sums(total, part)
+            n_frames += count
+            n_done += len(chunk)
+            unsaved += len(chunk)
+            if unsaved >= step or n_done == len(selected):
+                save_checkpoint(checkpoint, {'total': total, 'n_frames': n_frames,
+                                             'n_done': n_done, 'last_frame': chunk[-1]})
+                unsaved = 0
+    return total, n_frames
+
+
+def follow_accumulate(frame_function, file_path, on_update, fmt='auto', args=(),
+                      save_interval=30.0, poll_interval=2.0, idle_timeout=None, atoms=None):
+    """
+    Sum per-frame contributions of a trajectory that is still being written
+
+    Every complete frame is processed exactly once as it appears. on_update
+    is called with the running sum whenever all available frames have been
+    processed, at most every save_interval seconds while catching up with a
+    long backlog, and once more when following stops (idle timeout or
+    Ctrl-C).
+
+    Parameters:
+    -----------
+    frame_function : callable
+        Called as frame_function(frame, *args), returning the frame's
+        contribution
+    file_path : str
+        Path to trajectory file
+    on_update : callable
+        Called as on_update(total, n_frames) to publish intermediate results
+    fmt : str
+        Trajectory format or 'auto'
+    args : tuple
+        Extra arguments passed to frame_function
+    save_interval : float
+        Minimum seconds between updates while frames keep arriving
+    poll_interval : float
+        Seconds to sleep between checks of an unchanged file
+    idle_timeout : float
+        Stop after this many seconds without a new frame (None follows
+        until interrupted)
+    atoms : AtomSelection
+        Atom selection applied to every frame (None keeps all atoms)
+
+    Returns:
+    --------
+    total : array, dict or tuple
+        Sum of the contributions of all processed frames
+    n_frames : int
+        Number of frames processed
+    """
+    total, n_frames, published = None, 0, 0
+    last_update = time.monotonic()
+    try:
+        for frame in follow_frames(file_path, fmt, poll_interval=poll_interval,
+                                   idle_timeout=idle_timeout, atoms=atoms):
+            if frame is not None:
+                total = merge_sums(total, frame_function(frame, *args))
+                n_frames += 1
+                if time.monotonic() - last_update < save_interval:
+                    continue
+            if n_frames > published:
+                on_update(total, n_frames)
+                published, last_update = n_frames, time.monotonic()
+    except KeyboardInterrupt:
+        pass
+    if n_frames > published:
+        on_update(total, n_frames)
+    return total, n_frames
+
+
+def add_checkpoint_arguments(parser):
+    """
+    Add --checkpoint_every/--resume options to a command line parser
+    """
+    group = parser.add_argument_group('checkpointing')
+    group.add_argument('--checkpoint_every', type=int, default=0,
+                       help='Save running averages every N frames (0 disables)')
+    group.add_argument('--resume', action='store_true',
+                       help='Continue from checkpoints after the last finished frame')
+
+
+def add_follow_arguments(parser):
+    """
+    Add --follow/--save_interval/--poll_interval/--idle_timeout options to a
+    command line parser
+    """
+    group = parser.add_argument_group('follow mode')
+    group.add_argument('--follow', action='store_true',
+                       help='Keep analyzing frames appended by a running simulation')
+    group.add_argument('--save_interval', type=float, default=30.0,
+                       help='Seconds between output rewrites while frames arrive')
+    group.add_argument('--poll_interval', type=float, default=2.0,
+                       help='Seconds between checks for new frames')
+    group.add_argument('--idle_timeout', type=float, default=None,
+                       help='Stop after this many seconds without new frames')
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+histogram_backends.py - Pluggable Kernels for Pair-Distance Histograms
+
+Description:
+Counts all pairs of a periodic frame into distance bins, the hot loop of the
+RDF and running coordination number. The 'numpy' backend histograms the
+distances of a cell-list neighbor list. The optional 'numba' backend (used
+when numba is installed) fuses minimum image, distance, cutoff test and bin
+increment into one compiled loop over the same cells, parallel over atoms,
+without allocating pair-sized arrays; its kernels live in numba_kernels,
+which is imported on first use. Both visit every pair from the same
+side with the same arithmetic, so their histograms are identical.
+
+Run this file directly to check that all available backends agree.
+
+Tags: RDF; histogram; numba; JIT; MD/QMD
+
+Author: Dr. Sergey Galitskiy
+University of South Florida
+"""
+
+import argparse
+import importlib.util
+import sys
+import time
+
+import numpy as np
+
+from neighbor_search import (build_neighbor_list, cell_grid, reduce_box, sort_into_cells,
+                             wrap_positions)
+
+# numba is imported (and its kernels compiled) only when the backend is used
+HAS_NUMBA = importlib.util.find_spec('numba') is not None
+
+
+def _numpy_pair_histogram(positions, box, cutoff, dr, n_bins):
+    """
+    Pair-distance histogram from a cell-list neighbor list
+    """
+    nlist = build_neighbor_list(positions, box, cutoff)
+    bins = (nlist.distances / dr).astype(np.int64)
+    return np.bincount(bins[bins < n_bins], minlength=n_bins)
+
+
+def _numba_pair_histogram(positions, box, cutoff, dr, n_bins):
+    """
+    Pair-distance histogram from a fused, parallel compiled loop
+    """
+    import numba
+    from numba_kernels import brute_histogram_kernel, cell_histogram_kernel
+    positions = np.asarray(positions)
+    box = reduce_box(box, positions.dtype)
+    n_cells, stencil = cell_grid(box, cutoff)
+    positions = wrap_positions(positions, box)
+    # several chunks per thread balance uneven cell occupancy
+    n_chunks = max(1, min(len(positions), 4 * numba.get_num_threads()))
+    if stencil is not None:
+        _, sorted_xyz, sorted_pos, cell_start, cell_count = sort_into_cells(
+            positions, box, n_cells)
+        cell = np.diag(box) if box.ndim == 1 else box
+        return cell_histogram_kernel(sorted_pos, sorted_xyz, cell_start, cell_count, n_cells,
+                                     cell, stencil, cutoff * cutoff, dr, n_bins, n_chunks)
+    if box.ndim == 2:
+        # small skewed cells are rare; the numpy search handles them
+        return _numpy_pair_histogram(positions, box, cutoff, dr, n_bins)
+    return brute_histogram_kernel(positions, box, cutoff * cutoff, dr, n_bins, n_chunks)
+
+
+BACKENDS = {'numpy': _numpy_pair_histogram}
+if HAS_NUMBA:
+    BACKENDS['numba'] = _numba_pair_histogram
+
+
+def pair_histogram(positions, box, cutoff, dr, n_bins, backend='numpy'):
+    """
+    Count all pairs of a frame closer than cutoff into distance bins
+
+    Parameters:
+    -----------
+    positions : np.array
+        Atomic positions, shape (n_atoms, 3)
+    box : np.array
+        Orthorhombic box lengths (Lx, Ly, Lz) or lattice matrix (rows)
+    cutoff : float
+        Cutoff distance, at most half the smallest box width
+    dr : float
+        Bin width; bin k holds distances in [k * dr, (k + 1) * dr)
+    n_bins : int
+        Number of bins
+    backend : str
+        Name of a backend in BACKENDS
+
+    Returns:
+    --------
+    hist : np.array
+        Number of unordered pairs in every bin
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown or unavailable histogram backend '{backend}' "
+                         f"(available: {', '.join(BACKENDS)})")
+    return BACKENDS[backend](positions, box, cutoff, dr, n_bins)
+
+
+def add_backend_argument(parser):
+    """
+    Add a --backend option to a command line parser
+    """
+    parser.add_argument('--backend', default='numpy', choices=list(BACKENDS),
+                        help='Pair histogram kernel')
+
+
+def check_parity(n_atoms=(50, 2000, 20000), cutoff=5.0, dr=0.02, seed=0):
+    """
+    Compare the histograms of all available backends on random frames
+
+    Every size is tested in an orthorhombic and in a skewed (triclinic)
+    cell.
+
+    Parameters:
+    -----------
+    n_atoms : tuple of int
+        System sizes to test (small ones exercise the brute-force path)
+    cutoff : float
+        Cutoff distance
+    dr : float
+        Bin width
+    seed : int
+        Random seed
+
+    Returns:
+    --------
+    identical : bool
+        True if every backend reproduced the numpy histogram exactly
+    """
+    rng = np.random.default_rng(seed)
+    identical = True
+    for n in n_atoms:
+        # liquid-like density of 0.06 atoms/A^3 in a slightly anisotropic box
+        lengths = (n / 0.06) ** (1.0 / 3.0) * np.array([1.0, 1.1, 0.9])
+        lengths = np.maximum(lengths, 2.5 * cutoff)
+        tilted = np.diag(lengths)
+        tilted[1, 0], tilted[2, 0], tilted[2, 1] = 0.3 * lengths[0], -0.2 * lengths[0], \
+            0.25 * lengths[1]
+        n_bins = int(cutoff / dr)
+        for shape, box in (('ortho', lengths), ('triclinic', tilted)):
+            positions = rng.uniform(-0.5, 1.5, size=(n, 3)) @ np.diag(lengths)
+            reference = None
+            for name in BACKENDS:
+                pair_histogram(positions, box, cutoff, dr, n_bins, name)  # compile/warm up
+                start = time.perf_counter()
+                hist = pair_histogram(positions, box, cutoff, dr, n_bins, name)
+                elapsed = time.perf_counter() - start
+                if reference is None:
+                    reference, status = hist, 'reference'
+                else:
+                    same = np.array_equal(hist, reference)
+                    identical &= same
+                    status = 'identical' if same else \
+                        f'MISMATCH in {np.count_nonzero(hist != reference)} bins'
+                print(f"{n:>8d} atoms  {shape:<9s} {name:<6s} {elapsed * 1e3:9.2f} ms  "
+                      f"{int(hist.sum()):>10d} pairs  {status}")
+    return identical
+
+
+def main():
+    """
+    Main function for command line usage
+    """
+    parser = argparse.ArgumentParser(description='Check pair histogram backends for parity')
+    parser.add_argument('--n_atoms', type=int, nargs='+', default=[50, 2000, 20000],
+                        help='System sizes to test')
+    parser.add_argument('--cutoff', type=float, default=5.0, help='Cutoff distance')
+    parser.add_argument('--dr', type=float, default=0.02, help='Bin width')
+
+    args = parser.parse_args()
+
+    print(f"Available backends: {', '.join(BACKENDS)}")
+    if not check_parity(tuple(args.n_atoms), args.cutoff, args.dr):
+        sys.exit(1)
+    print("All backends agree")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+histogram_store.py - Rebinnable Fine Histograms Kept Next to a Trajectory
+
+Description:
+Bin widths and ranges (--dr, --r_max, --d_angle) are often tuned after a
+first look at the results, and every change used to cost a full pass over
+the trajectory. The analyzers therefore accumulate their distance and
+angle histograms on a fine master grid (FINE_DR, FINE_D_ANGLE) and keep the
+frame sums in a compressed sidecar <trajectory>.hist.npz. Any coarser bin
+width that is a multiple of the fine one and any smaller range is then a
+reshape-and-sum of the stored sums; the trajectory is read again only when
+a larger r_max is requested or the file or frame selection changed.
+
+Tags: histogram; rebinning; cache; RDF; ADF
+
+Author: Dr. Sergey Galitskiy
+University of South Florida
+"""
+
+import os
+import warnings
+
+import numpy as np
+
+from frame_parallel import load_checkpoint, save_checkpoint
+from trajectory_io import frame_numbers
+
+HISTOGRAM_SUFFIX = '.hist.npz'
+FINE_DR = 0.001      # Å
+FINE_D_ANGLE = 0.01  # degrees
+
+# entries of stores that could not be written (read-only or full directory),
+# kept for the rest of the process
+_UNSAVED = {}
+
+
+def aligned(value, fine_width):
+    """
+    Check that value is a whole number of fine bins
+    """
+    return bool(np.isclose(round(value / fine_width) * fine_width, value,
+                           rtol=1e-9, atol=1e-9 * fine_width))
+
+
+def rebin(fine, fine_width, width, n_bins, offset=0.0):
+    """
+    Sum a fine histogram into coarser bins
+
+    Parameters:
+    -----------
+    fine : np.array or dict
+        Fine histogram (bins along the last axis), or a dict of them
+    fine_width : float
+        Fine bin width
+    width : float
+        Coarse bin width, an integer multiple of fine_width
+    n_bins : int
+        Number of coarse bins
+    offset : float
+        Start of the first coarse bin relative to the first fine bin
+
+    Returns:
+    --------
+    coarse : np.array or dict
+        Histogram(s) with n_bins bins, or None if the coarse grid does not
+        line up with the fine one or reaches beyond it
+    """
+    if isinstance(fine, dict):
+        coarse = {key: rebin(value, fine_width, width, n_bins, offset)
+                  for key, value in fine.items()}
+        return None if any(value is None for value in coarse.values()) else coarse
+    factor = int(round(width / fine_width))
+    start = int(round(offset / fine_width))
+    if factor < 1 or not (aligned(width, fine_width) and aligned(offset, fine_width)):
+        return None
+    stop = start + n_bins * factor
+    if start < 0 or stop > fine.shape[-1]:
+        return None
+    window = fine[..., start:stop]
+    return window.reshape(*window.shape[:-1], n_bins, factor).sum(axis=-1)
+
+
+class HistogramStore:
+    """
+    Fine frame-summed histograms of one trajectory and frame selection
+
+    Entries are named ('rdf', 'partial_rdf', 'adf') and carry the
+    parameters and atom selection they were accumulated with. The store is
+    discarded as soon as the trajectory file (size, modification time) or
+    the selected frames change.
+    """
+
+    def __init__(self, store_path, trajectory_file, fmt='auto', frames=None, atoms=None):
+        """
+        Initialize histogram store
+
+        Parameters:
+        -----------
+        store_path : str
+            Sidecar .npz file
+        trajectory_file : str
+            Trajectory the histograms were accumulated from
+        fmt : str
+            Trajectory format ('auto' to detect)
+        frames : slice or list of int
+            Frame selection of the analysis
+        atoms : AtomSelection
+            Atom selection of the analysis (None for all atoms)
+        """
+        self.store_path = store_path
+        self.atoms = None if atoms is None else atoms.expression
+        stat = os.stat(trajectory_file)
+        self.source = {
+            'file_size': stat.st_size, 'file_mtime': stat.st_mtime_ns,
+            'frames': frame_numbers(trajectory_file, fmt, frames).tolist(),
+        }
+        self.entries = self._load()
+
+    def _load(self):
+        """
+        Entries of the sidecar file, or none if it is missing or stale
+        """
+        unsaved = _UNSAVED.get(self.store_path)
+        if unsaved is not None and unsaved[0] == self.source:
+            return unsaved[1]
+        if not os.path.exists(self.store_path):
+            return {}
+        try:
+            state = load_checkpoint(self.store_path)
+        except (OSError, ValueError, KeyError):
+            return {}
+        if state.get('source') != self.source:
+            return {}
+        return state['entries']
+
+    def get(self, name, **params):
+        """
+        Stored entry with exactly these parameters, or None
+
+        Returns:
+        --------
+        entry : dict
+            'sum' (fine histogram or dict of them), 'n_frames' and 'extent'
+            (upper end of the fine grid)
+        """
+        return self.entries.get(self._key(name, params))
+
+    def put(self, name, total, n_frames, extent, attributes=None, **params):
+        """
+        Store a fine frame sum and rewrite the sidecar file
+
+        If the file cannot be written, a warning is issued and the entries
+        are kept in memory for the rest of the process.
+
+        Parameters:
+        -----------
+        attributes : dict
+            Extra values stored with the entry (not part of its key)
+        """
+        self.entries[self._key(name, params)] = {
+            'sum': total, 'n_frames': n_frames, 'extent': extent, **(attributes or {}),
+        }
+        try:
+            save_checkpoint(self.store_path, {'source': self.source, 'entries': self.entries},
+                            compress=True)
+        except OSError as error:
+            warnings.warn(f"Cannot write histogram store {self.store_path} ({error}); "
+                          f"keeping it in memory only", stacklevel=2)
+            _UNSAVED[self.store_path] = (self.source, self.entries)
+            return
+        _UNSAVED.pop(self.store_path, None)
+
+    def _key(self, name, params):
+        if self.atoms is not None:
+            params = dict(params, select=self.atoms)
+        return name + ''.join(f";{key}={params[key]!r}" for key in sorted(params))
+
+
+def add_histogram_store_arguments(parser):
+    """
+    Add --histogram_store/--no_histogram_store options to a command line parser
+    """
+    group = parser.add_argument_group('histogram store')
+    group.add_argument('--histogram_store', default=None,
+                       help=f'Fine histogram file for rebinning without rereading the '
+                            f'trajectory (default: <trajectory>{HISTOGRAM_SUFFIX})')
+    group.add_argument('--no_histogram_store', action='store_true',
+                       help='Accumulate directly at the requested bin width')
+
+
+def histogram_store_path(args):
+    """
+    Sidecar path selected by the command line options (None when disabled)
+    """
+    if args.no_histogram_store:
+        return None
+    return args.histogram_store or args.trajectory + HISTOGRAM_SUFFIX
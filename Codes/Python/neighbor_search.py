@@ -0,0 +1,555 @@
+#!/usr/bin/env python3
+"""
+neighbor_search.py - Periodic Cell-List Neighbor Search for MD Frames
+
+Description:
+Builds pair lists of all atoms closer than a cutoff in a periodic box using
+linked cells, so the cost per frame grows linearly with the number of atoms
+instead of quadratically (no full distance matrix is ever allocated).
+Pairs are returned in compressed sparse row (CSR) form.
+
+Boxes are given either as orthorhombic edge lengths (Lx, Ly, Lz) or as a
+3x3 matrix of lattice vectors (rows). Skewed cells are handled in fractional
+coordinates: cells of the linked-cell grid are slices of the parallelepiped
+at least one cutoff thick (a fraction of it along short box vectors, with
+a wider stencil), and minimum images are found by rounding scaled
+displacements. Diagonal matrices take the orthorhombic fast path.
+
+Tags: neighbor list; cell list; periodic boundary conditions; MD/QMD
+
+Author: Dr. Sergey Galitskiy
+University of South Florida
+"""
+
+import warnings
+
+import numpy as np
+
+# Largest stencil reach (in cells) along a short lattice vector; closer to
+# half the cell width the direct minimum-image search is used
+MAX_REACH = 8
+
+
+def half_stencil(reach):
+    """
+    Forward half of the stencil of cells within reach = (kx, ky, kz) cells:
+    the home cell first, then every offset that follows it in lexicographic
+    order, so that each unordered pair of cells is visited exactly once
+    """
+    kx, ky, kz = (int(k) for k in reach)
+    return np.array(
+        [(0, 0, 0)] +
+        [(dx, dy, dz)
+         for dx in range(-kx, kx + 1) for dy in range(-ky, ky + 1) for dz in range(-kz, kz + 1)
+         if (dx, dy, dz) > (0, 0, 0)]
+    )
+
+
+# Forward half of the 27-cell stencil: the home cell plus 13 neighbours
+HALF_STENCIL = half_stencil((1, 1, 1))
+
+
+def full_stencil(stencil):
+    """
+    Every offset of a half stencil and its mirror image, home cell first
+    """
+    return np.concatenate([stencil, -stencil[1:]])
+
+
+class NeighborList:
+    """
+    Pair list in compressed sparse row form
+
+    Neighbours of atom i are indices[offsets[i]:offsets[i + 1]], with the
+    matching distances and displacement vectors (r_j - r_i, minimum image).
+    A half list stores each pair once (i < j); a full list stores both
+    directions.
+    """
+
+    def __init__(self, offsets, indices, distances, vectors, half=True):
+        """
+        Initialize neighbor list
+
+        Parameters:
+        -----------
+        offsets : np.array
+            Row pointers, shape (n_atoms + 1,)
+        indices : np.array
+            Neighbour indices
+        distances : np.array
+            Pair distances
+        vectors : np.array
+            Minimum-image displacement vectors, shape (n_pairs, 3)
+        half : bool
+            Whether each pair is stored once
+        """
+        self.offsets = offsets
+        self.indices = indices
+        self.distances = distances
+        self.vectors = vectors
+        self.half = half
+
+    @classmethod
+    def from_pairs(cls, n_atoms, i, j, distances, vectors, half=True):
+        """
+        Build CSR neighbor list from unsorted pair arrays
+
+        Parameters:
+        -----------
+        n_atoms : int
+            Number of atoms in the frame
+        i, j : np.array
+            Pair indices
+        distances : np.array
+            Pair distances
+        vectors : np.array
+            Displacement vectors r_j - r_i
+        half : bool
+            Whether each pair is stored once
+
+        Returns:
+        --------
+        nlist : NeighborList
+            Neighbor list sorted by the first index
+        """
+        order = np.argsort(i, kind='stable')
+        counts = np.bincount(i, minlength=n_atoms)
+        offsets = np.zeros(n_atoms + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return cls(offsets, j[order], distances[order], vectors[order], half)
+
+    @property
+    def n_atoms(self):
+        return len(self.offsets) - 1
+
+    @property
+    def n_pairs(self):
+        return len(self.indices)
+
+    def centers(self):
+        """
+        Return the central atom index of every stored pair
+        """
+        return np.repeat(np.arange(self.n_atoms, dtype=self.indices.dtype),
+                         np.diff(self.offsets))
+
+    def counts(self):
+        """
+        Return the number of stored neighbours of every atom
+        """
+        return np.diff(self.offsets)
+
+    def coordination(self):
+        """
+        Return the number of neighbours of every atom (both directions)
+        """
+        if not self.half:
+            return self.counts()
+        return self.counts() + np.bincount(self.indices, minlength=self.n_atoms)
+
+    def within(self, cutoff):
+        """
+        Restrict the list to pairs closer than a smaller cutoff
+
+        Parameters:
+        -----------
+        cutoff : float
+            New cutoff distance
+
+        Returns:
+        --------
+        nlist : NeighborList
+            Filtered neighbor list
+        """
+        keep = self.distances < cutoff
+        counts = np.bincount(self.centers()[keep], minlength=self.n_atoms)
+        offsets = np.zeros(self.n_atoms + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return NeighborList(offsets, self.indices[keep], self.distances[keep],
+                            self.vectors[keep], self.half)
+
+    def full(self):
+        """
+        Convert a half list to a full (symmetric) list
+
+        Returns:
+        --------
+        nlist : NeighborList
+            Neighbor list storing both i-j and j-i
+        """
+        if not self.half:
+            return self
+        i = self.centers()
+        return NeighborList.from_pairs(
+            self.n_atoms,
+            np.concatenate([i, self.indices]),
+            np.concatenate([self.indices, i]),
+            np.concatenate([self.distances, self.distances]),
+            np.concatenate([self.vectors, -self.vectors]),
+            half=False
+        )
+
+
+def reduce_box(box, dtype=np.float64):
+    """
+    Normalize a box argument
+
+    Parameters:
+    -----------
+    box : np.array
+        Orthorhombic edge lengths, shape (3,), or lattice vectors as rows,
+        shape (3, 3)
+    dtype : np.dtype
+        Floating point type of the result
+
+    Returns:
+    --------
+    box : np.array
+        Edge lengths for orthorhombic cells (also for diagonal matrices,
+        the fast path), otherwise the lattice matrix
+    """
+    box = np.asarray(box, dtype=dtype)
+    if box.ndim == 2 and not np.any(box[~np.eye(3, dtype=bool)]):
+        return box.diagonal().copy()
+    return box
+
+
+def cell_widths(box):
+    """
+    Perpendicular distances between opposite faces of the cell
+
+    For an orthorhombic box these are its edge lengths; half the smallest
+    width is the largest cutoff for which minimum images are unique.
+    """
+    box = reduce_box(box)
+    if box.ndim == 1:
+        return box
+    volume = abs(np.linalg.det(box))
+    return volume / np.linalg.norm(np.cross(box[[1, 2, 0]], box[[2, 0, 1]]), axis=1)
+
+
+# inverse of the most recent lattice matrix (one entry: consecutive frames)
+_inverse_cache = {}
+
+
+def inverse_cell(box):
+    """
+    Inverse of a lattice matrix
+
+    The last inverse is cached, so consecutive frames that share the same
+    cell (constant-volume runs) do not invert it again.
+    """
+    key = (box.dtype.str, box.tobytes())
+    inverse = _inverse_cache.get(key)
+    if inverse is None:
+        _inverse_cache.clear()
+        inverse = _inverse_cache[key] = np.linalg.inv(box)
+    return inverse
+
+
+def fractional(positions, box):
+    """
+    Convert Cartesian positions or vectors to fractional coordinates
+    """
+    box = reduce_box(box, positions.dtype)
+    if box.ndim == 1:
+        return positions / box
+    return positions @ inverse_cell(box)
+
+
+def lattice_shift(images, box):
+    """
+    Cartesian vectors of integer lattice translations, shape (n, 3)
+
+    Written out term by term (no BLAS) so that every caller, including the
+    compiled histogram kernels, rounds identically.
+    """
+    if box.ndim == 1:
+        return images * box
+    return images[:, 0, None] * box[0] + images[:, 1, None] * box[1] + \
+        images[:, 2, None] * box[2]
+
+
+def wrap_positions(positions, box):
+    """
+    Wrap positions into the primary periodic cell
+
+    Parameters:
+    -----------
+    positions : np.array
+        Atomic positions, shape (n_atoms, 3)
+    box : np.array
+        Orthorhombic box lengths (Lx, Ly, Lz) or lattice matrix (rows)
+
+    Returns:
+    --------
+    wrapped : np.array
+        Positions inside the box (fractional coordinates in [0, 1))
+    """
+    box = reduce_box(box, positions.dtype)
+    if box.ndim == 1:
+        wrapped = positions - box * np.floor(positions / box)
+        # floor can round x = -tiny up to exactly L
+        return np.where(wrapped >= box, wrapped - box, wrapped)
+    scaled = fractional(positions, box)
+    scaled -= np.floor(scaled)
+    scaled[scaled >= 1.0] -= 1.0
+    return scaled @ box
+
+
+def minimum_image(vectors, box):
+    """
+    Apply minimum image convention to displacement vectors in place
+
+    For skewed cells scaled displacements are rounded to the nearest
+    integer, which yields the shortest image of every vector shorter than
+    half the smallest cell width.
+
+    Parameters:
+    -----------
+    vectors : np.array
+        Displacement vectors, shape (n, 3)
+    box : np.array
+        Orthorhombic box lengths or lattice matrix (rows)
+
+    Returns:
+    --------
+    vectors : np.array
+        Minimum-image displacement vectors
+    """
+    box = reduce_box(box, vectors.dtype)
+    if box.ndim == 1:
+        vectors -= box * np.round(vectors / box)
+        return vectors
+    scaled = fractional(vectors, box)
+    vectors -= lattice_shift(np.round(scaled), box)
+    return vectors
+
+
+def _ranges(starts, lengths):
+    """
+    Concatenate arange(s, s + n) for every (s, n) without a Python loop
+    """
+    row_offset = np.cumsum(lengths) - lengths
+    return (np.arange(int(lengths.sum()), dtype=np.int64)
+            + np.repeat(starts - row_offset, lengths))
+
+
+def _brute_force_pairs(positions, box, cutoff, centers=None):
+    """
+    Half pair list by direct minimum-image search (small boxes only), or
+    the pairs of the given central atoms with all other atoms
+    """
+    n_atoms = len(positions)
+    i_all, j_all, v_all = [], [], []
+    cutoff2 = cutoff * cutoff
+    for i in (range(n_atoms - 1) if centers is None else centers):
+        first = i + 1 if centers is None else 0
+        vec = minimum_image(positions[first:] - positions[i], box)
+        d2 = np.einsum('ij,ij->i', vec, vec)
+        hit = np.flatnonzero(d2 < cutoff2)
+        hit = hit[hit + first != i]
+        i_all.append(np.full(len(hit), i, dtype=np.int64))
+        j_all.append(hit + first)
+        v_all.append(vec[hit])
+    if not i_all:
+        return (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+                np.zeros((0, 3), dtype=positions.dtype))
+    return np.concatenate(i_all), np.concatenate(j_all), np.concatenate(v_all)
+
+
+def sort_into_cells(positions, box, n_cells):
+    """
+    Sort wrapped positions by linked cell
+
+    Parameters:
+    -----------
+    positions : np.array
+        Positions inside the box, shape (n_atoms, 3)
+    box : np.array
+        Orthorhombic box lengths or lattice matrix (from reduce_box)
+    n_cells : np.array
+        Number of cells along each box vector
+
+    Returns:
+    --------
+    order : np.array
+        Atom index of every sorted position
+    sorted_xyz : np.array
+        Cell coordinates of the sorted atoms, shape (n_atoms, 3)
+    sorted_pos : np.array
+        Positions in cell order
+    cell_start, cell_count : np.array
+        First sorted index and number of atoms of every cell (C order)
+    """
+    if box.ndim == 1:
+        scaled = positions / (box / n_cells)
+    else:
+        scaled = fractional(positions, box) * n_cells
+    cell_xyz = np.clip(scaled.astype(np.int64), 0, n_cells - 1)
+    cell_id = np.ravel_multi_index(cell_xyz.T, n_cells)
+
+    order = np.argsort(cell_id, kind='stable')
+    cell_count = np.bincount(cell_id, minlength=int(np.prod(n_cells)))
+    cell_start = np.zeros_like(cell_count)
+    np.cumsum(cell_count[:-1], out=cell_start[1:])
+    return order, cell_xyz[order], positions[order], cell_start, cell_count
+
+
+def _cell_list_pairs(positions, box, cutoff, n_cells, stencil):
+    """
+    Half pair list using linked cells and a half stencil (from cell_grid)
+    """
+    n_atoms = len(positions)
+    order, sorted_xyz, sorted_pos, cell_start, cell_count = sort_into_cells(
+        positions, box, n_cells)
+
+    cutoff2 = cutoff * cutoff
+    i_all, j_all, v_all = [], [], []
+    for shift in stencil:
+        target = sorted_xyz + shift
+        neigh = np.ravel_multi_index((target % n_cells).T, n_cells)
+        if shift.any():
+            start = cell_start[neigh]
+            length = cell_count[neigh]
+        else:
+            # home cell: only partners that come later in sorted order
+            rank = np.arange(n_atoms) - cell_start[neigh]
+            start = cell_start[neigh] + rank + 1
+            length = cell_count[neigh] - rank - 1
+        # image of atom i seen from the (possibly wrapped) neighbour cell;
+        # with >= 2k + 1 cells per side for a reach of k this is exactly
+        # the minimum image
+        origin = sorted_pos - lattice_shift(target // n_cells, box)
+        j_sorted = _ranges(start, length)
+        vec = sorted_pos[j_sorted] - np.repeat(origin, length, axis=0)
+        d2 = np.einsum('ij,ij->i', vec, vec)
+        hit = np.flatnonzero(d2 < cutoff2)
+        i_all.append(order[np.repeat(np.arange(n_atoms), length)[hit]])
+        j_all.append(order[j_sorted[hit]])
+        v_all.append(vec[hit])
+    return np.concatenate(i_all), np.concatenate(j_all), np.concatenate(v_all)
+
+
+def _center_pairs(positions, box, cutoff, n_cells, stencil, centers):
+    """
+    Pairs of the central atoms with all other atoms using linked cells
+
+    All atoms are binned once; the full stencil is then walked from the
+    cells of the central atoms only, so the work scales with their number.
+    """
+    order, sorted_xyz, sorted_pos, cell_start, cell_count = sort_into_cells(
+        positions, box, n_cells)
+    rank = np.empty(len(positions), dtype=np.int64)
+    rank[order] = np.arange(len(positions))
+    center_sorted = rank[centers]
+    center_xyz = sorted_xyz[center_sorted]
+    center_pos = sorted_pos[center_sorted]
+
+    cutoff2 = cutoff * cutoff
+    i_all, j_all, v_all = [], [], []
+    for shift in full_stencil(stencil):
+        target = center_xyz + shift
+        neigh = np.ravel_multi_index((target % n_cells).T, n_cells)
+        length = cell_count[neigh]
+        origin = center_pos - lattice_shift(target // n_cells, box)
+        j_sorted = _ranges(cell_start[neigh], length)
+        row = np.repeat(np.arange(len(centers)), length)
+        vec = sorted_pos[j_sorted] - origin[row]
+        d2 = np.einsum('ij,ij->i', vec, vec)
+        hit = np.flatnonzero((d2 < cutoff2) & (j_sorted != center_sorted[row]))
+        i_all.append(centers[row[hit]])
+        j_all.append(order[j_sorted[hit]])
+        v_all.append(vec[hit])
+    return np.concatenate(i_all), np.concatenate(j_all), np.concatenate(v_all)
+
+
+def cell_grid(box, cutoff):
+    """
+    Linked-cell grid and half stencil for a cutoff
+
+    Along lattice vectors at least three cutoffs wide, cells are at least
+    one cutoff thick (measured perpendicular to their faces) and the
+    stencil reaches one cell. Along shorter vectors (thin slabs, elongated
+    coexistence boxes) cells are cutoff / k thick and the stencil reaches
+    k cells, with k chosen so that the 2k + 1 cells it spans are distinct;
+    the search stays linear in the number of atoms.
+
+    If the cutoff is not below half the smallest cell width (or the reach
+    would exceed MAX_REACH), no stencil is returned and the callers fall
+    back to the direct minimum-image search; beyond half the width, a
+    warning is issued, as pairs farther apart are then only found as their
+    nearest image.
+
+    Returns:
+    --------
+    n_cells : np.array
+        Number of cells along each lattice vector
+    stencil : np.array or None
+        Half stencil (see half_stencil), None for the direct search
+    """
+    widths = cell_widths(box)
+    if cutoff > 0.5 * widths.min():
+        warnings.warn(
+            f"Cutoff {cutoff:.3f} exceeds half the smallest box width "
+            f"({0.5 * widths.min():.3f}); using the minimum-image search, which "
+            f"misses periodic images beyond that distance", stacklevel=2)
+    ratio = widths / cutoff
+    if ratio.min() <= 2.0 + 1.0 / MAX_REACH:
+        return np.floor(ratio).astype(np.int64), None
+    reach = np.where(ratio >= 3.0, 1, np.ceil(1.0 / (ratio - 2.0))).astype(np.int64)
+    # rounding: the stencil must not wrap onto itself
+    reach[np.floor(reach * ratio) < 2 * reach + 1] += 1
+    return np.floor(reach * ratio).astype(np.int64), half_stencil(reach)
+
+
+def build_neighbor_list(positions, box, cutoff, half=True, centers=None):
+    """
+    Find all pairs closer than cutoff in a periodic box
+
+    Parameters:
+    -----------
+    positions : np.array
+        Atomic positions for a single frame, shape (n_atoms, 3)
+    box : np.array
+        Orthorhombic box lengths (Lx, Ly, Lz) or lattice matrix (rows)
+    cutoff : float
+        Cutoff distance; beyond half the smallest box width only minimum
+        images are found (see cell_grid)
+    half : bool
+        Return each pair once (i < j) instead of in both directions
+    centers : np.array
+        Indices of central atoms (e.g. a region selection): only their
+        pairs with any other atom are searched and returned as a full
+        list whose rows of all other atoms are empty (half is ignored)
+
+    Returns:
+    --------
+    nlist : NeighborList
+        Pairs within cutoff in CSR form
+    """
+    positions = np.asarray(positions)
+    box = reduce_box(box, positions.dtype)
+    n_cells, stencil = cell_grid(box, cutoff)
+    positions = wrap_positions(positions, box)
+    if centers is not None:
+        centers = np.asarray(centers, dtype=np.int64)
+        if stencil is not None:
+            i, j, vec = _center_pairs(positions, box, cutoff, n_cells, stencil, centers)
+        else:
+            i, j, vec = _brute_force_pairs(positions, box, cutoff, centers)
+        distances = np.sqrt(np.einsum('ij,ij->i', vec, vec))
+        return NeighborList.from_pairs(len(positions), i, j, distances, vec, half=False)
+    if stencil is not None:
+        i, j, vec = _cell_list_pairs(positions, box, cutoff, n_cells, stencil)
+    else:
+        i, j, vec = _brute_force_pairs(positions, box, cutoff)
+
+    # store each half pair with the smaller index first
+    swap = i > j
+    i, j = np.where(swap, j, i), np.where(swap, i, j)
+    vec[swap] *= -1
+    distances = np.sqrt(np.einsum('ij,ij->i', vec, vec))
+
+    nlist = NeighborList.from_pairs(len(positions), i, j, distances, vec, half=True)
+    return nlist if half else nlist.full()
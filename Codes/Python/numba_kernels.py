@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+numba_kernels.py - Compiled Pair-Histogram Loops for the 'numba' Backend
+
+Description:
+JIT kernels behind histogram_backends' 'numba' backend, kept in their own
+module so that numba is imported only when that backend is first used.
+Both loops run in parallel over chunks of atoms with one histogram per
+chunk, summed at the end.
+
+Tags: RDF; histogram; numba; JIT
+
+Author: Dr. Sergey Galitskiy
+University of South Florida
+"""
+
+import numba
+import numpy as np
+
+
+@numba.njit(parallel=True, cache=True)
+def cell_histogram_kernel(sorted_pos, sorted_xyz, cell_start, cell_count, n_cells, cell,
+                          stencil, cutoff2, dr, n_bins, n_chunks):
+    n_atoms = sorted_pos.shape[0]
+    chunk = (n_atoms + n_chunks - 1) // n_chunks
+    hist = np.zeros((n_chunks, n_bins), dtype=np.int64)
+    for c in numba.prange(n_chunks):
+        for i in range(c * chunk, min((c + 1) * chunk, n_atoms)):
+            for s in range(stencil.shape[0]):
+                tx = sorted_xyz[i, 0] + stencil[s, 0]
+                ty = sorted_xyz[i, 1] + stencil[s, 1]
+                tz = sorted_xyz[i, 2] + stencil[s, 2]
+                # image of atom i seen from the wrapped neighbour cell,
+                # same term order as neighbor_search.lattice_shift
+                ix = tx // n_cells[0]
+                iy = ty // n_cells[1]
+                iz = tz // n_cells[2]
+                ox = sorted_pos[i, 0] - (ix * cell[0, 0] + iy * cell[1, 0] + iz * cell[2, 0])
+                oy = sorted_pos[i, 1] - (ix * cell[0, 1] + iy * cell[1, 1] + iz * cell[2, 1])
+                oz = sorted_pos[i, 2] - (ix * cell[0, 2] + iy * cell[1, 2] + iz * cell[2, 2])
+                neigh = ((tx % n_cells[0]) * n_cells[1] + ty % n_cells[1]) * n_cells[2] \
+                    + tz % n_cells[2]
+                start = cell_start[neigh]
+                if s == 0:
+                    # home cell: only partners that come later in sorted order
+                    start = i + 1
+                for j in range(start, cell_start[neigh] + cell_count[neigh]):
+                    vx = sorted_pos[j, 0] - ox
+                    vy = sorted_pos[j, 1] - oy
+                    vz = sorted_pos[j, 2] - oz
+                    d2 = vx * vx + vy * vy + vz * vz
+                    if d2 < cutoff2:
+                        b = int(np.sqrt(d2) / dr)
+                        if b < n_bins:
+                            hist[c, b] += 1
+    return hist.sum(axis=0)
+
+
+@numba.njit(parallel=True, cache=True)
+def brute_histogram_kernel(positions, box, cutoff2, dr, n_bins, n_chunks):
+    n_atoms = positions.shape[0]
+    chunk = (n_atoms + n_chunks - 1) // n_chunks
+    hist = np.zeros((n_chunks, n_bins), dtype=np.int64)
+    for c in numba.prange(n_chunks):
+        for i in range(c * chunk, min((c + 1) * chunk, n_atoms)):
+            for j in range(i + 1, n_atoms):
+                vx = positions[j, 0] - positions[i, 0]
+                vy = positions[j, 1] - positions[i, 1]
+                vz = positions[j, 2] - positions[i, 2]
+                vx -= box[0] * np.rint(vx / box[0])
+                vy -= box[1] * np.rint(vy / box[1])
+                vz -= box[2] * np.rint(vz / box[2])
+                d2 = vx * vx + vy * vy + vz * vz
+                if d2 < cutoff2:
+                    b = int(np.sqrt(d2) / dr)
+                    if b < n_bins:
+                        hist[c, b] += 1
+    return hist.sum(axis=0)
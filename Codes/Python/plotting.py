@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+plotting.py - Deferred Matplotlib Import for the Analysis Scripts
+
+Description:
+Importing matplotlib.pyplot costs a few hundred milliseconds, which every
+script invocation in a parameter sweep would pay even when it only writes
+.dat files. The scripts therefore fetch pyplot through get_pyplot() inside
+their plot methods. On nodes without a display the non-interactive Agg
+backend is selected before pyplot is imported.
+
+Tags: plotting; matplotlib; start-up time
+
+Author: Dr. Sergey Galitskiy
+University of South Florida
+"""
+
+import os
+import sys
+
+
+def is_headless():
+    """
+    True when no display is available for interactive figures
+    """
+    if sys.platform in ('win32', 'darwin'):
+        return False
+    return not (os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+
+
+def get_pyplot():
+    """
+    Import matplotlib.pyplot on first use
+
+    An explicit MPLBACKEND setting is respected; otherwise headless
+    sessions get the Agg backend.
+
+    Returns:
+    --------
+    plt : module
+        matplotlib.pyplot
+    """
+    import matplotlib
+    if 'MPLBACKEND' not in os.environ and is_headless():
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def finish_figure(fig, output_file, save_plot=True):
+    """
+    Save a figure to output_file (or show it) and release it
+    """
+    plt = get_pyplot()
+    fig.tight_layout()
+    if save_plot:
+        fig.savefig(output_file, dpi=150, bbox_inches='tight')
+    else:
+        plt.show()
+    plt.close(fig)
+
+
+def add_plot_argument(parser):
+    """
+    Add a --no_plot option to a command line parser
+    """
+    parser.add_argument('--no_plot', '--no-plot', action='store_true',
+                        help='Skip plotting (matplotlib is then never imported)')
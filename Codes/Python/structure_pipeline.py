@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+structure_pipeline.py - Single-Pass RDF, Coordination and ADF Analysis
+
+Description:
+Reads and neighbor-searches every frame exactly once and feeds all requested
+accumulators from that one neighbor list: total and partial g(r), per-atom
+coordination, coordination-resolved g(r), and total and partial ADF.
+The only quantity that needs the RDF beforehand, the r1 cutoff (first RDF
+minimum), is estimated from a cheap first pass over a subsample of frames.
+
+Tags: RDF; pRDF; ADF; coordination; single pass; MD/QMD
+
+Author: Dr. Sergey Galitskiy
+University of South Florida
+"""
+
+import numpy as np
+import argparse
+
+from angle_kernels import coordination_angle_histograms
+from atom_selection import add_selection_argument, atoms_from_args
+from coordination_series import CoordinationWriter
+from frame_parallel import add_checkpoint_arguments, merge_sums
+from histogram_backends import add_backend_argument
+from histogram_store import (FINE_D_ANGLE, FINE_DR, HistogramStore, add_histogram_store_arguments,
+                             aligned, histogram_store_path, rebin)
+from RDF_analysis1 import RDFAnalyzer
+from trajectory_io import add_frame_arguments, frame_numbers, frames_from_args
+
+
+class StructurePipeline(RDFAnalyzer):
+    """
+    Single-pass structural analyzer combining RDF and ADF accumulators
+    """
+
+    def estimate_r1(self, r_max=10.0, dr=0.1, n_sample=10, search_range=None):
+        """
+        Estimate r1 cutoff from the RDF of a subsample of frames
+
+        The histogram store is not used for the subsample, whose frame
+        selection differs from that of the analysis.
+
+        Parameters:
+        -----------
+        r_max : float
+            Maximum distance for the subsample RDF
+        dr : float
+            Distance bin width
+        n_sample : int
+            Number of evenly spaced frames to use
+        search_range : tuple
+            Range to search for the first minimum (min_r, max_r); None
+            searches the whole occupied range
+
+        Returns:
+        --------
+        r1 : float
+            First coordination sphere cutoff
+        """
+        selected = frame_numbers(self.trajectory_file, self.trajectory_format,
+                                 self.frame_selection)
+        picks = np.linspace(0, len(selected) - 1, min(n_sample, len(selected)))
+        full_selection, store = self.frame_selection, self.histogram_store
+        self.frame_selection = selected[np.round(picks).astype(int)].tolist()
+        self.histogram_store = None
+        try:
+            r, g_r = self.calculate_rdf(r_max, dr)
+        finally:
+            self.frame_selection, self.histogram_store = full_selection, store
+        return self.find_first_minimum(r, g_r, search_range)
+
+    def run(self, r_max=10.0, dr=0.1, r1_cutoff=None, partial=False, coordination=False,
+            adf=False, angle_min=0.0, angle_max=180.0, d_angle=1.0, adf_coordinations=(),
+            series_file=None):
+        """
+        Accumulate all requested quantities in one pass over the trajectory
+
+        With a histogram store path set (self.histogram_store) and bin
+        widths on its fine grids, the quantities are accumulated at FINE_DR
+        and FINE_D_ANGLE, kept in the store (shared with RDFAnalyzer and
+        ADFAnalyzer) and rebinned; only the ones missing from the store are
+        accumulated, together in one pass. Stored coordination-resolved
+        quantities and ADFs are reused while r1 stays within its error bar
+        (self.r1_error, at least FINE_DR) of the r1 they were accumulated
+        with, and results['r1_cutoff'] is then the stored r1. The total
+        g(r) alone is histogrammed with the selected backend (self.backend).
+
+        With series_file, the per-atom coordination of every frame is also
+        written to a coordination series in the same pass (see
+        RDFAnalyzer.write_coordination_series). The series is written in
+        frame order, so that pass runs in this process, without workers,
+        checkpoints or the histogram store.
+
+        Parameters:
+        -----------
+        r_max : float
+            Maximum RDF distance
+        dr : float
+            RDF bin width
+        r1_cutoff : float
+            First coordination sphere cutoff; estimated from a subsample of
+            frames when None and needed
+        partial : bool
+            Calculate partial RDFs
+        coordination : bool
+            Calculate coordination numbers and coordination-resolved RDFs
+        adf : bool
+            Calculate the angular distribution function
+        angle_min, angle_max, d_angle : float
+            ADF range and bin width (degrees)
+        adf_coordinations : tuple of int
+            Coordination numbers for partial ADFs
+        series_file : str
+            Coordination series file to write (None: no series)
+
+        Returns:
+        --------
+        results : dict
+            'r', 'g_r', 'r1_cutoff' and, as requested, 'partial_rdfs',
+            'coord_rdfs', 'coordination_histogram', 'mean_coordination',
+            'angles', 'adf', 'partial_adfs'
+        """
+        if r1_cutoff is None and (coordination or adf or series_file is not None):
+            r1_cutoff = self.estimate_r1(r_max, dr)
+        adf_coordinations = tuple(adf_coordinations)
+        n_bins = int(round(r_max / dr))
+        n_angle_bins = int(round((angle_max - angle_min) / d_angle))
+        config = {
+            'r_max': r_max, 'dr': dr, 'n_bins': n_bins,
+            'r1_cutoff': r1_cutoff, 'rdf': True, 'partial': partial,
+            'coordination': coordination, 'adf': adf, 'angle_min': angle_min,
+            'angle_max': angle_max, 'n_angle_bins': n_angle_bins,
+            'adf_coordinations': adf_coordinations, 'series': False,
+        }
+        use_store = self.histogram_store is not None and aligned(dr, FINE_DR) and (
+            not adf or (aligned(d_angle, FINE_D_ANGLE) and aligned(angle_min, FINE_D_ANGLE)))
+        if series_file is not None:
+            sums = self._accumulate_with_series(config, series_file)
+        elif use_store:
+            sums, r1_cutoff = self._stored_sums(config)
+            sums = {
+                'g_r': rebin(sums['g_r'], FINE_DR, dr, n_bins),
+                'partial': rebin(sums.get('partial', {}), FINE_DR, dr, n_bins),
+                'coord_rdfs': rebin(sums.get('coord_rdfs', {}), FINE_DR, dr, n_bins),
+                'cn_counts': sums.get('cn_counts'),
+                'adf': None if not adf else rebin(sums['adf'], FINE_D_ANGLE, d_angle,
+                                                  n_angle_bins, angle_min),
+                'partial_adf': rebin(sums.get('partial_adf', {}), FINE_D_ANGLE, d_angle,
+                                     n_angle_bins, angle_min),
+            }
+        else:
+            sums = self._accumulate(self._frame_all, config)
+
+        r_edges = np.arange(n_bins + 1) * dr
+        norm = self.n_frames * self._shell_volumes(r_edges)
+        results = {
+            'r': 0.5 * (r_edges[1:] + r_edges[:-1]),
+            'g_r': sums['g_r'] / norm,
+            'r1_cutoff': r1_cutoff,
+        }
+        if partial:
+            results['partial_rdfs'] = {pair: g / norm for pair, g in sorted(sums['partial'].items())}
+        if coordination:
+            results['coord_rdfs'] = {cn: g / norm for cn, g in sorted(sums['coord_rdfs'].items())}
+            cn_counts = sums['cn_counts']
+            results['coordination_histogram'] = cn_counts / cn_counts.sum()
+            results['mean_coordination'] = np.dot(np.arange(len(cn_counts)), cn_counts) / cn_counts.sum()
+        if adf:
+            results['angles'] = angle_min + (np.arange(n_angle_bins) + 0.5) * d_angle
+            results['adf'] = self._normalize(sums['adf'], d_angle)
+            results['partial_adfs'] = {cn: self._normalize(sums['partial_adf'][cn], d_angle)
+                                       for cn in adf_coordinations}
+        return results
+
+    def _stored_sums(self, config):
+        """
+        Fine frame sums of all requested quantities from the histogram
+        store, accumulating the missing ones in one pass
+
+        Returns:
+        --------
+        sums : dict
+            Fine sums ('g_r', 'partial', 'coord_rdfs', 'cn_counts', 'adf',
+            'partial_adf' as requested); self.n_frames is set
+        r1_cutoff : float
+            r1 of the coordination and angle sums
+        """
+        store = HistogramStore(self.histogram_store, self.trajectory_file,
+                               self.trajectory_format, self.frame_selection,
+                               self.atom_selection)
+        extent = config['n_bins'] * config['dr'] - 0.5 * FINE_DR
+        r1_cutoff = config['r1_cutoff']
+        tolerance = max(self.r1_error or 0.0, FINE_DR)
+
+        def usable(entry, needs_extent=True):
+            nonlocal r1_cutoff, tolerance
+            if entry is None or (needs_extent and entry['extent'] < extent):
+                return False
+            if 'r1_cutoff' in entry:
+                if abs(entry['r1_cutoff'] - r1_cutoff) > tolerance:
+                    return False
+                # later entries must share this r1 exactly
+                r1_cutoff, tolerance = entry['r1_cutoff'], 0.0
+            return True
+
+        entries = {'rdf': store.get('rdf')}
+        if config['partial']:
+            entries['partial_rdf'] = store.get('partial_rdf')
+        if config['coordination']:
+            entries['coordination'] = store.get('coordination')
+        if config['adf']:
+            entry = store.get('adf')
+            if entry is not None and not set(config['adf_coordinations']) <= set(entry['sum'][1]):
+                entry = None
+            entries['adf'] = entry
+        missing = {name for name, entry in entries.items()
+                   if not usable(entry, name != 'adf')}
+
+        if missing:
+            classes = config['adf_coordinations']
+            if 'adf' in missing and store.get('adf') is not None:
+                classes = tuple(sorted(set(classes) | set(store.get('adf')['sum'][1])))
+            n_fine = int(round(config['n_bins'] * config['dr'] / FINE_DR))
+            fine = dict(config, dr=FINE_DR, n_bins=n_fine, r_max=n_fine * FINE_DR,
+                        r1_cutoff=r1_cutoff, rdf='rdf' in missing,
+                        partial='partial_rdf' in missing,
+                        coordination='coordination' in missing, adf='adf' in missing,
+                        angle_min=0.0, angle_max=180.0,
+                        n_angle_bins=int(round(180.0 / FINE_D_ANGLE)), adf_coordinations=classes)
+            sums = self._accumulate(self._frame_all, fine)
+            r1 = {'r1_cutoff': r1_cutoff}
+            if fine['rdf']:
+                store.put('rdf', sums['g_r'], self.n_frames, fine['r_max'])
+            if fine['partial']:
+                store.put('partial_rdf', sums['partial'], self.n_frames, fine['r_max'])
+            if fine['coordination']:
+                store.put('coordination', sums['coord_rdfs'], self.n_frames, fine['r_max'],
+                          dict(r1, cn_counts=sums['cn_counts']))
+            if fine['adf']:
+                store.put('adf', (sums['adf'], sums['partial_adf']), self.n_frames, 180.0, r1)
+            entries = {name: store.get(name) for name in entries}
+
+        self.n_frames = entries['rdf']['n_frames']
+        sums = {'g_r': entries['rdf']['sum']}
+        if config['partial']:
+            sums['partial'] = entries['partial_rdf']['sum']
+        if config['coordination']:
+            sums['coord_rdfs'] = entries['coordination']['sum']
+            sums['cn_counts'] = entries['coordination']['cn_counts']
+        if config['adf']:
+            sums['adf'], sums['partial_adf'] = entries['adf']['sum']
+        return sums, r1_cutoff
+
+    def _accumulate_with_series(self, config, series_file):
+        """
+        Serial pass over the frames that also writes the coordination of
+        every atom of every frame to a coordination series
+        """
+        self._check_series_selection()
+        total, writer = None, None
+        try:
+            for frame in self.iter_frames():
+                sums = self._frame_all(frame, dict(config, series=True))
+                if writer is None:
+                    ids = frame.ids if frame.ids is not None else np.arange(1, frame.n_atoms + 1)
+                    writer = CoordinationWriter(series_file, ids)
+                writer.write(sums.pop('series'), frame.ids, frame.timestep)
+                total = merge_sums(total, sums)
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            raise ValueError("No frames selected for analysis")
+        return total
+
+    @staticmethod
+    def _normalize(hist, d_angle):
+        """
+        Normalize angle histogram to unit area
+        """
+        total = hist.sum()
+        return hist / (total * d_angle) if total > 0 else hist.astype(float)
+
+    def _frame_all(self, frame, config):
+        """
+        Contributions of one frame to every requested accumulator
+        """
+        self._set_frame(frame)
+        dr, n_bins = config['dr'], config['n_bins']
+        bonds = config['coordination'] or config['adf'] or config['series']
+        if not (config['partial'] or bonds):
+            # total g(r) only: the backend histograms without a pair list
+            return {'g_r': self._pair_histogram(config['r_max'], dr, n_bins)
+                    / self._pair_normalization()}
+        cutoff = config['r_max']
+        if config['r1_cutoff'] is not None:
+            cutoff = max(cutoff, config['r1_cutoff'])
+        nlist = self.calculate_distances(frame.positions, cutoff)
+        rdf_pairs = nlist if cutoff == config['r_max'] else nlist.within(config['r_max'])
+
+        sums = {}
+        if config['partial']:
+            g_r, sums['partial'] = self._partial_rdf_contribution(rdf_pairs, dr, n_bins)
+            if config['rdf']:
+                sums['g_r'] = g_r
+        elif config['rdf']:
+            sums['g_r'] = self._rdf_contribution(rdf_pairs, dr, n_bins)
+        if bonds:
+            bonded = nlist.within(config['r1_cutoff'])
+            cn = bonded.coordination()
+        if config['series']:
+            sums['series'] = cn
+        if config['coordination']:
+            sums['coord_rdfs'] = self._coordination_rdf_contribution(rdf_pairs, cn, dr, n_bins)
+            # merge_sums pads frames with different maximum coordination
+            sums['cn_counts'] = np.bincount(self._center_values(cn))
+        if config['adf']:
+            # coordination labels from the r1 list key total and partial ADFs in one pass
+            classes = config['adf_coordinations']
+            sums['adf'], by_class = coordination_angle_histograms(
+                bonded, config['angle_min'], config['angle_max'], config['n_angle_bins'],
+                cn, classes)
+            sums['partial_adf'] = dict(zip(classes, by_class))
+        return sums
+
+    def save_results(self, output_prefix, results):
+        """
+        Save single-pass results as column text files
+
+        Parameters:
+        -----------
+        output_prefix : str
+            Output file prefix
+        results : dict
+            Output of run()
+        """
+        columns = [results['r'], results['g_r']]
+        header = 'r g_r'
+        for pair, g in results.get('partial_rdfs', {}).items():
+            columns.append(g)
+            header += f' g_{pair[0]}-{pair[1]}'
+        for cn, g in results.get('coord_rdfs', {}).items():
+            columns.append(g)
+            header += f' g_cn{cn}'
+        np.savetxt(f"{output_prefix}_rdf.dat", np.column_stack(columns), header=header)
+
+        if 'adf' in results:
+            columns = [results['angles'], results['adf']]
+            header = 'angle adf'
+            for cn, adf in results['partial_adfs'].items():
+                columns.append(adf)
+                header += f' adf_cn{cn}'
+            np.savetxt(f"{output_prefix}_adf.dat", np.column_stack(columns), header=header)
+
+
+def main():
+    """
+    Main function for command line usage
+    """
+    parser = argparse.ArgumentParser(description='Single-pass RDF/coordination/ADF analysis')
+    parser.add_argument('trajectory', help='MD trajectory file')
+    parser.add_argument('--r_max', type=float, default=10.0, help='Maximum RDF distance')
+    parser.add_argument('--dr', type=float, default=0.1, help='RDF distance bin width')
+    parser.add_argument('--r1', type=float, default=None, help='r1 cutoff (estimated if omitted)')
+    parser.add_argument('--r1_frames', type=int, default=10,
+                        help='Frames sampled to estimate r1')
+    parser.add_argument('--partial', action='store_true', help='Calculate partial RDFs')
+    parser.add_argument('--coordination', action='store_true', help='Analyze coordination contributions')
+    parser.add_argument('--adf', action='store_true', help='Calculate ADF and partial ADFs')
+    parser.add_argument('--angle_max', type=float, default=180.0, help='Maximum angle')
+    parser.add_argument('--d_angle', type=float, default=1.0, help='Angle bin width')
+    parser.add_argument('--output', default='structure', help='Output file prefix')
+    parser.add_argument('--workers', type=int, default=1, help='Number of worker processes')
+    add_backend_argument(parser)
+    add_frame_arguments(parser)
+    add_selection_argument(parser)
+    add_checkpoint_arguments(parser)
+    add_histogram_store_arguments(parser)
+
+    args = parser.parse_args()
+
+    pipeline = StructurePipeline(args.trajectory)
+    pipeline.workers = args.workers
+    pipeline.backend = args.backend
+    pipeline.histogram_store = histogram_store_path(args)
+    pipeline.atom_selection = atoms_from_args(args)
+    if args.checkpoint_every or args.resume:
+        pipeline.checkpoint_prefix = args.output
+        pipeline.checkpoint_every = args.checkpoint_every or pipeline.checkpoint_every
+        pipeline.resume = args.resume
+
+    print("Loading trajectory...")
+    pipeline.load_trajectory(args.trajectory, frames=frames_from_args(args))
+
+    r1 = args.r1
+    if r1 is None and (args.coordination or args.adf):
+        print("Estimating first coordination sphere from frame subsample...")
+        r1 = pipeline.estimate_r1(args.r_max, args.dr, args.r1_frames)
+        print(f"First coordination sphere cutoff: {r1:.3f} ± {pipeline.r1_error:.3f} Å")
+
+    print("Accumulating all quantities in a single pass...")
+    results = pipeline.run(args.r_max, args.dr, r1, partial=args.partial,
+                           coordination=args.coordination, adf=args.adf,
+                           angle_max=args.angle_max, d_angle=args.d_angle,
+                           adf_coordinations=(4, 6, 8, 12))
+    if args.coordination:
+        print(f"Average coordination number: {results['mean_coordination']:.2f}")
+
+    print("Saving data...")
+    pipeline.save_results(args.output, results)
+
+    print("Single-pass analysis complete!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+thermo_log.py - Fast Reader for LAMMPS Thermo Output in log.lammps
+
+Description:
+Extracts thermo columns (Step, PotEng, Press, Volume, ...) from LAMMPS log
+files without reading per-atom dumps. The log is memory mapped and scanned
+with byte searches for the thermo headers and the "Loop time of" lines that
+close every run block; only the numeric sections in between are handed to
+np.loadtxt, which parses them in C and converts only the selected columns.
+Multiple run blocks are concatenated, dropping the step that a run repeats
+from the end of the previous one. A block still being written (no "Loop
+time" line yet) is read up to its last complete line.
+
+Tags: LAMMPS; log; thermo; parser; MD
+
+Author: Dr. Sergey Galitskiy
+University of South Florida
+"""
+
+import io
+import mmap
+import re
+
+import numpy as np
+
+# Conversion of thermo energy and pressure to eV and Pa for supported unit styles
+# (kcal/mol -> eV uses the exact SI values of N_A and e)
+UNIT_STYLES = {
+    'metal': {'energy': 1.0, 'pressure': 1e5},
+    'real': {'energy': 4184.0 / 6.02214076e23 / 1.602176634e-19, 'pressure': 101325.0},
+}
+
+_UNITS_RE = re.compile(rb'^\s*units\s+(\w+)', re.M)
+_ATOMS_RE = re.compile(rb'^\s*(?:Created\s+)?(\d+)\s+atoms\b', re.M)
+_LOOP_ATOMS_RE = re.compile(rb'with\s+(\d+)\s+atoms')
+_LOOP = b'Loop time of'
+
+
+class ThermoBlock:
+    """
+    Location of the thermo table of one run in a log file
+    """
+
+    def __init__(self, columns, start, end, n_atoms=None, complete=True):
+        """
+        Initialize thermo block
+
+        Parameters:
+        -----------
+        columns : list of str
+            Column names from the thermo header
+        start, end : int
+            Byte range of the numeric rows
+        n_atoms : int
+            Atom count reported by the run (None if unknown)
+        complete : bool
+            False for a run that is still being written
+        """
+        self.columns = columns
+        self.start = start
+        self.end = end
+        self.n_atoms = n_atoms
+        self.complete = complete
+
+
+def is_thermo_log(file_path):
+    """
+    Check whether a file is a LAMMPS log (first line starts with "LAMMPS (")
+    """
+    with open(file_path, 'rb') as handle:
+        return handle.read(8) == b'LAMMPS ('
+
+
+def _find_header(data, position):
+    """
+    Offset of the next thermo header line ("Step ...") at or after position
+    """
+    while True:
+        found = data.find(b'Step', position)
+        if found < 0:
+            return -1
+        line_start = data.rfind(b'\n', 0, found) + 1
+        line_end = data.find(b'\n', found)
+        if not data[line_start:found].strip() and data[found + 4:found + 5] in (b' ', b'\t') \
+                and line_end >= 0:
+            return line_start
+        position = found + 4
+
+
+def scan_thermo_log(file_path):
+    """
+    Locate all thermo blocks of a LAMMPS log
+
+    Parameters:
+    -----------
+    file_path : str
+        Path to log file
+
+    Returns:
+    --------
+    blocks : list of ThermoBlock
+        Thermo tables in file order
+    units : str
+        Unit style from the "units" command ('lj' if none is found)
+    """
+    with open(file_path, 'rb') as handle, \
+            mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        blocks = []
+        units = None
+        n_atoms = None
+        position = 0
+        while True:
+            header = _find_header(data, position)
+            if header < 0:
+                break
+            # the input echo before each run may change units or create atoms
+            preamble = data[position:header]
+            found = _UNITS_RE.findall(preamble)
+            if found:
+                units = found[-1].decode()
+            found = _ATOMS_RE.findall(preamble)
+            if found:
+                n_atoms = int(found[-1])
+
+            start = data.find(b'\n', header) + 1
+            columns = data[header:start].decode().split()
+            loop = data.find(_LOOP, start)
+            if loop < 0:
+                # run in progress: keep complete lines only
+                end = data.rfind(b'\n', start) + 1
+                blocks.append(ThermoBlock(columns, start, max(start, end), n_atoms, False))
+                break
+            end = data.rfind(b'\n', start, loop) + 1
+            match = _LOOP_ATOMS_RE.search(data, loop, data.find(b'\n', loop))
+            if match:
+                n_atoms = int(match.group(1))
+            blocks.append(ThermoBlock(columns, start, max(start, end), n_atoms))
+            position = loop
+    return blocks, units or 'lj'
+
+
+def _parse_rows(text, usecols):
+    """
+    Parse the numeric rows of one block, skipping interleaved messages
+    """
+    try:
+        return np.loadtxt(io.BytesIO(text), usecols=usecols, ndmin=2)
+    except ValueError:
+        # WARNING lines inside a run; drop every line not starting with a number
+        numeric = re.sub(rb'^(?![ \t]*[-+.0-9]).*\n?', b'', text, flags=re.M)
+        return np.loadtxt(io.BytesIO(numeric), usecols=usecols, ndmin=2)
+
+
+def read_thermo_log(file_path, columns=None, runs=None):
+    """
+    Read selected thermo columns of all (or some) runs in a LAMMPS log
+
+    Parameters:
+    -----------
+    file_path : str
+        Path to log file
+    columns : list of str
+        Thermo keywords to keep, e.g. ['Step', 'TotEng', 'Press', 'Volume']
+        (None keeps every column of the first block). 'Atoms' falls back
+        to the atom count of the run when it is not a thermo column; a
+        ValueError is raised if the log does not give that count either.
+        Other columns missing from some runs are filled with NaN.
+    runs : list of int
+        Indices of the run blocks to read (None reads all)
+
+    Returns:
+    --------
+    thermo : dict
+        Column name -> np.array over all rows, plus 'Run' (block index of
+        each row) and 'units' (unit style string)
+    """
+    blocks, units = scan_thermo_log(file_path)
+    if runs is not None:
+        blocks = [blocks[i] for i in runs]
+    if not blocks:
+        raise ValueError(f"No thermo output found in {file_path}")
+    if columns is None:
+        columns = list(blocks[0].columns)
+    available = set().union(*(block.columns for block in blocks)) | {'Atoms'}
+    missing = [name for name in columns if name not in available]
+    if missing:
+        raise ValueError(f"Thermo columns {missing} not in {file_path} "
+                         f"(available: {', '.join(blocks[0].columns)})")
+
+    parts = {name: [] for name in columns}
+    run_ids = []
+    last_step = None
+    with open(file_path, 'rb') as handle, \
+            mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        for run, block in zip(runs if runs is not None else range(len(blocks)), blocks):
+            wanted = [name for name in columns if name in block.columns]
+            if 'Step' in block.columns and 'Step' not in wanted:
+                wanted.append('Step')
+            rows = _parse_rows(data[block.start:block.end],
+                               [block.columns.index(name) for name in wanted])
+            values = dict(zip(wanted, rows.T))
+            skip = 0
+            if 'Step' in values and len(rows):
+                # a run repeats the last step of the previous one as its first row
+                skip = int(last_step is not None and values['Step'][0] == last_step)
+                last_step = values['Step'][-1]
+            n_rows = len(rows) - skip
+            for name in columns:
+                if name in values:
+                    parts[name].append(values[name][skip:])
+                elif name == 'Atoms':
+                    if block.n_atoms is None:
+                        raise ValueError(f"Atom count of run {run} in {file_path} is unknown: "
+                                         f"add 'atoms' to its thermo_style")
+                    parts[name].append(np.full(n_rows, float(block.n_atoms)))
+                else:
+                    parts[name].append(np.full(n_rows, np.nan))
+            run_ids.append(np.full(n_rows, run))
+
+    thermo = {name: np.concatenate(chunks) for name, chunks in parts.items()}
+    thermo['Run'] = np.concatenate(run_ids)
+    thermo['units'] = units
+    return thermo
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+time_series.py - Correlated Time-Series Statistics for MD Averages
+
+Description:
+Error estimates for averages over correlated MD samples. The normalized
+autocorrelation function is computed with one FFT, the statistical
+inefficiency g (number of correlated samples per independent one) follows
+from it, the equilibration cutoff is the start that maximizes the number of
+independent samples, and block averages over blocks of about 2g samples are
+bootstrapped with a single (n_resamples, n_blocks) index array.
+
+Tags: autocorrelation; statistical inefficiency; equilibration; block averaging; bootstrap; MD/QMD
+
+Author: Dr. Sergey Galitskiy
+University of South Florida
+"""
+
+import numpy as np
+
+
+def autocorrelation(series):
+    """
+    Normalized autocorrelation function of a time series via FFT
+
+    Parameters:
+    -----------
+    series : np.array
+        Samples in time order
+
+    Returns:
+    --------
+    acf : np.array
+        C(t) = <dx(0) dx(t)> / <dx^2> for lags t = 0 .. n - 1, each lag
+        averaged over its n - t available pairs (C(0) = 1)
+    """
+    x = np.asarray(series, dtype=np.float64)
+    n = len(x)
+    dx = x - x.mean()
+    # zero padding to >= 2n turns the circular correlation into a linear one
+    size = 1 << int(np.ceil(np.log2(2 * n)))
+    spectrum = np.fft.rfft(dx, size)
+    acov = np.fft.irfft(spectrum * spectrum.conj(), size)[:n] / (n - np.arange(n))
+    if acov[0] <= 0:
+        return np.concatenate([[1.0], np.zeros(n - 1)])
+    return acov / acov[0]
+
+
+def statistical_inefficiency(series, mintime=3):
+    """
+    Statistical inefficiency g = 1 + 2 * tau_int of a time series
+
+    The integrated autocorrelation time is summed with weights (1 - t/n)
+    up to the first lag where C(t) drops to zero (but at least mintime
+    lags), as in pymbar's timeseries module.
+
+    Parameters:
+    -----------
+    series : np.array
+        Samples in time order
+    mintime : int
+        Minimum number of lags summed before the zero crossing counts
+
+    Returns:
+    --------
+    g : float
+        Number of correlated samples per independent sample (>= 1)
+    """
+    n = len(series)
+    if n < 2:
+        return 1.0
+    acf = autocorrelation(series)
+    lags = np.arange(1, n)
+    crossing = np.flatnonzero((acf[1:] <= 0) & (lags >= mintime))
+    stop = crossing[0] if len(crossing) else n - 1
+    g = 1.0 + 2.0 * np.sum((1.0 - lags[:stop] / n) * acf[1:stop + 1])
+    return max(1.0, float(g))
+
+
+def detect_equilibration(series, n_grid=12, n_levels=4, mintime=3):
+    """
+    Equilibration cutoff that maximizes the number of independent samples
+
+    Following Chodera (J. Chem. Theory Comput. 12, 1799 (2016)), the start
+    t0 of the production region is the one that maximizes
+    N_eff(t0) = (n - t0) / g(t0), where g(t0) is the statistical
+    inefficiency of the series from t0 on. Instead of one O(n log n) FFT per
+    sample, t0 is searched on a grid over the first three quarters of the
+    run that is refined around the best point n_levels times.
+
+    Parameters:
+    -----------
+    series : np.array
+        Samples in time order
+    n_grid : int
+        Trial cutoffs per refinement level
+    n_levels : int
+        Number of grid refinements
+    mintime : int
+        Passed to statistical_inefficiency
+
+    Returns:
+    --------
+    t0 : int
+        Index of the first production sample
+    g : float
+        Statistical inefficiency of the production region
+    n_effective : float
+        Number of effectively independent production samples
+    """
+    x = np.asarray(series, dtype=np.float64)
+    n = len(x)
+    tried = {}
+    low, high = 0, (3 * n) // 4
+    for _ in range(n_levels):
+        candidates = np.unique(np.linspace(low, high, n_grid).astype(int))
+        for t0 in candidates:
+            if t0 not in tried:
+                g = statistical_inefficiency(x[t0:], mintime)
+                tried[t0] = (g, (n - t0) / g)
+        best = int(np.argmax([tried[t0][1] for t0 in candidates]))
+        low = candidates[max(best - 1, 0)]
+        high = candidates[min(best + 1, len(candidates) - 1)]
+        if high - low <= 2:
+            break
+    t0 = max(tried, key=lambda t: tried[t][1])
+    return int(t0), float(tried[t0][0]), float(tried[t0][1])
+
+
+def block_size(inefficiency, samples_per_inefficiency=2.0):
+    """
+    Block length that makes block averages effectively independent
+
+    Parameters:
+    -----------
+    inefficiency : float
+        Statistical inefficiency g of the series to be block averaged
+        (the largest one when several series share the blocks)
+    samples_per_inefficiency : float
+        Block length in units of g
+
+    Returns:
+    --------
+    block_size : int
+        Samples per block
+    """
+    return max(1, int(np.ceil(samples_per_inefficiency * inefficiency)))
+
+
+def block_average(series, block_size):
+    """
+    Average a time series (or several as columns) over consecutive blocks
+
+    Leading samples that do not fill a whole block are dropped, keeping
+    the end of the run, which is the best equilibrated part.
+
+    Parameters:
+    -----------
+    series : np.array
+        Samples in time order, shape (n,) or (n, k)
+    block_size : int
+        Samples per block
+
+    Returns:
+    --------
+    blocks : np.array
+        Block means, shape (n_blocks,) or (n_blocks, k)
+    """
+    x = np.asarray(series, dtype=np.float64)
+    n_blocks = len(x) // block_size
+    if n_blocks == 0:
+        raise ValueError(f"Series of {len(x)} samples is shorter than one block ({block_size})")
+    x = x[len(x) - n_blocks * block_size:]
+    return x.reshape(n_blocks, block_size, *x.shape[1:]).mean(axis=1)
+
+
+def bootstrap_means(blocks, n_resamples=1000, rng=None):
+    """
+    Bootstrap distribution of the mean of block averages
+
+    All resamples are drawn as one (n_resamples, n_blocks) index array;
+    columns of 2D blocks are resampled together, keeping their correlation.
+
+    Parameters:
+    -----------
+    blocks : np.array
+        Block means, shape (n_blocks,) or (n_blocks, k)
+    n_resamples : int
+        Number of bootstrap resamples
+    rng : np.random.Generator
+        Random number generator (default: a fresh unseeded one)
+
+    Returns:
+    --------
+    means : np.array
+        Resampled means, shape (n_resamples,) or (n_resamples, k)
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    blocks = np.asarray(blocks)
+    picks = rng.integers(0, len(blocks), size=(n_resamples, len(blocks)))
+    return blocks[picks].mean(axis=1)
+
+
+def summarize(samples, value=None, confidence=0.95):
+    """
+    Error bar and percentile confidence interval from bootstrap samples
+
+    Parameters:
+    -----------
+    samples : np.array
+        Bootstrap estimates of one quantity
+    value : float
+        Point estimate (defaults to the mean of the samples)
+    confidence : float
+        Confidence level of the interval
+
+    Returns:
+    --------
+    summary : dict
+        'value', 'error' (standard deviation of the samples) and 'ci'
+        (lower, upper)
+    """
+    samples = np.asarray(samples, dtype=np.float64)
+    tail = 50.0 * (1.0 - confidence)
+    low, high = np.percentile(samples, [tail, 100.0 - tail])
+    return {
+        'value': float(np.mean(samples) if value is None else value),
+        'error': float(np.std(samples, ddof=1)),
+        'ci': (float(low), float(high)),
+    }
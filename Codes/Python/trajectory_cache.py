@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+trajectory_cache.py - Memory-Mapped Binary Trajectory Cache
+
+Description:
+Converts a LAMMPS dump or extended XYZ trajectory once into a compact binary
+file and opens it again with np.memmap, so repeated analyses with different
+bin widths or cutoffs skip text parsing entirely and read frames with zero
+copies.
+
+File layout (little endian, sections aligned to 64 bytes):
+    header      magic, version, n_frames, n_atoms, dtype of the types array
+    types       (n_atoms,) atom types
+    ids         (n_atoms,) int64 atom IDs
+    positions   (n_frames, n_atoms, 3) float32
+    timesteps   (n_frames,) int64
+    boxes       (n_frames, 4, 3) float64, cell matrix rows followed by origin
+
+Tags: trajectory cache; memory map; binary format; MD/QMD
+
+Author: Dr. Sergey Galitskiy
+University of South Florida
+"""
+
+import argparse
+import itertools
+import struct
+
+import numpy as np
+
+from trajectory_io import Box, Frame, iter_frames, resolve_selection
+
+MAGIC = b'MDTRAJC1'
+VERSION = 1
+CACHE_SUFFIX = '.trjcache'
+
+_HEADER = struct.Struct('<8sIQQ16s')
+_ALIGN = 64
+
+
+def _aligned(offset):
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+def _layout(n_frames, n_atoms, types_dtype):
+    """
+    Byte offsets of the sections of a cache file
+    """
+    types_offset = _aligned(_HEADER.size)
+    ids_offset = _aligned(types_offset + n_atoms * types_dtype.itemsize)
+    positions_offset = _aligned(ids_offset + n_atoms * 8)
+    timesteps_offset = _aligned(positions_offset + n_frames * n_atoms * 3 * 4)
+    boxes_offset = _aligned(timesteps_offset + n_frames * 8)
+    return types_offset, ids_offset, positions_offset, timesteps_offset, boxes_offset
+
+
+def is_cache_file(file_path):
+    """
+    Check whether a file starts with the trajectory cache magic number
+    """
+    with open(file_path, 'rb') as handle:
+        return handle.read(len(MAGIC)) == MAGIC
+
+
+def convert_trajectory(file_path, cache_path=None, fmt='auto', frames=None):
+    """
+    Convert a text trajectory to the binary cache format
+
+    Frames are streamed, so conversion needs memory for one frame only.
+
+    Parameters:
+    -----------
+    file_path : str
+        Path to LAMMPS dump or extended XYZ trajectory
+    cache_path : str
+        Output path (defaults to file_path + '.trjcache')
+    fmt : str
+        'lammps', 'xyz' or 'auto'
+    frames : slice or list of int
+        Frames to convert (None converts all frames)
+
+    Returns:
+    --------
+    cache_path : str
+        Path of the written cache file
+    """
+    if cache_path is None:
+        cache_path = file_path + CACHE_SUFFIX
+
+    timesteps, boxes = [], []
+    with open(cache_path, 'wb') as handle:
+        stream = iter_frames(file_path, fmt, dtype=np.float32, frames=frames)
+        first = next(stream, None)
+        if first is None:
+            raise ValueError(f"No frames found in {file_path}")
+        n_atoms = first.n_atoms
+        types = np.asarray(first.types)
+        if types.dtype.kind == 'U':
+            types = types.astype(f'S{max(types.dtype.itemsize // 4, 1)}')
+        types = types.astype(types.dtype.newbyteorder('<'))
+        ids = np.arange(1, n_atoms + 1) if first.ids is None else first.ids
+
+        # the number of frames is patched into the header at the end
+        types_offset, ids_offset, positions_offset, _, _ = _layout(0, n_atoms, types.dtype)
+        handle.seek(types_offset)
+        handle.write(types.tobytes())
+        handle.seek(ids_offset)
+        handle.write(np.asarray(ids, dtype='<i8').tobytes())
+        handle.seek(positions_offset)
+
+        for frame in itertools.chain([first], stream):
+            if frame.n_atoms != n_atoms:
+                raise ValueError("Trajectory cache requires a constant number of atoms")
+            handle.write(np.ascontiguousarray(frame.positions, dtype='<f4').tobytes())
+            timesteps.append(-1 if frame.timestep is None else frame.timestep)
+            boxes.append(np.vstack([frame.box.matrix, frame.box.origin]))
+
+        n_frames = len(timesteps)
+        _, _, _, timesteps_offset, boxes_offset = _layout(n_frames, n_atoms, types.dtype)
+        handle.seek(timesteps_offset)
+        handle.write(np.asarray(timesteps, dtype='<i8').tobytes())
+        handle.seek(boxes_offset)
+        handle.write(np.asarray(boxes, dtype='<f8').tobytes())
+        handle.seek(0)
+        handle.write(_HEADER.pack(MAGIC, VERSION, n_frames, n_atoms,
+                                  types.dtype.str.encode()))
+    return cache_path
+
+
+class TrajectoryCache:
+    """
+    Read-only memory-mapped view of a binary trajectory cache
+    """
+
+    def __init__(self, cache_path):
+        """
+        Open cache file
+
+        Parameters:
+        -----------
+        cache_path : str
+            Path to a file written by convert_trajectory
+        """
+        with open(cache_path, 'rb') as handle:
+            magic, version, n_frames, n_atoms, types_dtype = _HEADER.unpack(
+                handle.read(_HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{cache_path} is not a version {VERSION} trajectory cache")
+        types_dtype = np.dtype(types_dtype.rstrip(b'\0').decode())
+        offsets = _layout(n_frames, n_atoms, types_dtype)
+
+        self.cache_path = cache_path
+        self.n_frames = n_frames
+        self.n_atoms = n_atoms
+        types = np.fromfile(cache_path, dtype=types_dtype, count=n_atoms, offset=offsets[0])
+        self.types = types.astype(str) if types_dtype.kind == 'S' else types.astype(np.int64)
+        self.ids = np.fromfile(cache_path, dtype='<i8', count=n_atoms, offset=offsets[1])
+        self.positions = np.memmap(cache_path, dtype='<f4', mode='r', offset=offsets[2],
+                                   shape=(n_frames, n_atoms, 3))
+        self.timesteps = np.fromfile(cache_path, dtype='<i8', count=n_frames, offset=offsets[3])
+        self.boxes = np.fromfile(cache_path, dtype='<f8', count=n_frames * 12,
+                                 offset=offsets[4]).reshape(n_frames, 4, 3)
+
+    def __len__(self):
+        return self.n_frames
+
+    def frame(self, number):
+        """
+        Return one frame whose positions are a view into the memory map
+
+        Parameters:
+        -----------
+        number : int
+            Frame number
+
+        Returns:
+        --------
+        frame : Frame
+            Trajectory frame (positions are float32 and read-only)
+        """
+        box = Box(self.boxes[number, :3], self.boxes[number, 3])
+        timestep = int(self.timesteps[number])
+        return Frame(self.positions[number], self.types, box,
+                     None if timestep < 0 else timestep, self.ids)
+
+    def iter_frames(self, frames=None):
+        """
+        Iterate over cached frames
+
+        Parameters:
+        -----------
+        frames : slice or list of int
+            Frames to read (None reads all frames)
+
+        Yields:
+        -------
+        frame : Frame
+            Next trajectory frame
+        """
+        for number in resolve_selection(self.n_frames, frames):
+            yield self.frame(number)
+
+
+def main():
+    """
+    Main function for command line usage
+    """
+    parser = argparse.ArgumentParser(description='Convert trajectory to binary cache')
+    parser.add_argument('trajectory', help='LAMMPS dump or extended XYZ trajectory')
+    parser.add_argument('--output', default=None, help='Cache file (default: <trajectory>.trjcache)')
+    parser.add_argument('--format', default='auto', help='Trajectory format')
+
+    args = parser.parse_args()
+
+    print("Converting trajectory...")
+    cache_path = convert_trajectory(args.trajectory, args.output, args.format)
+    cache = TrajectoryCache(cache_path)
+    print(f"Wrote {cache.n_frames} frames of {cache.n_atoms} atoms to {cache_path}")
+
+if __name__ == "__main__":
+    main()
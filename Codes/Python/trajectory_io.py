@@ -0,0 +1,971 @@
+#!/usr/bin/env python3
+"""
+trajectory_io.py - Streaming Readers for LAMMPS Dump and Extended XYZ Files
+
+Description:
+Frame iterators shared by the RDF, ADF and Clapeyron analyzers. Trajectories
+are read one frame (or one fixed-size block of frames) at a time, so peak
+memory is bounded by a single frame no matter how long the file is.
+Box bounds are parsed including LAMMPS triclinic tilt factors and
+extended XYZ lattice vectors.
+
+Tags: LAMMPS dump; extended XYZ; trajectory streaming; MD/QMD
+
+Author: Dr. Sergey Galitskiy
+University of South Florida
+"""
+
+import collections
+import itertools
+import os
+import re
+import time
+
+import numpy as np
+
+INDEX_SUFFIX = '.idx.npz'
+
+
+class Box:
+    """
+    Periodic simulation cell
+
+    The cell is stored as a matrix whose rows are the lattice vectors a, b, c
+    together with the origin (lower corner). For LAMMPS cells the matrix is
+    lower triangular: a = (lx, 0, 0), b = (xy, ly, 0), c = (xz, yz, lz).
+    """
+
+    def __init__(self, matrix, origin=None):
+        """
+        Initialize box
+
+        Parameters:
+        -----------
+        matrix : np.array
+            Lattice vectors as rows, shape (3, 3)
+        origin : np.array
+            Lower corner of the cell (defaults to zero)
+        """
+        self.matrix = np.asarray(matrix, dtype=np.float64)
+        self.origin = np.zeros(3) if origin is None else np.asarray(origin, dtype=np.float64)
+
+    @classmethod
+    def from_lengths(cls, lengths, origin=None):
+        """
+        Create orthorhombic box from edge lengths (Lx, Ly, Lz)
+        """
+        return cls(np.diag(np.asarray(lengths, dtype=np.float64)), origin)
+
+    @classmethod
+    def from_lammps_bounds(cls, bounds, tilt=None):
+        """
+        Create box from LAMMPS 'ITEM: BOX BOUNDS' values
+
+        Parameters:
+        -----------
+        bounds : np.array
+            Rows (lo, hi) for x, y, z; for triclinic cells these are the
+            bounding-box values xlo_bound, xhi_bound, ...
+        tilt : np.array
+            Tilt factors (xy, xz, yz), or None for orthorhombic cells
+
+        Returns:
+        --------
+        box : Box
+            Simulation cell
+        """
+        bounds = np.asarray(bounds, dtype=np.float64)
+        lo, hi = bounds[:, 0].copy(), bounds[:, 1].copy()
+        xy, xz, yz = (0.0, 0.0, 0.0) if tilt is None else tilt
+        if tilt is not None:
+            # convert bounding box to the actual parallelepiped bounds
+            lo[0] -= min(0.0, xy, xz, xy + xz)
+            hi[0] -= max(0.0, xy, xz, xy + xz)
+            lo[1] -= min(0.0, yz)
+            hi[1] -= max(0.0, yz)
+        lx, ly, lz = hi - lo
+        matrix = np.array([[lx, 0.0, 0.0],
+                           [xy, ly, 0.0],
+                           [xz, yz, lz]])
+        return cls(matrix, lo)
+
+    @property
+    def is_orthorhombic(self):
+        return not np.any(self.matrix[~np.eye(3, dtype=bool)])
+
+    @property
+    def cell(self):
+        """
+        Box argument for neighbor_search: edge lengths for orthorhombic
+        cells (the fast path), otherwise the lattice matrix
+        """
+        return self.matrix.diagonal().copy() if self.is_orthorhombic else self.matrix
+
+    @property
+    def lengths(self):
+        """
+        Lengths of the lattice vectors
+        """
+        return np.linalg.norm(self.matrix, axis=1)
+
+    @property
+    def volume(self):
+        return abs(np.linalg.det(self.matrix))
+
+    @property
+    def tilt(self):
+        """
+        LAMMPS tilt factors (xy, xz, yz)
+        """
+        return np.array([self.matrix[1, 0], self.matrix[2, 0], self.matrix[2, 1]])
+
+    def __eq__(self, other):
+        return (isinstance(other, Box) and np.array_equal(self.matrix, other.matrix)
+                and np.array_equal(self.origin, other.origin))
+
+    def __repr__(self):
+        return f"Box(matrix={self.matrix.tolist()}, origin={self.origin.tolist()})"
+
+
+class Frame:
+    """
+    Single trajectory snapshot
+    """
+
+    def __init__(self, positions, types, box, timestep=None, ids=None, properties=None,
+                 centers=None):
+        """
+        Initialize frame
+
+        Parameters:
+        -----------
+        positions : np.array
+            Cartesian positions, shape (n_atoms, 3), C-contiguous
+        types : np.array
+            Atom types (integers for LAMMPS, element symbols for XYZ)
+        box : Box
+            Simulation cell
+        timestep : int
+            MD timestep (None if unknown)
+        ids : np.array
+            Atom IDs (None if not stored in the file)
+        properties : dict
+            Additional per-atom columns requested from the reader
+        centers : np.array
+            Indices of the atoms that pairs, bonds and angles are counted
+            around, with partners among all atoms (None: every atom); set
+            by region selections
+        """
+        self.positions = positions
+        self.types = types
+        self.box = box
+        self.timestep = timestep
+        self.ids = ids
+        self.properties = properties or {}
+        self.centers = centers
+
+    @property
+    def n_centers(self):
+        return self.n_atoms if self.centers is None else len(self.centers)
+
+    @property
+    def n_atoms(self):
+        return len(self.positions)
+
+
+class FrameBlock:
+    """
+    Block of consecutive frames with a common atom count
+    """
+
+    def __init__(self, frames, dtype=np.float64):
+        """
+        Initialize frame block
+
+        Parameters:
+        -----------
+        frames : list of Frame
+            Consecutive frames with identical atom counts
+        dtype : np.dtype
+            Floating point type of the stacked positions
+        """
+        self.positions = np.ascontiguousarray(
+            np.stack([frame.positions for frame in frames]), dtype=dtype)
+        self.types = frames[0].types
+        self.boxes = [frame.box for frame in frames]
+        self.timesteps = [frame.timestep for frame in frames]
+        self.frames = frames
+
+    @property
+    def n_frames(self):
+        return len(self.positions)
+
+    def __iter__(self):
+        return iter(self.frames)
+
+
+def _read_lines(handle, n_lines):
+    lines = list(itertools.islice(handle, n_lines))
+    if len(lines) < n_lines or (lines and not lines[-1].endswith(b'\n')):
+        raise EOFError("Truncated frame at end of trajectory")
+    return lines
+
+
+def _read_count(handle):
+    """
+    Read a line holding a single integer (atom count or timestep)
+    """
+    return int(_read_lines(handle, 1)[0])
+
+
+def _parse_types(column):
+    """
+    Convert a column of type labels to integers when possible
+    """
+    try:
+        return column.astype(np.int64)
+    except ValueError:
+        # narrowest string type, so binary caches store short labels
+        return column.astype(f'U{int(np.char.str_len(column).max(initial=1))}')
+
+
+def _read_columns(lines, fields):
+    """
+    Parse the needed columns of an atom block in a single tokenizing pass
+
+    Parameters:
+    -----------
+    lines : list of bytes
+        Atom lines of one frame
+    fields : list of tuple
+        (name, column, dtype) per output field; column is an index or a
+        tuple of indices stored as one vector field
+
+    Returns:
+    --------
+    table : np.array
+        Structured array with one record per atom
+    """
+    usecols, record = [], []
+    for name, column, kind in fields:
+        if isinstance(column, tuple):
+            usecols.extend(column)
+            record.append((name, kind, (len(column),)))
+        else:
+            usecols.append(column)
+            record.append((name, kind))
+    return np.loadtxt(lines, usecols=usecols, dtype=np.dtype(record), ndmin=1)
+
+
+def _read_lammps_frame(handle, dtype, properties):
+    """
+    Read one frame from a LAMMPS text dump, or return None at end of file
+    """
+    header = {}
+    line = handle.readline()
+    while line and not line.startswith(b'ITEM: ATOMS'):
+        if line.startswith(b'ITEM: TIMESTEP'):
+            header['timestep'] = _read_count(handle)
+        elif line.startswith(b'ITEM: NUMBER OF ATOMS'):
+            header['n_atoms'] = _read_count(handle)
+        elif line.startswith(b'ITEM: BOX BOUNDS'):
+            triclinic = b'xy' in line
+            rows = np.loadtxt(_read_lines(handle, 3), ndmin=2)
+            header['box'] = Box.from_lammps_bounds(
+                rows[:, :2], rows[:, 2] if triclinic else None)
+        line = handle.readline()
+    if not line:
+        return None
+    if not line.endswith(b'\n'):
+        raise EOFError("Truncated frame at end of trajectory")
+
+    columns = line.split()[2:]
+    columns = [c.decode() for c in columns]
+    lines = _read_lines(handle, header['n_atoms'])
+    box = header['box']
+
+    for names, scaled in ((('x', 'y', 'z'), False), (('xu', 'yu', 'zu'), False),
+                          (('xs', 'ys', 'zs'), True), (('xsu', 'ysu', 'zsu'), True)):
+        if all(name in columns for name in names):
+            usecols = [columns.index(name) for name in names]
+            break
+    else:
+        raise ValueError(f"No position columns in LAMMPS dump header: {columns}")
+
+    type_column = next((name for name in ('type', 'element') if name in columns), None)
+    wanted = [name for name in properties if name in columns]
+
+    def fields(type_kind):
+        record = [('positions', tuple(usecols), np.float64)]
+        if 'id' in columns:
+            record.append(('ids', columns.index('id'), np.int64))
+        if type_column is not None:
+            record.append(('types', columns.index(type_column), type_kind))
+        return record + [(f'property:{name}', columns.index(name), np.float64)
+                         for name in wanted]
+
+    try:
+        table = _read_columns(lines, fields(np.int64 if type_column == 'type' else 'U16'))
+    except ValueError:
+        if type_column != 'type':
+            raise
+        # LAMMPS type labels are text
+        table = _read_columns(lines, fields('U16'))
+
+    positions = table['positions']
+    if scaled:
+        positions = positions @ box.matrix + box.origin
+    ids = table['ids'].copy() if 'id' in columns else None
+    if type_column is None:
+        types = np.ones(header['n_atoms'], dtype=np.int64)
+    else:
+        types = _parse_types(table['types'])
+    extra = {name: table[f'property:{name}'].copy() for name in wanted}
+
+    if ids is not None and np.any(ids[1:] < ids[:-1]):
+        # keep a fixed atom order across frames
+        order = np.argsort(ids, kind='stable')
+        ids, types, positions = ids[order], types[order], positions[order]
+        extra = {name: values[order] for name, values in extra.items()}
+
+    return Frame(np.ascontiguousarray(positions, dtype=dtype), types, box,
+                 header.get('timestep'), ids, extra)
+
+
+_LATTICE_RE = re.compile(rb'Lattice\s*=\s*"([^"]*)"')
+_PROPERTIES_RE = re.compile(rb'Properties\s*=\s*(\S+)')
+_TIMESTEP_RE = re.compile(rb'(?:Timestep|timestep|step)\s*=\s*(\d+)')
+
+
+def _read_xyz_frame(handle, dtype, properties):
+    """
+    Read one frame from an (extended) XYZ file, or return None at end of file
+    """
+    line = handle.readline()
+    while line and not line.strip():
+        line = handle.readline()
+    if not line:
+        return None
+    if not line.endswith(b'\n'):
+        raise EOFError("Truncated frame at end of trajectory")
+    n_atoms = int(line)
+    comment, = _read_lines(handle, 1)
+    lines = _read_lines(handle, n_atoms)
+
+    lattice = _LATTICE_RE.search(comment)
+    if lattice is None:
+        raise ValueError("XYZ frame has no Lattice= entry; periodic box is required")
+    box = Box(np.array(lattice.group(1).split(), dtype=np.float64).reshape(3, 3))
+
+    # Properties=species:S:1:pos:R:3:... gives the column layout
+    layout = {'species': 0, 'pos': 1}
+    spec = _PROPERTIES_RE.search(comment)
+    if spec is not None:
+        fields = spec.group(1).decode().split(':')
+        col = 0
+        layout = {}
+        for name, _, width in zip(fields[::3], fields[1::3], fields[2::3]):
+            layout[name] = col
+            col += int(width)
+
+    pos_col = layout['pos']
+    wanted = [name for name in properties if name in layout]
+    table = _read_columns(lines, [('positions', (pos_col, pos_col + 1, pos_col + 2), np.float64),
+                                  ('types', layout.get('species', 0), 'U16')] +
+                          [(f'property:{name}', layout[name], np.float64) for name in wanted])
+    positions = table['positions']
+    types = _parse_types(table['types'])
+    extra = {name: table[f'property:{name}'].copy() for name in wanted}
+    timestep = _TIMESTEP_RE.search(comment)
+
+    return Frame(np.ascontiguousarray(positions, dtype=dtype), types, box,
+                 int(timestep.group(1)) if timestep else None, None, extra)
+
+
+_READERS = {'lammps': _read_lammps_frame, 'xyz': _read_xyz_frame}
+
+
+def detect_format(file_path):
+    """
+    Guess trajectory format from the first non-empty line of the file
+
+    Parameters:
+    -----------
+    file_path : str
+        Path to trajectory file
+
+    Returns:
+    --------
+    fmt : str
+        'lammps', 'xyz' or 'cache' (binary trajectory cache)
+    """
+    # deferred import: trajectory_cache itself builds on this module
+    from trajectory_cache import is_cache_file
+    if is_cache_file(file_path):
+        return 'cache'
+    with open(file_path, 'rb') as handle:
+        for line in handle:
+            if line.strip():
+                return 'lammps' if line.startswith(b'ITEM:') else 'xyz'
+    raise ValueError(f"Empty trajectory file: {file_path}")
+
+
+class FrameIndex:
+    """
+    Byte offset, atom count, timestep and box of every frame in a trajectory
+    file
+
+    The index records the size and modification time of the file it was
+    built from and is considered stale as soon as either changes. A file
+    that only grew at the end (a running simulation) is re-indexed from the
+    end of the last complete frame instead of from the start.
+    """
+
+    def __init__(self, offsets, n_atoms, timesteps, file_size, file_mtime, fmt,
+                 end_offset=None, signature=b'', boxes=None):
+        """
+        Initialize frame index
+
+        Parameters:
+        -----------
+        offsets : np.array
+            Byte offset of the first line of every frame
+        n_atoms : np.array
+            Atom count of every frame
+        timesteps : np.array
+            Timestep of every frame (-1 if unknown)
+        file_size : int
+            Size of the indexed file in bytes
+        file_mtime : int
+            Modification time of the indexed file (ns)
+        fmt : str
+            Trajectory format ('lammps' or 'xyz')
+        end_offset : int
+            Byte offset just past the last complete frame
+        signature : bytes
+            Leading bytes of the last indexed frame, used to check that a
+            grown file was only appended to
+        boxes : np.array
+            Cell matrix rows followed by origin of every frame,
+            shape (n_frames, 4, 3)
+        """
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.n_atoms = np.asarray(n_atoms, dtype=np.int64)
+        self.timesteps = np.asarray(timesteps, dtype=np.int64)
+        self.file_size = int(file_size)
+        self.file_mtime = int(file_mtime)
+        self.fmt = fmt
+        self.end_offset = int(file_size if end_offset is None else end_offset)
+        self.signature = bytes(signature)
+        self.boxes = np.asarray(boxes if boxes is not None else np.zeros((0, 4, 3)),
+                                dtype=np.float64).reshape(-1, 4, 3)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def is_valid_for(self, file_path):
+        """
+        Check that the file has not changed since the index was built
+        """
+        stat = os.stat(file_path)
+        return stat.st_size == self.file_size and stat.st_mtime_ns == self.file_mtime
+
+    def is_prefix_of(self, file_path):
+        """
+        Check that the file still starts with the indexed frames
+        """
+        if os.stat(file_path).st_size < self.end_offset:
+            return False
+        if not len(self):
+            return True
+        with open(file_path, 'rb') as handle:
+            handle.seek(self.offsets[-1])
+            return handle.read(len(self.signature)) == self.signature
+
+    def save(self, index_path):
+        """
+        Write index to a sidecar .npz file
+        """
+        with open(index_path, 'wb') as handle:
+            np.savez(handle, offsets=self.offsets, n_atoms=self.n_atoms,
+                     timesteps=self.timesteps, file_size=self.file_size,
+                     file_mtime=self.file_mtime, fmt=self.fmt,
+                     end_offset=self.end_offset, signature=np.void(self.signature),
+                     boxes=self.boxes)
+
+    @classmethod
+    def load(cls, index_path):
+        """
+        Read index from a sidecar .npz file
+        """
+        with np.load(index_path) as data:
+            return cls(data['offsets'], data['n_atoms'], data['timesteps'],
+                       data['file_size'], data['file_mtime'], str(data['fmt']),
+                       data['end_offset'], data['signature'].tobytes(), data['boxes'])
+
+
+_SIGNATURE_BYTES = 64
+
+
+def _skip_lines(handle, n_lines):
+    """
+    Skip n_lines lines; return False if the file ends before all of them
+    are complete (a frame still being written)
+    """
+    if n_lines == 0:
+        return True
+    last = collections.deque(zip(itertools.count(1), itertools.islice(handle, n_lines)),
+                             maxlen=1)
+    return bool(last) and last[0][0] == n_lines and last[0][1].endswith(b'\n')
+
+
+def _index_count(handle):
+    """
+    Integer on the next line, or None if the line is not complete yet
+    """
+    line = handle.readline()
+    if not line.endswith(b'\n'):
+        return None
+    try:
+        return int(line)
+    except ValueError:
+        return None
+
+
+def _box_rows(box):
+    """
+    Cell matrix rows followed by origin, shape (4, 3); NaN for a missing box
+    """
+    if box is None:
+        return np.full((4, 3), np.nan)
+    return np.vstack([box.matrix, box.origin])
+
+
+def build_frame_index(file_path, fmt='auto', previous=None):
+    """
+    Scan a trajectory once and record where every frame starts
+
+    Atom lines are skipped without being parsed, so indexing runs at close
+    to raw read speed. A trailing frame that is only partly written is left
+    out of the index.
+
+    Parameters:
+    -----------
+    file_path : str
+        Path to trajectory file
+    fmt : str
+        'lammps', 'xyz' or 'auto'
+    previous : FrameIndex
+        Index of an earlier, shorter version of the same file; scanning
+        resumes after its last complete frame
+
+    Returns:
+    --------
+    index : FrameIndex
+        Frame index of the file
+    """
+    if fmt == 'auto':
+        fmt = previous.fmt if previous is not None else detect_format(file_path)
+    stat = os.stat(file_path)
+    offsets, n_atoms, timesteps, boxes = [], [], [], []
+    end_offset = 0
+    if previous is not None:
+        offsets, n_atoms, timesteps, boxes = (list(previous.offsets), list(previous.n_atoms),
+                                              list(previous.timesteps), list(previous.boxes))
+        end_offset = previous.end_offset
+
+    with open(file_path, 'rb') as handle:
+        handle.seek(end_offset)
+        if fmt == 'lammps':
+            timestep, count, box = -1, 0, None
+            frame_start = handle.tell()
+            line = handle.readline()
+            while line:
+                if line.startswith(b'ITEM: TIMESTEP'):
+                    frame_start = handle.tell() - len(line)
+                    timestep = _index_count(handle)
+                    if timestep is None:
+                        break
+                elif line.startswith(b'ITEM: NUMBER OF ATOMS'):
+                    count = _index_count(handle)
+                    if count is None:
+                        break
+                elif line.startswith(b'ITEM: BOX BOUNDS'):
+                    rows = [handle.readline() for _ in range(3)]
+                    if not rows[-1].endswith(b'\n'):
+                        break
+                    rows = np.array([row.split() for row in rows], dtype=np.float64)
+                    box = Box.from_lammps_bounds(rows[:, :2],
+                                                 rows[:, 2] if b'xy' in line else None)
+                elif line.startswith(b'ITEM: ATOMS'):
+                    if not _skip_lines(handle, count):
+                        break
+                    offsets.append(frame_start)
+                    n_atoms.append(count)
+                    timesteps.append(timestep)
+                    boxes.append(_box_rows(box))
+                    timestep = -1
+                    frame_start = end_offset = handle.tell()
+                line = handle.readline()
+        else:
+            while True:
+                frame_start = handle.tell()
+                line = handle.readline()
+                if not line.endswith(b'\n'):
+                    break
+                if not line.strip():
+                    continue
+                count = int(line)
+                comment = handle.readline()
+                timestep = _TIMESTEP_RE.search(comment)
+                lattice = _LATTICE_RE.search(comment)
+                if not _skip_lines(handle, count):
+                    break
+                offsets.append(frame_start)
+                n_atoms.append(count)
+                timesteps.append(int(timestep.group(1)) if timestep else -1)
+                boxes.append(_box_rows(None if lattice is None else Box(
+                    np.array(lattice.group(1).split(), dtype=np.float64).reshape(3, 3))))
+                end_offset = handle.tell()
+
+        signature = b''
+        if offsets:
+            handle.seek(offsets[-1])
+            signature = handle.read(_SIGNATURE_BYTES)
+
+    return FrameIndex(offsets, n_atoms, timesteps, stat.st_size, stat.st_mtime_ns, fmt,
+                      end_offset, signature, boxes)
+
+
+def load_frame_index(file_path, fmt='auto'):
+    """
+    Load the sidecar frame index of a trajectory, rebuilding it if stale
+
+    The index is stored next to the trajectory as <file>.idx.npz. If the
+    trajectory's size or modification time changed, the index is rebuilt;
+    when the file only grew, scanning continues from the last indexed frame.
+
+    Parameters:
+    -----------
+    file_path : str
+        Path to trajectory file
+    fmt : str
+        'lammps', 'xyz' or 'auto'
+
+    Returns:
+    --------
+    index : FrameIndex
+        Up-to-date frame index
+    """
+    index_path = file_path + INDEX_SUFFIX
+    previous = None
+    if os.path.exists(index_path):
+        try:
+            index = FrameIndex.load(index_path)
+            if fmt in ('auto', index.fmt):
+                if index.is_valid_for(file_path):
+                    return index
+                if index.is_prefix_of(file_path):
+                    previous = index
+        except (OSError, ValueError, KeyError):
+            pass
+
+    index = build_frame_index(file_path, fmt, previous)
+    try:
+        index.save(index_path)
+    except OSError:
+        # read-only location: keep the in-memory index only
+        pass
+    return index
+
+
+def select_frames(n_frames, start=None, stop=None, stride=None, frames=None):
+    """
+    Resolve a frame selection to an array of frame numbers
+
+    Parameters:
+    -----------
+    n_frames : int
+        Number of frames in the trajectory
+    start, stop, stride : int
+        Python slice bounds (negative values count from the end)
+    frames : list of int
+        Explicit frame numbers; takes precedence over the slice
+
+    Returns:
+    --------
+    selected : np.array
+        Selected frame numbers in reading order
+    """
+    if frames is not None:
+        selected = np.asarray(frames, dtype=np.int64)
+        selected[selected < 0] += n_frames
+        if np.any((selected < 0) | (selected >= n_frames)):
+            raise IndexError(f"Frame selection out of range for {n_frames} frames")
+        return selected
+    return np.arange(n_frames)[slice(start, stop, stride)]
+
+
+def iter_frames(file_path, fmt='auto', dtype=np.float64, properties=(), frames=None,
+                atoms=None):
+    """
+    Iterate over trajectory frames one at a time
+
+    Parameters:
+    -----------
+    file_path : str
+        Path to trajectory file (LAMMPS dump, extended XYZ or binary cache)
+    fmt : str
+        'lammps', 'xyz', 'cache' or 'auto' to detect from file contents
+    dtype : np.dtype
+        Floating point type of the returned positions (float32 or float64);
+        binary caches always yield zero-copy float32 views
+    properties : tuple of str
+        Extra per-atom columns to read into Frame.properties if present
+    frames : slice or list of int
+        Frames to read; uses the sidecar index to seek straight to them
+        instead of parsing the skipped frames (None reads all frames)
+    atoms : AtomSelection
+        Atom selection applied to every frame (None keeps all atoms)
+
+    Yields:
+    -------
+    frame : Frame
+        Next trajectory frame
+    """
+    if atoms is not None:
+        for frame in iter_frames(file_path, fmt, dtype, properties, frames):
+            yield atoms.apply(frame)
+        return
+    if fmt == 'auto':
+        fmt = detect_format(file_path)
+    if fmt == 'cache':
+        from trajectory_cache import TrajectoryCache
+        yield from TrajectoryCache(file_path).iter_frames(frames)
+        return
+    read_frame = _READERS[fmt]
+    with open(file_path, 'rb') as handle:
+        if frames is None:
+            while True:
+                try:
+                    frame = read_frame(handle, dtype, properties)
+                except EOFError:
+                    # trailing frame still being written, as in the frame index
+                    return
+                if frame is None:
+                    return
+                yield frame
+        else:
+            index = load_frame_index(file_path, fmt)
+            for number in resolve_selection(len(index), frames):
+                handle.seek(index.offsets[number])
+                yield read_frame(handle, dtype, properties)
+
+
+def follow_frames(file_path, fmt='auto', dtype=np.float64, properties=(), poll_interval=2.0,
+                  idle_timeout=None, atoms=None):
+    """
+    Iterate over the frames of a trajectory that is still being written
+
+    The file is polled with os.stat every poll_interval seconds; when it
+    has grown, only the new bytes are indexed and only newly completed
+    frames are parsed. A trailing frame that is still being written is
+    picked up once it is complete.
+
+    Parameters:
+    -----------
+    file_path : str
+        Path to LAMMPS dump or extended XYZ trajectory
+    fmt : str
+        'lammps', 'xyz' or 'auto'
+    dtype : np.dtype
+        Floating point type of the returned positions
+    properties : tuple of str
+        Extra per-atom columns to read if present
+    poll_interval : float
+        Seconds to sleep between checks of an unchanged file
+    idle_timeout : float
+        Stop after this many seconds without a new frame (None follows
+        until interrupted)
+    atoms : AtomSelection
+        Atom selection applied to every frame (None keeps all atoms)
+
+    Yields:
+    -------
+    frame : Frame or None
+        Next complete frame; None each time all complete frames have been
+        read, before waiting for more
+    """
+    if fmt == 'auto':
+        fmt = detect_format(file_path)
+    if fmt == 'cache':
+        raise ValueError("Follow mode needs a text trajectory, not a binary cache")
+    read_frame = _READERS[fmt]
+    index = None
+    n_read = 0
+    last_frame_time = time.monotonic()
+    with open(file_path, 'rb') as handle:
+        while True:
+            if index is None or not index.is_valid_for(file_path):
+                if index is not None and not index.is_prefix_of(file_path):
+                    raise ValueError(f"{file_path} was truncated or rewritten while followed")
+                index = build_frame_index(file_path, fmt, index)
+            if n_read < len(index):
+                for number in range(n_read, len(index)):
+                    handle.seek(index.offsets[number])
+                    frame = read_frame(handle, dtype, properties)
+                    yield frame if atoms is None else atoms.apply(frame)
+                n_read = len(index)
+                last_frame_time = time.monotonic()
+                yield None
+            elif idle_timeout is not None and time.monotonic() - last_frame_time >= idle_timeout:
+                return
+            else:
+                time.sleep(poll_interval)
+
+
+def resolve_selection(n_frames, frames):
+    """
+    Resolve a slice, list of frame numbers or None to explicit frame numbers
+    """
+    if frames is None:
+        return np.arange(n_frames)
+    if isinstance(frames, slice):
+        return select_frames(n_frames, frames.start, frames.stop, frames.step)
+    return select_frames(n_frames, frames=frames)
+
+
+def frame_numbers(file_path, fmt='auto', frames=None):
+    """
+    Resolve a frame selection of a trajectory to explicit frame numbers
+
+    Text trajectories are counted through their sidecar frame index.
+
+    Parameters:
+    -----------
+    file_path : str
+        Path to trajectory file
+    fmt : str
+        'lammps', 'xyz', 'cache' or 'auto'
+    frames : slice or list of int
+        Frame selection (None selects all frames)
+
+    Returns:
+    --------
+    selected : np.array
+        Selected frame numbers in reading order
+    """
+    if fmt == 'auto':
+        fmt = detect_format(file_path)
+    if fmt == 'cache':
+        from trajectory_cache import TrajectoryCache
+        n_frames = len(TrajectoryCache(file_path))
+    else:
+        n_frames = len(load_frame_index(file_path, fmt))
+    return resolve_selection(n_frames, frames)
+
+
+def frame_boxes(file_path, fmt='auto', frames=None):
+    """
+    Atom count and periodic cell of the selected frames
+
+    Read from the sidecar frame index (or the binary cache), so no
+    coordinates are parsed.
+
+    Parameters:
+    -----------
+    file_path : str
+        Path to trajectory file
+    fmt : str
+        'lammps', 'xyz', 'cache' or 'auto'
+    frames : slice or list of int
+        Frame selection (None selects all frames)
+
+    Returns:
+    --------
+    n_atoms : np.array
+        Atom count of every selected frame
+    matrices : np.array
+        Lattice vectors (rows) of every selected frame, shape (n, 3, 3)
+    origins : np.array
+        Cell origin of every selected frame, shape (n, 3)
+    """
+    if fmt == 'auto':
+        fmt = detect_format(file_path)
+    if fmt == 'cache':
+        from trajectory_cache import TrajectoryCache
+        cache = TrajectoryCache(file_path)
+        selected = resolve_selection(len(cache), frames)
+        n_atoms = np.full(len(selected), cache.n_atoms, dtype=np.int64)
+        boxes = cache.boxes[selected]
+    else:
+        index = load_frame_index(file_path, fmt)
+        selected = resolve_selection(len(index), frames)
+        n_atoms, boxes = index.n_atoms[selected], index.boxes[selected]
+    return n_atoms, boxes[:, :3], boxes[:, 3]
+
+
+def add_frame_arguments(parser):
+    """
+    Add --start/--stop/--stride/--frames options to a command line parser
+    """
+    group = parser.add_argument_group('frame selection')
+    group.add_argument('--start', type=int, default=None, help='First frame to analyze')
+    group.add_argument('--stop', type=int, default=None, help='Stop before this frame')
+    group.add_argument('--stride', type=int, default=None, help='Analyze every N-th frame')
+    group.add_argument('--frames', type=int, nargs='+', default=None,
+                       help='Explicit frame numbers to analyze')
+
+
+def frames_from_args(args):
+    """
+    Convert parsed frame selection options to an iter_frames selection
+
+    Returns:
+    --------
+    frames : slice, list or None
+        None when no selection option was given (plain sequential read)
+    """
+    if args.frames is not None:
+        return args.frames
+    if args.start is None and args.stop is None and args.stride is None:
+        return None
+    return slice(args.start, args.stop, args.stride)
+
+
+def iter_frame_blocks(file_path, block_size, fmt='auto', dtype=np.float64, properties=(),
+                      frames=None):
+    """
+    Iterate over blocks of consecutive frames
+
+    A block is cut short when the atom count changes so that positions can
+    always be stacked into one contiguous (n_frames, n_atoms, 3) array.
+
+    Parameters:
+    -----------
+    file_path : str
+        Path to trajectory file
+    block_size : int
+        Maximum number of frames per block
+    fmt : str
+        'lammps', 'xyz' or 'auto'
+    dtype : np.dtype
+        Floating point type of the stacked positions
+    properties : tuple of str
+        Extra per-atom columns to read if present
+    frames : slice or list of int
+        Frames to read (None reads all frames)
+
+    Yields:
+    -------
+    block : FrameBlock
+        Next block of frames
+    """
+    block = []
+    for frame in iter_frames(file_path, fmt, dtype, properties, frames):
+        if block and (len(block) == block_size or frame.n_atoms != block[0].n_atoms):
+            yield FrameBlock(block, dtype)
+            block = []
+        block.append(frame)
+    if block:
+        yield FrameBlock(block, dtype)